@@ -6,8 +6,20 @@
 """
 
 from models import db, Truck, Driver, Shipment, Revenue, Expense, MaintenanceRecord, Notification
+from rollup import get_truck_totals, get_trucks_totals
+from columnar import ColumnFrame, date_bucket, shipment_metrics
+from projections import get_record
+from serialization import model_columns, serializer_for
+from cache import get_cache, invalidate_on_change, mark_changed
 from datetime import datetime, timedelta
-from flask import jsonify
+from flask import current_app, jsonify
+
+# حجم صفحة صندوق الإشعارات
+INBOX_PAGE_SIZE = 50
+INBOX_MAX_PAGE_SIZE = 500
+
+# مقاييس قاطرة أو سائق بلا شحنات خلال الفترة
+EMPTY_SHIPMENT_METRICS = {'total_shipments': 0, 'delivered_shipments': 0, 'revenue': 0.0}
 
 class NotificationSystem:
     """نظام الإشعارات الذكية"""
@@ -15,7 +27,7 @@ class NotificationSystem:
     @staticmethod
     def check_maintenance_due(truck_id, days_threshold=30):
         """التحقق من الصيانة المستحقة"""
-        truck = Truck.query.get(truck_id)
+        truck = get_record(Truck, truck_id, ('plate_number', 'last_maintenance_date'))
         if not truck:
             return False
         
@@ -59,7 +71,7 @@ class NotificationSystem:
         profit = revenues - expenses
         
         if profit < 0:
-            truck = Truck.query.get(truck_id)
+            truck = get_record(Truck, truck_id, ('plate_number',))
             notification = Notification(
                 truck_id=truck_id,
                 title=f"تحذير: خسارة للقاطرة {truck.plate_number}",
@@ -74,50 +86,184 @@ class NotificationSystem:
         return True
     
     @staticmethod
-    def get_unread_notifications():
-        """الحصول على الإشعارات غير المقروءة"""
-        notifications = Notification.query.filter_by(is_read=False).all()
-        return [notification.to_dict() for notification in notifications]
+    def _without_open_notification(query, notification_type):
+        """استبعاد القواطر التي لديها إشعار غير مقروء من نفس النوع"""
+        open_notification = db.exists().where(
+            Notification.truck_id == Truck.id,
+            Notification.notification_type == notification_type,
+            Notification.is_read == False  # noqa: E712
+        )
+        return query.filter(~open_notification)
+    
+    @staticmethod
+    def sweep_maintenance_due(days_threshold=30):
+        """
+        التحقق من الصيانة المستحقة لجميع القواطر باستعلام واحد
+        يعيد قيم الإشعارات الجديدة (القواطر التي لديها إشعار صيانة مفتوح تُتجاهل)
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(days=days_threshold)
+        
+        query = db.session.query(Truck.id, Truck.plate_number, Truck.last_maintenance_date).filter(
+            db.or_(Truck.last_maintenance_date.is_(None), Truck.last_maintenance_date <= cutoff)
+        )
+        query = NotificationSystem._without_open_notification(query, 'maintenance')
+        
+        notifications = []
+        for truck_id, plate_number, last_maintenance_date in query.order_by(Truck.id):
+            if last_maintenance_date is None:
+                message = "لا توجد صيانة مسجلة لهذه القاطرة. يرجى جدولة الصيانة"
+            else:
+                days_since_maintenance = (now - last_maintenance_date).days
+                message = f"آخر صيانة كانت قبل {days_since_maintenance} يوم. يرجى جدولة الصيانة"
+            notifications.append({
+                'truck_id': truck_id,
+                'title': f"صيانة مستحقة للقاطرة {plate_number}",
+                'message': message,
+                'notification_type': 'maintenance',
+                'is_read': False,
+                'created_at': now
+            })
+        return notifications
+    
+    @staticmethod
+    def sweep_unprofitable_trucks(days=30):
+        """
+        التحقق من ربحية جميع القواطر من الملخص اليومي (استعلام مجمّع واحد)
+        يعيد قيم الإشعارات الجديدة (القواطر التي لديها إشعار خسارة مفتوح تُتجاهل)
+        """
+        now = datetime.utcnow()
+        start_date = now - timedelta(days=days)
+        
+        losses = {
+            truck_id: revenues - expenses
+            for truck_id, (revenues, expenses) in get_trucks_totals(start_date).items()
+            if revenues - expenses < 0
+        }
+        if not losses:
+            return []
+        
+        query = db.session.query(Truck.id, Truck.plate_number).filter(Truck.id.in_(list(losses)))
+        query = NotificationSystem._without_open_notification(query, 'loss')
+        
+        return [
+            {
+                'truck_id': truck_id,
+                'title': f"تحذير: خسارة للقاطرة {plate_number}",
+                'message': f"القاطرة تسجل خسارة بمقدار {abs(losses[truck_id]):.2f} في آخر {days} يوم",
+                'notification_type': 'loss',
+                'is_read': False,
+                'created_at': now
+            }
+            for truck_id, plate_number in query.order_by(Truck.id)
+        ]
+    
+    @staticmethod
+    def sweep_fleet(maintenance_days=30, profitability_days=30):
+        """
+        فحص الأسطول بالكامل وإضافة الإشعارات الجديدة في معاملة واحدة
+        يعيد عدد الإشعارات الجديدة لكل نوع
+        """
+        maintenance = NotificationSystem.sweep_maintenance_due(maintenance_days)
+        losses = NotificationSystem.sweep_unprofitable_trucks(profitability_days)
+        
+        rows = maintenance + losses
+        if rows:
+            # إدراج مجمّع بعبارة واحدة (executemany) بدلاً من INSERT لكل إشعار
+            db.session.execute(db.insert(Notification), rows)
+            mark_changed(db.session, Notification.__tablename__)
+            db.session.commit()
+        
+        return {
+            'maintenance': len(maintenance),
+            'loss': len(losses)
+        }
+    
+    @staticmethod
+    def _unread_query(truck_id=None, notification_type=None):
+        """استعلام الإشعارات غير المقروءة (يستخدم الفهارس الجزئية ix_notifications_unread*)"""
+        query = Notification.query.filter(Notification.is_read == db.false())
+        if truck_id is not None:
+            query = query.filter(Notification.truck_id == truck_id)
+        if notification_type:
+            query = query.filter(Notification.notification_type == notification_type)
+        return query
+    
+    @staticmethod
+    def get_unread_notifications(limit=INBOX_PAGE_SIZE, before=None, truck_id=None, notification_type=None):
+        """
+        صفحة من الإشعارات غير المقروءة، الأحدث أولاً
+        before: معرف آخر إشعار في الصفحة السابقة
+        يعيد (الإشعارات، معرف الصفحة التالية أو None)
+        """
+        limit = max(1, min(limit, INBOX_MAX_PAGE_SIZE))
+        query = NotificationSystem._unread_query(truck_id, notification_type)
+        if before is not None:
+            query = query.filter(Notification.id < before)
+        
+        # صفوف الأعمدة مباشرة بدلاً من كائنات ORM (العمود الأول هو المعرف)
+        rows = query.with_entities(*model_columns(Notification)).order_by(Notification.id.desc()).limit(limit + 1).all()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return serializer_for(Notification).many(rows[:limit]), next_cursor
+    
+    @staticmethod
+    def count_unread(truck_id=None, notification_type=None):
+        """عدد الإشعارات غير المقروءة (من الفهرس الجزئي دون تحميل الإشعارات)"""
+        query = NotificationSystem._unread_query(truck_id, notification_type)
+        return query.with_entities(db.func.count(Notification.id)).scalar()
+    
+    @staticmethod
+    def _selection(ids=None, truck_id=None, select_all=False):
+        """
+        تحديد الإشعارات المستهدفة بالعمليات المجمّعة: قائمة معرفات، أو قاطرة، أو الكل
+        """
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                raise ValueError('ids يجب أن تكون قائمة أرقام')
+            return Notification.query.filter(Notification.id.in_(ids))
+        if truck_id is not None:
+            return Notification.query.filter(Notification.truck_id == truck_id)
+        if select_all:
+            return Notification.query
+        raise ValueError('يجب تحديد ids أو truck_id أو all')
+    
+    @staticmethod
+    def mark_as_read(ids=None, truck_id=None, select_all=False):
+        """تحديد مجموعة إشعارات كمقروءة بعبارة UPDATE واحدة، يعيد عدد الإشعارات المحدّثة"""
+        query = NotificationSystem._selection(ids, truck_id, select_all)
+        updated = query.filter(Notification.is_read == db.false()).update(
+            {Notification.is_read: True}, synchronize_session=False
+        )
+        mark_changed(db.session, Notification.__tablename__)
+        db.session.commit()
+        return updated
+    
+    @staticmethod
+    def delete_notifications(ids=None, truck_id=None, select_all=False):
+        """حذف مجموعة إشعارات بعبارة DELETE واحدة، يعيد عدد الإشعارات المحذوفة"""
+        query = NotificationSystem._selection(ids, truck_id, select_all)
+        deleted = query.delete(synchronize_session=False)
+        mark_changed(db.session, Notification.__tablename__)
+        db.session.commit()
+        return deleted
     
     @staticmethod
     def mark_notification_as_read(notification_id):
         """تحديد الإشعار كمقروء"""
-        notification = Notification.query.get(notification_id)
-        if notification:
-            notification.is_read = True
-            db.session.commit()
-            return True
-        return False
+        if db.session.get(Notification, notification_id) is None:
+            return False
+        NotificationSystem.mark_as_read(ids=[notification_id])
+        return True
 
 
 class AdvancedAnalytics:
     """التحليلات المتقدمة للنظام"""
     
     @staticmethod
-    def get_truck_performance_metrics(truck_id, days=30):
-        """حساب مقاييس أداء القاطرة"""
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # عدد الشحنات
-        shipments = Shipment.query.filter(
-            Shipment.truck_id == truck_id,
-            Shipment.shipment_date >= start_date
-        ).all()
-        
-        total_shipments = len(shipments)
-        delivered_shipments = len([s for s in shipments if s.status == 'delivered'])
-        
-        # الإيرادات والمصاريف
-        revenues = db.session.query(db.func.sum(Revenue.amount)).filter(
-            Revenue.truck_id == truck_id,
-            Revenue.revenue_date >= start_date
-        ).scalar() or 0
-        
-        expenses = db.session.query(db.func.sum(Expense.amount)).filter(
-            Expense.truck_id == truck_id,
-            Expense.expense_date >= start_date
-        ).scalar() or 0
-        
+    def _truck_metrics(truck_id, days, shipments, revenues, expenses):
+        """مقاييس أداء قاطرة من مقاييس شحناتها ومجاميع إيراداتها ومصاريفها"""
+        total_shipments = shipments['total_shipments']
+        delivered_shipments = shipments['delivered_shipments']
         profit = revenues - expenses
         
         # معدل الربحية
@@ -140,21 +286,28 @@ class AdvancedAnalytics:
         }
     
     @staticmethod
-    def get_driver_performance_metrics(driver_id, days=30):
-        """حساب مقاييس أداء السائق"""
+    def get_truck_performance_metrics(truck_id, days=30):
+        """حساب مقاييس أداء القاطرة"""
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # عدد الشحنات
-        shipments = Shipment.query.filter(
-            Shipment.driver_id == driver_id,
-            Shipment.shipment_date >= start_date
-        ).all()
+        # عدد الشحنات والمُسلّم منها
+        shipments = shipment_metrics('truck_id', start_date, truck_id).get(truck_id, EMPTY_SHIPMENT_METRICS)
+        
+        # الإيرادات والمصاريف (من الملخص اليومي)
+        revenues, expenses = get_truck_totals(truck_id, start_date)
         
-        total_shipments = len(shipments)
-        delivered_shipments = len([s for s in shipments if s.status == 'delivered'])
+        return AdvancedAnalytics._truck_metrics(truck_id, days, shipments, revenues, expenses)
+    
+    @staticmethod
+    def get_driver_performance_metrics(driver_id, days=30):
+        """حساب مقاييس أداء السائق"""
+        start_date = datetime.utcnow() - timedelta(days=days)
         
-        # إجمالي الإيرادات
-        total_revenue = sum([s.revenue for s in shipments])
+        # عدد الشحنات والمُسلّم منها وإجمالي إيراداتها
+        shipments = shipment_metrics('driver_id', start_date, driver_id).get(driver_id, EMPTY_SHIPMENT_METRICS)
+        total_shipments = shipments['total_shipments']
+        delivered_shipments = shipments['delivered_shipments']
+        total_revenue = shipments['revenue']
         
         # المصاريف المرتبطة بالسائق
         expenses = db.session.query(db.func.sum(Expense.amount)).filter(
@@ -174,19 +327,30 @@ class AdvancedAnalytics:
         }
     
     @staticmethod
-    def get_fleet_efficiency_report(days=30):
-        """تقرير كفاءة الأسطول"""
+    def get_fleet_efficiency_report(days=30, progress=None):
+        """
+        تقرير كفاءة الأسطول
+        مقاييس شحنات جميع القواطر ومجاميعها تُحسب مرة واحدة بدلاً من استعلامات لكل قاطرة
+        progress: دالة اختيارية تُستدعى (عدد القواطر المنجزة، العدد الكلي) بعد كل قاطرة
+        """
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        trucks = Truck.query.all()
+        truck_ids = [truck_id for truck_id, in db.session.query(Truck.id).order_by(Truck.id)]
+        shipments = shipment_metrics('truck_id', start_date)
+        totals = get_trucks_totals(start_date)
         fleet_data = []
         
-        for truck in trucks:
-            metrics = AdvancedAnalytics.get_truck_performance_metrics(truck.id, days)
+        for index, truck_id in enumerate(truck_ids, 1):
+            revenues, expenses = totals.get(truck_id, (0, 0))
+            metrics = AdvancedAnalytics._truck_metrics(
+                truck_id, days, shipments.get(truck_id, EMPTY_SHIPMENT_METRICS), revenues, expenses
+            )
             fleet_data.append(metrics)
+            if progress is not None:
+                progress(index, len(truck_ids))
         
         # حساب المتوسطات
-        total_trucks = len(trucks)
+        total_trucks = len(truck_ids)
         avg_profitability = sum([m['profitability_rate'] for m in fleet_data]) / total_trucks if total_trucks > 0 else 0
         avg_delivery_rate = sum([m['delivery_rate'] for m in fleet_data]) / total_trucks if total_trucks > 0 else 0
         
@@ -209,37 +373,61 @@ class AdvancedAnalytics:
     
     @staticmethod
     def get_expense_analysis(days=30):
-        """تحليل المصاريف"""
+        """
+        تحليل المصاريف
+        تجميع واحد حسب النوع × القاطرة × الشهر على الأعمدة المطلوبة فقط، ومنه المجاميع حسب كل بعد
+        """
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        expenses = Expense.query.filter(
-            Expense.expense_date >= start_date
-        ).all()
-        
-        # تجميع المصاريف حسب النوع
-        expense_by_type = {}
-        for expense in expenses:
-            if expense.expense_type not in expense_by_type:
-                expense_by_type[expense.expense_type] = 0
-            expense_by_type[expense.expense_type] += expense.amount
-        
-        # تجميع المصاريف حسب القاطرة
-        expense_by_truck = {}
-        for expense in expenses:
-            if expense.truck_id not in expense_by_truck:
-                expense_by_truck[expense.truck_id] = 0
-            expense_by_truck[expense.truck_id] += expense.amount
-        
-        total_expenses = sum([e.amount for e in expenses])
+        expenses = ColumnFrame.fetch(
+            Expense.expense_type,
+            Expense.truck_id,
+            date_bucket(Expense.expense_date, 'month').label('month'),
+            Expense.amount,
+            where=(Expense.expense_date >= start_date,)
+        )
+        groups = expenses.group_totals(('expense_type', 'truck_id', 'month'), ('amount',))
         
         return {
             'period_days': days,
-            'total_expenses': float(total_expenses),
-            'expenses_by_type': {k: float(v) for k, v in expense_by_type.items()},
-            'expenses_by_truck': {k: float(v) for k, v in expense_by_truck.items()}
+            'total_expenses': groups.total('amount'),
+            'expenses_by_type': groups.sums('amount', 'expense_type'),
+            'expenses_by_truck': groups.sums('amount', 'truck_id'),
+            'expenses_by_month': groups.sums('amount', 'month')
         }
 
 
+# ============ التقارير المحسوبة مسبقاً ============
+
+# الجداول التي تعتمد عليها تقارير التحليلات
+ANALYTICS_TABLES = ('trucks', 'drivers', 'shipments', 'revenues', 'expenses')
+
+ANALYTICS_REPORTS = {
+    'fleet_efficiency': AdvancedAnalytics.get_fleet_efficiency_report,
+    'expense_analysis': AdvancedAnalytics.get_expense_analysis,
+}
+
+
+def get_analytics_report(name, days, refresh=False):
+    """
+    تقرير تحليلات من الذاكرة المؤقتة إن كانت فترته من الفترات المحسوبة مسبقاً
+    (REPORT_PRECOMPUTE_DAYS)، وإلا يُحسب مباشرة
+    refresh=True يعيد الحساب ويحدّث الذاكرة المؤقتة (تستخدمه مهمة الجدولة)
+    """
+    compute = ANALYTICS_REPORTS[name]
+    if days not in current_app.config.get('REPORT_PRECOMPUTE_DAYS', ()):
+        return compute(days)
+    
+    cache = get_cache()
+    key = f'analytics:{name}:{days}'
+    report = None if refresh else cache.get(key)
+    if report is None:
+        report = compute(days)
+        cache.set(key, report, current_app.config.get('REPORT_CACHE_TTL'))
+        invalidate_on_change(key, ANALYTICS_TABLES)
+    return report
+
+
 class DataValidation:
     """التحقق من صحة البيانات والقيود"""
     
@@ -303,3 +491,32 @@ class DataValidation:
             errors.append('الإيراد يجب أن يكون أكبر من صفر')
         
         return errors
+    
+    @staticmethod
+    def validate_revenue_data(data):
+        """التحقق من بيانات الإيراد"""
+        errors = []
+        
+        if not data.get('truck_id'):
+            errors.append('القاطرة مطلوبة')
+        
+        if not data.get('amount') or float(data.get('amount', 0)) <= 0:
+            errors.append('المبلغ يجب أن يكون أكبر من صفر')
+        
+        return errors
+    
+    @staticmethod
+    def validate_expense_data(data):
+        """التحقق من بيانات المصروف"""
+        errors = []
+        
+        if not data.get('truck_id'):
+            errors.append('القاطرة مطلوبة')
+        
+        if not data.get('expense_type'):
+            errors.append('نوع المصروف مطلوب')
+        
+        if not data.get('amount') or float(data.get('amount', 0)) <= 0:
+            errors.append('المبلغ يجب أن يكون أكبر من صفر')
+        
+        return errors
@@ -2,9 +2,15 @@
 المسارات الجديدة للميزات المتقدمة
 """
 
+from datetime import datetime, timedelta
+
 from flask import Blueprint, request, jsonify
-from advanced_features import NotificationSystem, AdvancedAnalytics, DataValidation
+from flask_login import login_required
+from advanced_features import (NotificationSystem, AdvancedAnalytics, DataValidation, get_analytics_report,
+                               INBOX_PAGE_SIZE, ANALYTICS_TABLES)
+from conditional import conditional
 from models import db, Notification
+from timeseries import get_timeseries
 
 # إنشاء Blueprint للمسارات المتقدمة
 advanced_bp = Blueprint('advanced', __name__, url_prefix='/api/advanced')
@@ -12,13 +18,67 @@ advanced_bp = Blueprint('advanced', __name__, url_prefix='/api/advanced')
 # ============ مسارات نظام الإشعارات ============
 
 @advanced_bp.route('/notifications', methods=['GET'])
+@login_required
+@conditional('notifications')
 def get_notifications():
-    """الحصول على الإشعارات غير المقروءة"""
-    notifications = NotificationSystem.get_unread_notifications()
-    return jsonify({
-        'count': len(notifications),
-        'notifications': notifications
+    """
+    الإشعارات غير المقروءة مرقّمة، الأحدث أولاً
+    ?limit=50&before=<id>&truck_id=<id>&notification_type=<type>
+    """
+    truck_id = request.args.get('truck_id', type=int)
+    notification_type = request.args.get('notification_type')
+    notifications, next_cursor = NotificationSystem.get_unread_notifications(
+        limit=request.args.get('limit', INBOX_PAGE_SIZE, type=int),
+        before=request.args.get('before', type=int),
+        truck_id=truck_id,
+        notification_type=notification_type
+    )
+    response = jsonify({
+        'count': NotificationSystem.count_unread(truck_id, notification_type),
+        'notifications': notifications,
+        'next_cursor': next_cursor
     })
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+@advanced_bp.route('/notifications/unread-count', methods=['GET'])
+@login_required
+@conditional('notifications')
+def get_unread_count():
+    """عدد الإشعارات غير المقروءة فقط"""
+    truck_id = request.args.get('truck_id', type=int)
+    notification_type = request.args.get('notification_type')
+    return jsonify({'count': NotificationSystem.count_unread(truck_id, notification_type)})
+
+def _bulk_selection():
+    """قراءة تحديد الإشعارات من جسم الطلب: {"ids": [...]} أو {"truck_id": n} أو {"all": true}"""
+    data = request.get_json(silent=True) or {}
+    return {
+        'ids': data.get('ids'),
+        'truck_id': data.get('truck_id'),
+        'select_all': data.get('all') is True
+    }
+
+@advanced_bp.route('/notifications/mark-read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    """تحديد مجموعة إشعارات كمقروءة"""
+    try:
+        updated = NotificationSystem.mark_as_read(**_bulk_selection())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'updated': updated})
+
+@advanced_bp.route('/notifications/delete', methods=['POST'])
+@login_required
+def delete_notifications():
+    """حذف مجموعة إشعارات"""
+    try:
+        deleted = NotificationSystem.delete_notifications(**_bulk_selection())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'deleted': deleted})
 
 @advanced_bp.route('/notifications/<int:notification_id>/read', methods=['PUT'])
 def mark_notification_read(notification_id):
@@ -50,9 +110,23 @@ def check_profitability(truck_id):
         'period_days': days
     })
 
+@advanced_bp.route('/notifications/sweep', methods=['POST'])
+@login_required
+def sweep_notifications():
+    """فحص الصيانة والربحية لجميع القواطر دفعة واحدة"""
+    maintenance_days = request.args.get('maintenance_days', 30, type=int)
+    profitability_days = request.args.get('profitability_days', 30, type=int)
+    created = NotificationSystem.sweep_fleet(maintenance_days, profitability_days)
+    return jsonify({
+        'created': created,
+        'maintenance_days': maintenance_days,
+        'profitability_days': profitability_days
+    })
+
 # ============ مسارات التحليلات المتقدمة ============
 
 @advanced_bp.route('/analytics/truck-performance/<int:truck_id>', methods=['GET'])
+@conditional(*ANALYTICS_TABLES, relative=True)
 def get_truck_performance(truck_id):
     """الحصول على مقاييس أداء القاطرة"""
     days = request.args.get('days', 30, type=int)
@@ -60,6 +134,7 @@ def get_truck_performance(truck_id):
     return jsonify(metrics)
 
 @advanced_bp.route('/analytics/driver-performance/<int:driver_id>', methods=['GET'])
+@conditional(*ANALYTICS_TABLES, relative=True)
 def get_driver_performance(driver_id):
     """الحصول على مقاييس أداء السائق"""
     days = request.args.get('days', 30, type=int)
@@ -67,19 +142,49 @@ def get_driver_performance(driver_id):
     return jsonify(metrics)
 
 @advanced_bp.route('/analytics/fleet-efficiency', methods=['GET'])
+@conditional(*ANALYTICS_TABLES, relative=True)
 def get_fleet_efficiency():
     """الحصول على تقرير كفاءة الأسطول"""
     days = request.args.get('days', 30, type=int)
-    report = AdvancedAnalytics.get_fleet_efficiency_report(days)
+    report = get_analytics_report('fleet_efficiency', days)
     return jsonify(report)
 
 @advanced_bp.route('/analytics/expense-analysis', methods=['GET'])
+@conditional(*ANALYTICS_TABLES, relative=True)
 def get_expense_analysis():
     """الحصول على تحليل المصاريف"""
     days = request.args.get('days', 30, type=int)
-    analysis = AdvancedAnalytics.get_expense_analysis(days)
+    analysis = get_analytics_report('expense_analysis', days)
     return jsonify(analysis)
 
+@advanced_bp.route('/analytics/timeseries', methods=['GET'])
+@login_required
+@conditional(*ANALYTICS_TABLES, relative=True)
+def get_analytics_timeseries():
+    """
+    الإيرادات والمصاريف والربح وعدد الشحنات لكل فترة
+    ?bucket=day|week|month&days=30 أو start_date=&end_date=، مع truck_id أو driver_id (وإلا الأسطول كاملاً)
+    """
+    truck_id = request.args.get('truck_id', type=int)
+    driver_id = request.args.get('driver_id', type=int)
+    if truck_id is not None and driver_id is not None:
+        return jsonify({'error': 'يجب تحديد truck_id أو driver_id وليس كليهما'}), 400
+
+    try:
+        end_day = (datetime.fromisoformat(request.args['end_date']).date()
+                   if request.args.get('end_date') else datetime.utcnow().date())
+        if request.args.get('start_date'):
+            start_day = datetime.fromisoformat(request.args['start_date']).date()
+        else:
+            start_day = end_day - timedelta(days=request.args.get('days', 30, type=int) - 1)
+        timeseries = get_timeseries(request.args.get('bucket', 'day'), start_day, end_day,
+                                    truck_id=truck_id, driver_id=driver_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    timeseries.update({'truck_id': truck_id, 'driver_id': driver_id})
+    return jsonify(timeseries)
+
 # ============ مسارات التحقق من البيانات ============
 
 @advanced_bp.route('/validate/truck', methods=['POST'])
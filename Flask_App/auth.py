@@ -1,34 +1,171 @@
 """
 نظام المصادقة والتحقق من المستخدمين
+- بيانات المستخدم الحالي تُخزن مؤقتاً داخل العملية (UserPrincipal) حسب المعرف، فالطلبات المصادق عليها
+  لا تحتاج استعلاماً عن المستخدم في الحالة المعتادة (الحجم AUTH_CACHE_SIZE والمدة AUTH_CACHE_TTL)
+- كل جلسة تحمل إصدار المصادقة (مشتق من تجزئة كلمة المرور والدور وحالة التفعيل)، فتغيير أي منها ينهي
+  الجلسات الأخرى، والنسخة المخزنة القديمة في أي عملية لا تطابق جلسة أُنشئت بعد التغيير فتُقرأ من جديد
+- تعديل المستخدم أو تعطيله أو حذفه أو تغيير كلمة مروره يحذف النسخة المخزنة في هذه العملية،
+  والعمليات الأخرى تعيد قراءتها خلال AUTH_CACHE_TTL ثانية على الأكثر
+- محاولات الدخول والتسجيل وتغيير كلمة المرور محدودة لكل اسم مستخدم وعنوان IP (ratelimit.py)،
+  والمحاولة المرفوضة تعود بـ 429 قبل أي استعلام أو تجزئة bcrypt
 """
 
-from flask import Blueprint, request, jsonify, session, redirect, url_for
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+import hashlib
+import math
+
+from flask import Blueprint, current_app, request, jsonify, session, redirect, url_for
+from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+from cache import LRUCache
 from models import db, User
+from passwords import PasswordHasherBusy, init_passwords
+from projections import get_record
+from ratelimit import get_rate_limiter, init_rate_limiter
+from serialization import model_columns, model_fields, serializer_for
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 login_manager = LoginManager()
 
+DEFAULT_AUTH_CACHE_SIZE = 1024
+DEFAULT_AUTH_CACHE_TTL = 60
+# مفتاح إصدار المصادقة في الجلسة
+AUTH_VERSION_KEY = '_auth_version'
+# حدود المحاولات خلال LOGIN_RATE_WINDOW ثانية (0 يعطّل الحد)
+DEFAULT_LOGIN_RATE_WINDOW = 300
+DEFAULT_LOGIN_USERNAME_LIMIT = 10
+DEFAULT_LOGIN_IP_LIMIT = 50
+USERNAME_LIMIT = ('LOGIN_USERNAME_LIMIT', DEFAULT_LOGIN_USERNAME_LIMIT)
+IP_LIMIT = ('LOGIN_IP_LIMIT', DEFAULT_LOGIN_IP_LIMIT)
+
+PRINCIPAL_FIELDS = model_fields(User)
+
+
+class UserPrincipal(UserMixin):
+    """بيانات المستخدم الحالي المخزنة مؤقتاً (للقراءة فقط) بنفس حقول User.to_dict"""
+
+    __slots__ = PRINCIPAL_FIELDS + ('auth_version',)
+
+    def __init__(self, values, auth_version):
+        for name, value in zip(PRINCIPAL_FIELDS, values):
+            setattr(self, name, value)
+        self.auth_version = auth_version
+
+    def to_dict(self):
+        return serializer_for(User)(tuple(getattr(self, name) for name in PRINCIPAL_FIELDS))
+
+
+def auth_version(password_hash, role, is_active):
+    """إصدار المصادقة: جزء من بصمة تجزئة كلمة المرور والدور وحالة التفعيل، يتغير مع أي تغيير لها"""
+    fingerprint = f'{password_hash}\0{role}\0{bool(is_active)}'
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def _version_of(user):
+    return auth_version(user.password_hash, user.role, user.is_active)
+
+
+def _principals():
+    return current_app.extensions['auth_principals']
+
+
+def invalidate_user(user_id):
+    """حذف بيانات المستخدم المخزنة مؤقتاً بعد تعديله"""
+    _principals().delete(user_id)
+
+
+def load_principal(user_id):
+    """بيانات المستخدم من الذاكرة المؤقتة أو من قاعدة البيانات، أو None إذا لم يوجد"""
+    principals = _principals()
+    principal = principals.get(user_id)
+    if principal is None:
+        record = get_record(User, user_id, PRINCIPAL_FIELDS + ('password_hash',))
+        if record is None:
+            return None
+        principal = UserPrincipal(record, _version_of(record))
+        principals.set(user_id, principal)
+    return principal
+
+
+def remember_session(user):
+    """ربط الجلسة الحالية بإصدار مصادقة المستخدم وتخزين بياناته مؤقتاً"""
+    version = _version_of(user)
+    session[AUTH_VERSION_KEY] = version
+    _principals().set(user.id, UserPrincipal([getattr(user, name) for name in PRINCIPAL_FIELDS], version))
+
+
+def end_stale_session():
+    """
+    إنهاء جلسة لم يعد إصدارها صالحاً (أو حُذف مستخدمها): حذف بيانات الدخول من الجلسة وملف تذكر الدخول
+    حتى لا تعيد الطلبات التالية بنفس ملف الجلسة قراءة المستخدم من قاعدة البيانات
+    (logout_user لا تُستدعى هنا لأنها تستدعي user_loader من جديد)
+    """
+    for key in ('_user_id', '_fresh', '_id', AUTH_VERSION_KEY):
+        session.pop(key, None)
+    session['_remember'] = 'clear'
+
+
+def throttle(*rules):
+    """
+    تسجيل محاولة لكل (مفتاح، إعداد الحد) في rules
+    يعيد استجابة 429 عند تجاوز أي حد، وإلا None
+    """
+    config = current_app.config
+    window = config.get('LOGIN_RATE_WINDOW', DEFAULT_LOGIN_RATE_WINDOW)
+    limiter = get_rate_limiter()
+    for key, (setting, default) in rules:
+        limit = config.get(setting, default)
+        if limit <= 0:
+            continue
+        retry_after = limiter.hit(key, limit, window)
+        if retry_after:
+            response = jsonify({'error': 'محاولات كثيرة، يرجى المحاولة لاحقاً'})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+    return None
+
+
+def _username_key(username):
+    return 'login:user:' + str(username).strip().lower()
+
+
 def init_auth(app):
     """تهيئة نظام المصادقة"""
+    init_passwords(app)
+    init_rate_limiter(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'يرجى تسجيل الدخول أولاً'
+    app.extensions['auth_principals'] = LRUCache(
+        app.config.get('AUTH_CACHE_SIZE', DEFAULT_AUTH_CACHE_SIZE),
+        app.config.get('AUTH_CACHE_TTL', DEFAULT_AUTH_CACHE_TTL)
+    )
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        user_id = int(user_id)
+        version = session.get(AUTH_VERSION_KEY)
+        principal = load_principal(user_id)
+        if principal is not None and version is not None and principal.auth_version != version:
+            # النسخة المخزنة قد تسبق تغيير كلمة المرور أو الدور أو الحالة في عملية أخرى: التحقق من قاعدة البيانات
+            invalidate_user(user_id)
+            principal = load_principal(user_id)
+        if principal is None:
+            end_stale_session()
+            return None
+        if version is None:
+            # جلسة من ملف تذكر الدخول (أو أقدم من إصدار المصادقة)
+            session[AUTH_VERSION_KEY] = principal.auth_version
+        elif principal.auth_version != version:
+            # تغيّرت كلمة المرور أو الدور أو الحالة بعد إنشاء هذه الجلسة
+            end_stale_session()
+            return None
+        return principal
     
     app.register_blueprint(auth_bp)
-    
-    # إنشاء المستخدم الافتراضي (admin)
-    with app.app_context():
-        create_default_admin()
 
 
 def create_default_admin():
-    """إنشاء مستخدم admin افتراضي إذا لم يكن موجوداً"""
+    """إنشاء مستخدم admin افتراضي إذا لم يكن موجوداً (بعد إنشاء الجداول)، يعيد True إذا أُنشئ"""
     admin_user = User.query.filter_by(username='admin').first()
     
     if not admin_user:
@@ -45,12 +182,33 @@ def create_default_admin():
         print("✓ تم إنشاء المستخدم الافتراضي (admin) بنجاح")
         print("  اسم المستخدم: admin")
         print("  كلمة المرور: admin123")
-    else:
-        print("✓ المستخدم الافتراضي (admin) موجود بالفعل")
+        return True
+    print("✓ المستخدم الافتراضي (admin) موجود بالفعل")
+    return False
+
+
+def register_commands(app):
+    """تسجيل أوامر سطر الأوامر الخاصة بالمستخدمين"""
+
+    @app.cli.command('seed')
+    def seed_command():
+        """إنشاء المستخدم الافتراضي (admin) إذا لم يكن موجوداً"""
+        if not db.inspect(db.engine).has_table(User.__tablename__):
+            print('✗ جداول قاعدة البيانات غير موجودة، شغّل flask init-db أولاً')
+            raise SystemExit(1)
+        create_default_admin()
 
 
 # ============ مسارات المصادقة ============
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    """طابور تجزئة كلمات المرور ممتلئ: رفض الطلب بدلاً من حجز العامل"""
+    response = jsonify({'error': 'الخادم مشغول، يرجى المحاولة بعد قليل'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """تسجيل الدخول"""
@@ -59,6 +217,11 @@ def login():
     if not data or not data.get('username') or not data.get('password'):
         return jsonify({'error': 'اسم المستخدم وكلمة المرور مطلوبان'}), 400
     
+    username_key = _username_key(data['username'])
+    limited = throttle(('login:ip:' + (request.remote_addr or ''), IP_LIMIT), (username_key, USERNAME_LIMIT))
+    if limited:
+        return limited
+    
     user = User.query.filter_by(username=data['username']).first()
     
     if not user or not user.check_password(data['password']):
@@ -73,6 +236,8 @@ def login():
     
     # تسجيل الدخول
     login_user(user, remember=True)
+    remember_session(user)
+    get_rate_limiter().reset(username_key)
     
     return jsonify({
         'message': 'تم تسجيل الدخول بنجاح',
@@ -85,6 +250,7 @@ def login():
 def logout():
     """تسجيل الخروج"""
     logout_user()
+    session.pop(AUTH_VERSION_KEY, None)
     return jsonify({'message': 'تم تسجيل الخروج بنجاح'}), 200
 
 
@@ -97,6 +263,10 @@ def register():
     if not data or not data.get('username') or not data.get('email') or not data.get('password'):
         return jsonify({'error': 'اسم المستخدم والبريد الإلكتروني وكلمة المرور مطلوبة'}), 400
     
+    limited = throttle(('register:ip:' + (request.remote_addr or ''), IP_LIMIT))
+    if limited:
+        return limited
+    
     # التحقق من عدم وجود المستخدم بالفعل
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'error': 'اسم المستخدم موجود بالفعل'}), 409
@@ -138,13 +308,22 @@ def change_password():
     if not data or not data.get('old_password') or not data.get('new_password'):
         return jsonify({'error': 'كلمة المرور القديمة والجديدة مطلوبة'}), 400
     
+    limited = throttle((f'password:user:{current_user.id}', USERNAME_LIMIT))
+    if limited:
+        return limited
+    
+    # current_user نسخة مخزنة للقراءة فقط، والتعديل على كائن المستخدم نفسه
+    user = User.query.get_or_404(current_user.id)
+    
     # التحقق من كلمة المرور القديمة
-    if not current_user.check_password(data['old_password']):
+    if not user.check_password(data['old_password']):
         return jsonify({'error': 'كلمة المرور القديمة غير صحيحة'}), 401
     
-    # تحديث كلمة المرور
-    current_user.set_password(data['new_password'])
+    # تحديث كلمة المرور (الجلسات الأخرى لهذا المستخدم تنتهي، والجلسة الحالية تبقى)
+    user.set_password(data['new_password'])
     db.session.commit()
+    invalidate_user(user.id)
+    remember_session(user)
     
     return jsonify({'message': 'تم تغيير كلمة المرور بنجاح'}), 200
 
@@ -170,8 +349,8 @@ def get_users():
     if current_user.role != 'admin':
         return jsonify({'error': 'ليس لديك صلاحيات كافية'}), 403
     
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
+    rows = db.session.query(*model_columns(User)).all()
+    return jsonify(serializer_for(User).many(rows)), 200
 
 
 @auth_bp.route('/users/<int:user_id>', methods=['GET'])
@@ -214,6 +393,10 @@ def update_user(user_id):
             user.is_active = data['is_active']
     
     db.session.commit()
+    invalidate_user(user_id)
+    if user_id == current_user.id:
+        # تغيير المسؤول لدوره أو حالته يغيّر إصدار المصادقة، والجلسة الحالية تبقى
+        remember_session(user)
     
     return jsonify({
         'message': 'تم تحديث البيانات بنجاح',
@@ -234,6 +417,7 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
+    invalidate_user(user_id)
     
     return jsonify({'message': 'تم حذف المستخدم بنجاح'}), 200
 
@@ -248,6 +432,7 @@ def toggle_user_status(user_id):
     user = User.query.get_or_404(user_id)
     user.is_active = not user.is_active
     db.session.commit()
+    invalidate_user(user_id)
     
     status = 'مفعل' if user.is_active else 'معطل'
     return jsonify({
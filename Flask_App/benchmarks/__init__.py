@@ -0,0 +1,55 @@
+"""
+أدوات قياس الأداء لنظام إدارة القواطر
+تُشغَّل من داخل مجلد Flask_App، مثال:
+    python -m benchmarks.fleet_summary
+"""
+
+import time
+from contextlib import contextmanager
+
+from flask import Flask
+from sqlalchemy import event
+
+from database import init_database
+from models import db
+
+
+def create_bench_app(database_uri='sqlite://', **config):
+    """إنشاء تطبيق مستقل بقاعدة بيانات مؤقتة (في الذاكرة افتراضياً) لأغراض القياس"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config)
+    init_database(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+class QueryCounter:
+    """عدّاد استعلامات SQL المنفذة على المحرك"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def measure(engine):
+    """قياس الزمن وعدد الاستعلامات لكتلة من الشيفرة"""
+    result = {}
+    with QueryCounter(engine) as counter:
+        started = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - started
+    result['queries'] = counter.count
@@ -0,0 +1,160 @@
+"""
+قياس أداء محرك التحليلات العمودي على سجل مصاريف وشحنات كبير
+يقارن التنفيذ السابق (تحميل كائنات ORM وحلقات قواميس) بـ columnar.py
+(مرور واحد بحلقات Python افتراضياً، أو numpy إذا كانت مثبتة؛ السطر الأول engine يبيّن أيهما قيس)
+
+    python -m benchmarks.columnar_analytics --rows 1000000 --shipments 200000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import columnar
+from advanced_features import AdvancedAnalytics
+from benchmarks import create_bench_app, measure
+from models import db, Truck, Driver, Shipment, Expense
+
+EXPENSE_TYPES = ('salary', 'maintenance', 'fuel', 'fine', 'other')
+SEED_CHUNK_SIZE = 50000
+
+
+def seed(expense_count, shipment_count, truck_count, driver_count, rng):
+    """تعبئة قاعدة البيانات بسجل مصاريف وشحنات عشوائي على سنة كاملة"""
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Truck), [
+        {'truck_type': 'قاطرة', 'plate_number': f'BENCH-{i}', 'status': 'active',
+         'total_shipments': 0, 'created_at': now, 'updated_at': now}
+        for i in range(truck_count)
+    ])
+    db.session.execute(db.insert(Driver), [
+        {'name': f'سائق {i}', 'phone_number': f'05{i:08d}', 'salary': 3000,
+         'status': 'active', 'created_at': now, 'updated_at': now}
+        for i in range(driver_count)
+    ])
+
+    for offset in range(0, expense_count, SEED_CHUNK_SIZE):
+        db.session.execute(db.insert(Expense), [
+            {'truck_id': rng.randint(1, truck_count), 'driver_id': rng.randint(1, driver_count),
+             'expense_type': rng.choice(EXPENSE_TYPES), 'amount': round(rng.uniform(10, 3000), 2),
+             'expense_date': now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+             'created_at': now, 'updated_at': now}
+            for _ in range(min(SEED_CHUNK_SIZE, expense_count - offset))
+        ])
+    for offset in range(0, shipment_count, SEED_CHUNK_SIZE):
+        db.session.execute(db.insert(Shipment), [
+            {'truck_id': rng.randint(1, truck_count), 'driver_id': rng.randint(1, driver_count),
+             'from_location': 'أ', 'to_location': 'ب', 'cargo': 'بضائع',
+             'status': rng.choice(('pending', 'in_transit', 'delivered', 'delivered')),
+             'revenue': round(rng.uniform(500, 8000), 2),
+             'shipment_date': now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+             'created_at': now, 'updated_at': now}
+            for _ in range(min(SEED_CHUNK_SIZE, shipment_count - offset))
+        ])
+    db.session.commit()
+
+
+def legacy_expense_analysis(days):
+    """التنفيذ السابق: تحميل كل المصاريف ككائنات ثم التجميع بقواميس"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    expenses = Expense.query.filter(Expense.expense_date >= start_date).all()
+
+    expense_by_type = {}
+    for expense in expenses:
+        if expense.expense_type not in expense_by_type:
+            expense_by_type[expense.expense_type] = 0
+        expense_by_type[expense.expense_type] += expense.amount
+
+    expense_by_truck = {}
+    for expense in expenses:
+        if expense.truck_id not in expense_by_truck:
+            expense_by_truck[expense.truck_id] = 0
+        expense_by_truck[expense.truck_id] += expense.amount
+
+    total_expenses = sum([e.amount for e in expenses])
+    return {
+        'total_expenses': float(total_expenses),
+        'expenses_by_type': {k: float(v) for k, v in expense_by_type.items()},
+        'expenses_by_truck': {k: float(v) for k, v in expense_by_truck.items()}
+    }
+
+
+def legacy_driver_metrics(driver_id, days):
+    """التنفيذ السابق: تحميل شحنات السائق ككائنات وجمع الإيرادات في Python"""
+    start_date = datetime.utcnow() - timedelta(days=days)
+    shipments = Shipment.query.filter(
+        Shipment.driver_id == driver_id,
+        Shipment.shipment_date >= start_date
+    ).all()
+    return {
+        'total_shipments': len(shipments),
+        'delivered_shipments': len([s for s in shipments if s.status == 'delivered']),
+        'total_revenue': float(sum([s.revenue for s in shipments]))
+    }
+
+
+def _close(a, b):
+    return abs(a - b) <= 1e-6 * max(1.0, abs(a), abs(b))
+
+
+def _same_sums(a, b):
+    return a.keys() == b.keys() and all(_close(a[key], b[key]) for key in a)
+
+
+def run(expense_count, shipment_count, truck_count, driver_count, days, seed_value=42):
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_bench_app('sqlite:///' + os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            seed(expense_count, shipment_count, truck_count, driver_count, random.Random(seed_value))
+            driver_ids = range(1, driver_count + 1)
+            results = []
+
+            with measure(db.engine) as legacy:
+                expected = legacy_expense_analysis(days)
+            db.session.expunge_all()
+            with measure(db.engine) as columnar_run:
+                actual = AdvancedAnalytics.get_expense_analysis(days)
+            same = (_close(expected['total_expenses'], actual['total_expenses'])
+                    and _same_sums(expected['expenses_by_type'], actual['expenses_by_type'])
+                    and _same_sums(expected['expenses_by_truck'], actual['expenses_by_truck']))
+            results.append(('expense_analysis', legacy, columnar_run, same))
+
+            with measure(db.engine) as legacy:
+                expected = [legacy_driver_metrics(driver_id, days) for driver_id in driver_ids]
+            db.session.expunge_all()
+            with measure(db.engine) as columnar_run:
+                actual = [AdvancedAnalytics.get_driver_performance_metrics(driver_id, days)
+                          for driver_id in driver_ids]
+            same = all(
+                old['total_shipments'] == new['total_shipments']
+                and old['delivered_shipments'] == new['delivered_shipments']
+                and _close(old['total_revenue'], new['total_revenue'])
+                for old, new in zip(expected, actual)
+            )
+            results.append((f'driver_metrics x{driver_count}', legacy, columnar_run, same))
+            db.engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='عدد المصاريف')
+    parser.add_argument('--shipments', type=int, default=200_000, help='عدد الشحنات')
+    parser.add_argument('--trucks', type=int, default=200)
+    parser.add_argument('--drivers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365, help='فترة التحليل بالأيام')
+    args = parser.parse_args()
+
+    engine = 'numpy' if columnar.get_numpy() is not None else 'python'
+    print(f'engine: {engine}, expenses: {args.rows}, shipments: {args.shipments}')
+    print(f"{'report':>20} {'legacy ms':>10} {'columnar ms':>12} {'speedup':>8} {'same':>5}")
+    for name, legacy, columnar_run, same in run(args.rows, args.shipments, args.trucks, args.drivers, args.days):
+        speedup = legacy['seconds'] / columnar_run['seconds'] if columnar_run['seconds'] else 0
+        print(f"{name:>20} {legacy['seconds'] * 1000:>10.1f} {columnar_run['seconds'] * 1000:>12.1f} "
+              f"{speedup:>7.1f}x {'yes' if same else 'NO':>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+قياس مسارات API كاملة عبر test client على بيانات اصطناعية حتمية (benchmarks/synthetic.py)
+لكل مسار: زمن p50/p95/p99، عدد استعلامات SQL، وذروة الذاكرة (tracemalloc)
+النتائج تُحفظ بصيغة JSON، ويمكن مقارنتها بتشغيل سابق عبر --compare
+
+    python -m benchmarks.endpoints --scale small --iterations 20
+    python -m benchmarks.synthetic --database sqlite:////tmp/fleet.db --scale large
+    python -m benchmarks.endpoints --database sqlite:////tmp/fleet.db --compare instance/benchmarks/old.json
+
+الذاكرة المؤقتة تُفرغ قبل كل طلب افتراضياً لقياس الحساب الفعلي (--warm للإبقاء عليها)
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import sqlalchemy
+
+from benchmarks import QueryCounter, create_bench_app
+from benchmarks.synthetic import add_arguments, default_anchor, generate, scale_from_args
+
+DEFAULT_ENDPOINTS = (
+    '/api/dashboard',
+    '/api/analytics/fleet-summary',
+    '/api/drivers/accounts/summary',
+    '/api/drivers/accounts/all',
+    '/api/trucks',
+    '/api/expenses?limit=500',
+    '/api/advanced/analytics/fleet-efficiency?days=30',
+    '/api/advanced/analytics/expense-analysis?days=30',
+    '/api/advanced/analytics/timeseries?bucket=week&days=90',
+)
+
+ADMIN_CREDENTIALS = {'username': 'admin', 'password': 'admin123'}
+
+
+def percentile(sorted_values, fraction):
+    """النسبة المئوية بطريقة أقرب رتبة (nearest-rank)"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def load_app(database_url):
+    """
+    بناء التطبيق (app.create_app) على قاعدة البيانات المحددة مع إنشاء الجداول والمستخدم الافتراضي
+    المجدول معطّل حتى لا تعمل مهام خلفية أثناء القياس
+    """
+    from app import create_app
+    from auth import create_default_admin
+    from migrations import upgrade_schema
+
+    os.environ['DATABASE_URL'] = database_url
+    app = create_app({'SCHEDULER_ENABLED': False})
+    with app.app_context():
+        upgrade_schema()
+        create_default_admin()
+    return app
+
+
+def measure_endpoint(app, client, path, iterations, warmup, cold):
+    """قياس مسار واحد: الزمن وعدد الاستعلامات لكل طلب، ثم طلب إضافي لقياس ذروة الذاكرة"""
+    from models import db
+
+    cache = app.extensions['cache']
+    with app.app_context():
+        engine = db.engine
+
+    def request_once():
+        if cold:
+            cache.clear()
+        return client.get(path)
+
+    for _ in range(warmup):
+        request_once()
+
+    timings = []
+    queries = []
+    response = None
+    for _ in range(iterations):
+        with QueryCounter(engine) as counter:
+            started = time.perf_counter()
+            response = request_once()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+
+    tracemalloc.start()
+    try:
+        request_once()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'status': response.status_code,
+        'bytes': len(response.data),
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'min_ms': round(timings[0], 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': max(queries),
+        'peak_mb': round(peak / (1024 * 1024), 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(database_url, endpoints, iterations, warmup, cold):
+    app = load_app(database_url)
+    client = app.test_client()
+    login = client.post('/auth/login', json=ADMIN_CREDENTIALS)
+    if login.status_code != 200:
+        raise SystemExit(f'فشل تسجيل الدخول: {login.status_code} {login.get_data(as_text=True)}')
+
+    results = {}
+    for path in endpoints:
+        results[path] = measure_endpoint(app, client, path, iterations, warmup, cold)
+        entry = results[path]
+        print(f"{path:<60} {entry['status']:>4} p50 {entry['p50_ms']:>9.1f} ms  p99 {entry['p99_ms']:>9.1f} ms  "
+              f"{entry['queries']:>4} q  {entry['peak_mb']:>7.1f} MB", flush=True)
+    return results
+
+
+def print_comparison(previous, current):
+    """مقارنة p50 و p99 وعدد الاستعلامات بتشغيل سابق"""
+    print(f"\n{'endpoint':<60} {'p50 old':>9} {'p50 new':>9} {'ratio':>6} {'p99 ratio':>9} {'queries':>10}")
+    for path, entry in current.items():
+        old = previous.get(path)
+        if old is None:
+            continue
+        ratio = entry['p50_ms'] / old['p50_ms'] if old['p50_ms'] else 0
+        p99_ratio = entry['p99_ms'] / old['p99_ms'] if old['p99_ms'] else 0
+        print(f"{path:<60} {old['p50_ms']:>9.1f} {entry['p50_ms']:>9.1f} {ratio:>5.2f}x {p99_ratio:>8.2f}x "
+              f"{old['queries']:>4} → {entry['queries']:<4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='قاعدة بيانات مولّدة مسبقاً (وإلا تُولّد قاعدة مؤقتة بالحجم المحدد)')
+    add_arguments(parser)
+    parser.add_argument('--endpoint', action='append', dest='endpoints', help='مسار للقياس (يتكرر)')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--warm', action='store_true', help='عدم إفراغ الذاكرة المؤقتة بين الطلبات')
+    parser.add_argument('--output', help='ملف JSON للنتائج (الافتراضي instance/benchmarks/endpoints-<time>.json)')
+    parser.add_argument('--compare', help='ملف نتائج سابق للمقارنة')
+    args = parser.parse_args()
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    scale = scale_from_args(args)
+    meta = {
+        'started_at': datetime.utcnow().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'iterations': args.iterations,
+        'cache': 'warm' if args.warm else 'cold',
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database
+        if database_url is None:
+            database_url = 'sqlite:///' + os.path.join(directory, 'fleet.db')
+            anchor = args.anchor or default_anchor()
+            bench_app = create_bench_app(database_url)
+            with bench_app.app_context():
+                print(f'generating {scale} (seed {args.seed})', flush=True)
+                meta['rows'] = generate(days=args.days, seed=args.seed, anchor=anchor, **scale)
+                from models import db
+                db.engine.dispose()
+            meta.update({'scale': scale, 'seed': args.seed, 'days': args.days, 'anchor': anchor.isoformat()})
+        else:
+            meta['database'] = database_url
+        results = run(database_url, endpoints, args.iterations, args.warmup, not args.warm)
+
+    output = args.output or os.path.join(
+        'instance', 'benchmarks', f"endpoints-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'endpoints': results}, f, ensure_ascii=False, indent=2)
+    print(f'\nresults: {output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f)['endpoints'], results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+قياس أداء ملخص الأسطول مع زيادة عدد القواطر
+يقارن الطريقة القديمة (استعلامان لكل قاطرة) بطبقة التجميع في fleet_analytics
+(المبنية على الملخص اليومي daily_truck_financials)
+
+    python -m benchmarks.fleet_summary --trucks 50 150 600 --rows 20
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks import create_bench_app, measure
+from fleet_analytics import calculate_fleet_summary
+from models import db, Truck, Revenue, Expense
+from rollup import rebuild_rollup
+
+
+def seed(truck_count, rows_per_truck, rng):
+    """تعبئة قاعدة البيانات بقواطر وإيرادات ومصاريف عشوائية"""
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Truck), [
+        {'truck_type': 'قاطرة', 'plate_number': f'BENCH-{i}', 'status': 'active',
+         'total_shipments': 0, 'created_at': now, 'updated_at': now}
+        for i in range(truck_count)
+    ])
+    truck_ids = [row[0] for row in db.session.query(Truck.id)]
+
+    revenues = []
+    expenses = []
+    for truck_id in truck_ids:
+        for _ in range(rows_per_truck):
+            day = now - timedelta(days=rng.randint(0, 60))
+            revenues.append({'truck_id': truck_id, 'amount': rng.uniform(100, 5000),
+                             'revenue_date': day, 'created_at': now, 'updated_at': now})
+            expenses.append({'truck_id': truck_id, 'expense_type': 'fuel',
+                             'amount': rng.uniform(50, 3000), 'expense_date': day,
+                             'created_at': now, 'updated_at': now})
+    db.session.execute(db.insert(Revenue), revenues)
+    db.session.execute(db.insert(Expense), expenses)
+    db.session.commit()
+    # الإدراج المجمّع لا يمر بأحداث الجلسة، لذلك يُبنى الملخص اليومي مرة واحدة
+    rebuild_rollup()
+
+
+def legacy_fleet_summary(start_date, end_date):
+    """التنفيذ السابق: استعلامان منفصلان لكل قاطرة"""
+    trucks_data = []
+    for truck in Truck.query.all():
+        revenue = db.session.query(db.func.sum(Revenue.amount)).filter(
+            Revenue.truck_id == truck.id,
+            Revenue.revenue_date >= start_date,
+            Revenue.revenue_date <= end_date
+        ).scalar() or 0
+        expenses = db.session.query(db.func.sum(Expense.amount)).filter(
+            Expense.truck_id == truck.id,
+            Expense.expense_date >= start_date,
+            Expense.expense_date <= end_date
+        ).scalar() or 0
+        trucks_data.append({'truck': truck.to_dict(), 'revenue': float(revenue),
+                            'expenses': float(expenses), 'profit': float(revenue - expenses)})
+    return trucks_data
+
+
+def run(truck_counts, rows_per_truck, seed_value=42):
+    results = []
+    for truck_count in truck_counts:
+        app = create_bench_app()
+        with app.app_context():
+            seed(truck_count, rows_per_truck, random.Random(seed_value))
+            end_date = datetime.utcnow()
+            start_date = end_date - timedelta(days=30)
+
+            with measure(db.engine) as legacy:
+                legacy_fleet_summary(start_date, end_date)
+            db.session.expire_all()
+            with measure(db.engine) as grouped:
+                calculate_fleet_summary(start_date, end_date)
+
+        results.append((truck_count, legacy, grouped))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, nargs='+', default=[50, 150, 600])
+    parser.add_argument('--rows', type=int, default=20, help='عدد الإيرادات/المصاريف لكل قاطرة')
+    args = parser.parse_args()
+
+    print(f"{'trucks':>8} {'legacy q':>9} {'legacy ms':>10} {'grouped q':>10} {'grouped ms':>11}")
+    for truck_count, legacy, grouped in run(args.trucks, args.rows):
+        print(f"{truck_count:>8} {legacy['queries']:>9} {legacy['seconds'] * 1000:>10.1f} "
+              f"{grouped['queries']:>10} {grouped['seconds'] * 1000:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
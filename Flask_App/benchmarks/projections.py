@@ -0,0 +1,131 @@
+"""
+قياس طبقة القراءة بالأعمدة المختارة (projections.py) مقارنة بتحميل كائنات ORM كاملة
+يقيس الزمن وذروة الذاكرة (tracemalloc) لتفاصيل حساب سائق بعدد كبير من الشحنات والمصاريف
+ولملخص الأسطول بعدد كبير من القواطر
+
+    python -m benchmarks.projections --rows 100000 --trucks 5000
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks import create_bench_app, measure
+from driver_account import get_driver_account_details
+from fleet_analytics import calculate_fleet_summary
+from models import db, Truck, Driver, Shipment, Expense
+from rollup import get_trucks_totals
+
+SEED_CHUNK_SIZE = 50000
+# نص طويل في الأعمدة النصية (cargo و description) كما في البيانات الفعلية
+LONG_TEXT = 'بضائع متنوعة مع ملاحظات التسليم والتحميل ' * 5
+
+
+def seed(row_count, truck_count):
+    """سائق واحد بعدد row_count من الشحنات والمصاريف، وعدد truck_count من القواطر"""
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Truck), [
+        {'truck_type': 'قاطرة', 'plate_number': f'BENCH-{i}', 'status': 'active',
+         'total_shipments': 0, 'created_at': now, 'updated_at': now}
+        for i in range(truck_count)
+    ])
+    db.session.execute(db.insert(Driver), [
+        {'name': 'سائق', 'phone_number': '0500000000', 'salary': 3000, 'truck_id': 1,
+         'status': 'active', 'created_at': now, 'updated_at': now}
+    ])
+    for offset in range(0, row_count, SEED_CHUNK_SIZE):
+        count = min(SEED_CHUNK_SIZE, row_count - offset)
+        db.session.execute(db.insert(Shipment), [
+            {'truck_id': 1, 'driver_id': 1, 'from_location': 'الرياض', 'to_location': 'جدة',
+             'cargo': LONG_TEXT, 'status': 'delivered', 'revenue': 1000 + i % 500,
+             'shipment_date': now - timedelta(minutes=i), 'created_at': now, 'updated_at': now}
+            for i in range(offset, offset + count)
+        ])
+        db.session.execute(db.insert(Expense), [
+            {'truck_id': 1, 'driver_id': 1, 'expense_type': 'fuel', 'amount': 100 + i % 50,
+             'description': LONG_TEXT, 'expense_date': now - timedelta(minutes=i),
+             'created_at': now, 'updated_at': now}
+            for i in range(offset, offset + count)
+        ])
+    db.session.commit()
+
+
+def legacy_driver_details(driver_id):
+    """التنفيذ السابق: تحميل الشحنات والمصاريف ككائنات ORM كاملة"""
+    shipments = Shipment.query.filter_by(driver_id=driver_id).all()
+    expenses = Expense.query.filter_by(driver_id=driver_id).all()
+    return {
+        'shipments': [
+            {'id': s.id, 'from': s.from_location, 'to': s.to_location, 'cargo': s.cargo,
+             'revenue': float(s.revenue), 'status': s.status, 'date': s.shipment_date.isoformat()}
+            for s in shipments
+        ],
+        'expenses': [
+            {'id': e.id, 'type': e.expense_type, 'amount': float(e.amount),
+             'description': e.description, 'date': e.expense_date.isoformat()}
+            for e in expenses
+        ]
+    }
+
+
+def legacy_fleet_summary(start_date, end_date):
+    """التنفيذ السابق: قائمة القواطر ككائنات ORM ثم to_dict لكل قاطرة"""
+    totals = get_trucks_totals(start_date, end_date)
+    return [
+        {'truck': truck.to_dict(), 'revenue': float(totals.get(truck.id, (0, 0))[0])}
+        for truck in Truck.query.order_by(Truck.id)
+    ]
+
+
+def profile(func):
+    """تشغيل func مع قياس الزمن وعدد الاستعلامات وذروة الذاكرة"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    try:
+        with measure(db.engine) as result:
+            value = func()
+        result['peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+    return result, value
+
+
+def run(row_count, truck_count):
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_bench_app('sqlite:///' + os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            seed(row_count, truck_count)
+            end_date = datetime.utcnow()
+            start_date = end_date - timedelta(days=30)
+            results = []
+
+            legacy, expected = profile(lambda: legacy_driver_details(1))
+            projected, actual = profile(lambda: get_driver_account_details(1))
+            same = (expected['shipments'] == actual['shipments'] and expected['expenses'] == actual['expenses'])
+            results.append(('driver_details', legacy, projected, same))
+
+            legacy, expected = profile(lambda: legacy_fleet_summary(start_date, end_date))
+            projected, actual = profile(lambda: calculate_fleet_summary(start_date, end_date))
+            same = [item['truck'] for item in expected] == [item['truck'] for item in actual['trucks']]
+            results.append(('fleet_summary', legacy, projected, same))
+            db.engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000, help='عدد الشحنات (ومثله المصاريف) للسائق')
+    parser.add_argument('--trucks', type=int, default=5_000, help='عدد القواطر')
+    args = parser.parse_args()
+
+    print(f'rows: {args.rows}, trucks: {args.trucks}')
+    print(f"{'path':>15} {'orm ms':>9} {'records ms':>11} {'orm MB':>8} {'records MB':>11} {'same':>5}")
+    for name, legacy, projected, same in run(args.rows, args.trucks):
+        print(f"{name:>15} {legacy['seconds'] * 1000:>9.1f} {projected['seconds'] * 1000:>11.1f} "
+              f"{legacy['peak_mb']:>8.1f} {projected['peak_mb']:>11.1f} {'yes' if same else 'NO':>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+قياس أداء تحويل القوائم الكبيرة إلى JSON
+يقارن to_dict لكل كائن ORM مع jsonify الافتراضي بمحوّلات الصفوف في serialization.py
+مع مرمّز Flask الافتراضي ومع orjson (إن كانت مثبتة)
+
+    python -m benchmarks.serialization --rows 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks import create_bench_app
+from models import db, Truck, Expense
+from serialization import OrjsonProvider, model_columns, orjson, serializer_for
+
+EXPENSE_TYPES = ('salary', 'maintenance', 'fuel', 'fine', 'other')
+
+
+def seed(row_count, rng):
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Truck), [
+        {'truck_type': 'قاطرة', 'plate_number': f'BENCH-{i}', 'status': 'active',
+         'total_shipments': 0, 'created_at': now, 'updated_at': now}
+        for i in range(20)
+    ])
+    db.session.execute(db.insert(Expense), [
+        {'truck_id': rng.randint(1, 20), 'driver_id': None, 'expense_type': rng.choice(EXPENSE_TYPES),
+         'amount': round(rng.uniform(10, 3000), 2), 'description': 'مصروف تشغيل',
+         'expense_date': now - timedelta(minutes=rng.randint(0, 525600)),
+         'created_at': now, 'updated_at': now}
+        for _ in range(row_count)
+    ])
+    db.session.commit()
+
+
+def orm_to_dict():
+    """التنفيذ السابق: كائنات ORM ثم to_dict لكل كائن"""
+    return [expense.to_dict() for expense in Expense.query.all()]
+
+
+def row_serializer():
+    """صفوف الأعمدة مباشرة ثم المحوّل المُجمَّع مسبقاً"""
+    rows = db.session.query(*model_columns(Expense)).all()
+    return serializer_for(Expense).many(rows)
+
+
+def _timed(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(row_count, repeat, seed_value=42):
+    app = create_bench_app()
+    providers = [('flask', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+
+    results = []
+    with app.app_context(), app.test_request_context():
+        seed(row_count, random.Random(seed_value))
+        legacy_seconds, legacy_items = _timed(orm_to_dict, repeat)
+        rows_seconds, row_items = _timed(row_serializer, repeat)
+        assert legacy_items == row_items, 'مخرجات المحوّل لا تطابق to_dict'
+
+        for name, provider in providers:
+            app.json = provider
+            encode_seconds, body = _timed(lambda: app.json.response(row_items).get_data(), repeat)
+            results.append((name, legacy_seconds, rows_seconds, encode_seconds, len(body)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3, help='أفضل زمن من عدة تكرارات')
+    args = parser.parse_args()
+
+    print(f'rows: {args.rows}')
+    print(f"{'encoder':>8} {'to_dict ms':>11} {'rows ms':>8} {'encode ms':>10} {'to_dict+enc':>12} {'rows+enc':>9} {'KB':>7}")
+    for name, legacy, rows, encode, size in run(args.rows, args.repeat):
+        print(f'{name:>8} {legacy * 1000:>11.1f} {rows * 1000:>8.1f} {encode * 1000:>10.1f} '
+              f'{(legacy + encode) * 1000:>12.1f} {(rows + encode) * 1000:>9.1f} {size / 1024:>7.0f}')
+
+
+if __name__ == '__main__':
+    main()
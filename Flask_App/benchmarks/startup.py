@@ -0,0 +1,108 @@
+"""
+قياس زمن إقلاع العامل: كل تشغيل في عملية Python جديدة كما يقلع عامل gunicorn
+لكل تشغيل: زمن import app، زمن create_app، عدد اتصالات قاعدة البيانات المفتوحة أثناء الإقلاع،
+وزمن أول طلب (تسجيل الدخول، أول اتصال بقاعدة البيانات)
+الوضع seed-at-boot يضيف upgrade_schema و create_default_admin إلى الإقلاع كما كان كل عامل يفعل سابقاً
+
+    python -m benchmarks.startup --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.endpoints import ADMIN_CREDENTIALS
+
+# يُنفّذ في عملية جديدة ويطبع النتائج بصيغة JSON في آخر سطر
+WORKER_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+
+# قبل create_app: أي اتصال أثناء الإقلاع يُسجل
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = []
+event.listen(Pool, 'connect', lambda *args: connections.append(time.perf_counter()))
+listening = time.perf_counter()
+application = module.create_app({'SCHEDULER_ENABLED': False})
+if SEED_AT_BOOT:
+    from auth import create_default_admin
+    from migrations import upgrade_schema
+    with application.app_context():
+        upgrade_schema()
+        create_default_admin()
+created = time.perf_counter()
+boot_connections = len(connections)
+
+client = application.test_client()
+response = client.post('/auth/login', json=CREDENTIALS)
+first_request = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - listening) * 1000,
+    'boot_ms': (created - started) * 1000,
+    'boot_connections': boot_connections,
+    'first_request_ms': (first_request - created) * 1000,
+}))
+'''
+
+
+def prepare_database(database_url):
+    """إنشاء الجداول والمستخدم الافتراضي مرة واحدة (كما يفعل flask init-db و flask seed)"""
+    subprocess.run(
+        [sys.executable, '-c',
+         'from app import create_app\n'
+         'from auth import create_default_admin\n'
+         'from migrations import upgrade_schema\n'
+         "application = create_app({'SCHEDULER_ENABLED': False})\n"
+         'with application.app_context():\n'
+         '    upgrade_schema()\n'
+         '    create_default_admin()\n'],
+        env=dict(os.environ, DATABASE_URL=database_url), check=True, capture_output=True
+    )
+
+
+def boot_once(database_url, seed_at_boot):
+    script = WORKER_SCRIPT.replace('SEED_AT_BOOT', repr(seed_at_boot)).replace('CREDENTIALS', repr(ADMIN_CREDENTIALS))
+    result = subprocess.run([sys.executable, '-c', script], env=dict(os.environ, DATABASE_URL=database_url),
+                            check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    keys = ('import_ms', 'create_app_ms', 'boot_ms', 'first_request_ms')
+    summary = {key: round(statistics.median(run[key] for run in runs), 1) for key in keys}
+    summary['boot_connections'] = max(run['boot_connections'] for run in runs)
+    summary['status'] = runs[-1]['status']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--database', help='قاعدة بيانات موجودة (وإلا تُنشأ قاعدة مؤقتة)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database or 'sqlite:///' + os.path.join(directory, 'startup.db')
+        if args.database is None:
+            prepare_database(database_url)
+
+        print(f"{'mode':>14} {'import ms':>10} {'create ms':>10} {'boot ms':>9} {'boot conn':>10} "
+              f"{'1st req ms':>11} {'status':>7}")
+        for mode, seed_at_boot in (('factory', False), ('seed-at-boot', True)):
+            summary = summarize([boot_once(database_url, seed_at_boot) for _ in range(args.runs)])
+            print(f"{mode:>14} {summary['import_ms']:>10.1f} {summary['create_app_ms']:>10.1f} "
+                  f"{summary['boot_ms']:>9.1f} {summary['boot_connections']:>10} "
+                  f"{summary['first_request_ms']:>11.1f} {summary['status']:>7}")
+
+
+if __name__ == '__main__':
+    main()
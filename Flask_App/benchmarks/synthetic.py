@@ -0,0 +1,202 @@
+"""
+مولّد بيانات أسطول اصطناعية حتمية لجميع جداول models.py
+نفس البذرة وتاريخ المرجع وأحجام البيانات تعطي نفس الصفوف تماماً، لذلك تصلح للمقارنة بين التشغيلات
+
+    python -m benchmarks.synthetic --database sqlite:///instance/bench.db --scale large
+    python -m benchmarks.synthetic --database sqlite:///instance/bench.db --trucks 1000 --drivers 3000 --entries 5000000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import create_bench_app
+from models import db, Truck, Driver, Shipment, Revenue, Expense, MaintenanceRecord, Notification
+from rollup import rebuild_rollup
+
+# أحجام جاهزة: entries هو مجموع صفوف الإيرادات والمصاريف
+SCALES = {
+    'small': {'trucks': 50, 'drivers': 150, 'entries': 50_000, 'shipments': 10_000},
+    'medium': {'trucks': 1000, 'drivers': 3000, 'entries': 500_000, 'shipments': 100_000},
+    'large': {'trucks': 1000, 'drivers': 3000, 'entries': 5_000_000, 'shipments': 500_000},
+}
+
+CHUNK_SIZE = 50000
+# نسبة الإيرادات من entries (الباقي مصاريف)
+REVENUE_SHARE = 0.4
+
+TRUCK_TYPES = ('قاطرة', 'مقطورة', 'شاحنة مبردة', 'صهريج')
+TRUCK_STATUSES = ('active',) * 8 + ('maintenance', 'stopped')
+DRIVER_STATUSES = ('active',) * 9 + ('inactive',)
+SHIPMENT_STATUSES = ('delivered',) * 6 + ('in_transit', 'in_transit', 'pending', 'pending')
+EXPENSE_TYPES = ('fuel',) * 5 + ('maintenance', 'maintenance', 'salary', 'fine', 'other')
+MAINTENANCE_TYPES = ('تغيير زيت', 'إطارات', 'فرامل', 'فحص دوري', 'محرك')
+NOTIFICATION_TYPES = ('maintenance', 'loss', 'performance', 'info')
+CITIES = ('الرياض', 'جدة', 'الدمام', 'مكة', 'المدينة', 'تبوك', 'أبها', 'حائل', 'القصيم', 'جازان')
+CARGO = ('مواد بناء', 'مواد غذائية', 'أجهزة كهربائية', 'حديد', 'أسمنت', 'مشتقات نفطية', 'أثاث')
+
+
+def default_anchor():
+    """تاريخ المرجع الافتراضي: منتصف ليل اليوم، فتقع البيانات ضمن فترات التحليلات الحالية"""
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def _insert_chunks(model, count, make_row):
+    """إدراج count صفاً على دفعات، make_row(i) يعيد قاموس الصف"""
+    for offset in range(0, count, CHUNK_SIZE):
+        db.session.execute(db.insert(model), [make_row(i) for i in range(offset, min(count, offset + CHUNK_SIZE))])
+        db.session.commit()
+
+
+def generate(trucks, drivers, entries, shipments, days=365, seed=42, anchor=None,
+             maintenance=None, notifications=None, log=None):
+    """
+    تعبئة قاعدة البيانات الحالية (داخل app_context) ببيانات حتمية
+    التواريخ موزعة على آخر days يوماً قبل anchor
+    يعيد عدد الصفوف لكل جدول
+    """
+    rng = random.Random(seed)
+    anchor = anchor or default_anchor()
+    span_minutes = days * 24 * 60
+    maintenance = trucks * 4 if maintenance is None else maintenance
+    notifications = trucks * 2 if notifications is None else notifications
+    revenue_count = int(entries * REVENUE_SHARE)
+    expense_count = entries - revenue_count
+    log = log or (lambda message: None)
+
+    def moment():
+        return anchor - timedelta(minutes=rng.randrange(span_minutes))
+
+    counts = {}
+
+    def step(model, count, make_row):
+        started = time.perf_counter()
+        _insert_chunks(model, count, make_row)
+        counts[model.__tablename__] = count
+        log(f'{model.__tablename__}: {count} ({time.perf_counter() - started:.1f} ث)')
+
+    step(Truck, trucks, lambda i: {
+        'truck_type': rng.choice(TRUCK_TYPES), 'plate_number': f'SYN-{i:06d}',
+        'status': rng.choice(TRUCK_STATUSES),
+        'last_maintenance_date': moment() if rng.random() < 0.8 else None,
+        'total_shipments': 0, 'created_at': anchor - timedelta(days=days), 'updated_at': anchor
+    })
+    # معظم السائقين مرتبطون بقاطرة (نحو 10% بلا قاطرة)
+    step(Driver, drivers, lambda i: {
+        'name': f'سائق {i + 1}', 'phone_number': f'05{i:08d}',
+        'salary': float(rng.randrange(3000, 9000, 250)),
+        'truck_id': rng.randint(1, trucks) if rng.random() < 0.9 else None,
+        'status': rng.choice(DRIVER_STATUSES),
+        'created_at': anchor - timedelta(days=days), 'updated_at': anchor
+    })
+
+    shipment_trucks = [0] * (trucks + 1)
+
+    def shipment_row(i):
+        truck_id = rng.randint(1, trucks)
+        shipment_trucks[truck_id] += 1
+        shipped_at = moment()
+        return {
+            'truck_id': truck_id, 'driver_id': rng.randint(1, drivers),
+            'from_location': rng.choice(CITIES), 'to_location': rng.choice(CITIES),
+            'cargo': rng.choice(CARGO), 'revenue': round(rng.uniform(500, 8000), 2),
+            'status': rng.choice(SHIPMENT_STATUSES), 'shipment_date': shipped_at,
+            'created_at': shipped_at, 'updated_at': shipped_at
+        }
+
+    step(Shipment, shipments, shipment_row)
+    # عدد الشحنات المخزن في القاطرة كما يحدّثه create_shipment
+    truck_table = Truck.__table__
+    db.session.execute(
+        truck_table.update().where(truck_table.c.id == db.bindparam('truck')).values(
+            total_shipments=db.bindparam('count'), updated_at=anchor),
+        [{'truck': truck_id, 'count': count} for truck_id, count in enumerate(shipment_trucks) if count]
+    )
+    db.session.commit()
+
+    def revenue_row(i):
+        received_at = moment()
+        return {
+            'truck_id': rng.randint(1, trucks),
+            'shipment_id': rng.randint(1, shipments) if shipments and rng.random() < 0.5 else None,
+            'amount': round(rng.uniform(200, 8000), 2), 'revenue_date': received_at,
+            'description': None, 'created_at': received_at, 'updated_at': received_at
+        }
+
+    def expense_row(i):
+        spent_at = moment()
+        return {
+            'truck_id': rng.randint(1, trucks),
+            'driver_id': rng.randint(1, drivers) if rng.random() < 0.7 else None,
+            'expense_type': rng.choice(EXPENSE_TYPES), 'amount': round(rng.uniform(20, 3000), 2),
+            'expense_date': spent_at, 'description': None, 'created_at': spent_at, 'updated_at': spent_at
+        }
+
+    step(Revenue, revenue_count, revenue_row)
+    step(Expense, expense_count, expense_row)
+
+    def maintenance_row(i):
+        done_at = moment()
+        return {
+            'truck_id': rng.randint(1, trucks), 'maintenance_type': rng.choice(MAINTENANCE_TYPES),
+            'cost': round(rng.uniform(200, 15000), 2), 'maintenance_date': done_at,
+            'description': None, 'created_at': done_at, 'updated_at': done_at
+        }
+
+    def notification_row(i):
+        notification_type = rng.choice(NOTIFICATION_TYPES)
+        return {
+            'truck_id': rng.randint(1, trucks), 'title': f'إشعار {notification_type}',
+            'message': 'إشعار مولّد لأغراض القياس', 'notification_type': notification_type,
+            'is_read': rng.random() < 0.6, 'created_at': moment()
+        }
+
+    step(MaintenanceRecord, maintenance, maintenance_row)
+    step(Notification, notifications, notification_row)
+
+    # الإدراج المجمّع لا يمر بأحداث الجلسة، لذلك يُبنى الملخص اليومي مرة واحدة
+    started = time.perf_counter()
+    rebuild_rollup()
+    log(f'daily_truck_financials ({time.perf_counter() - started:.1f} ث)')
+    return counts
+
+
+def add_arguments(parser):
+    """معاملات حجم البيانات المشتركة بين المولّد ومقياس المسارات"""
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='حجم جاهز')
+    parser.add_argument('--trucks', type=int, help='عدد القواطر (يتجاوز --scale)')
+    parser.add_argument('--drivers', type=int, help='عدد السائقين')
+    parser.add_argument('--entries', type=int, help='مجموع صفوف الإيرادات والمصاريف')
+    parser.add_argument('--shipments', type=int, help='عدد الشحنات')
+    parser.add_argument('--days', type=int, default=365, help='الفترة الزمنية للبيانات بالأيام')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=datetime.fromisoformat, help='تاريخ المرجع (الافتراضي اليوم)')
+
+
+def scale_from_args(args):
+    """أحجام الجداول من --scale مع تجاوز أي قيمة محددة صراحة"""
+    scale = dict(SCALES[args.scale])
+    for name in scale:
+        if getattr(args, name) is not None:
+            scale[name] = getattr(args, name)
+    return scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', required=True, help='رابط قاعدة البيانات (يجب أن تكون فارغة)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    scale = scale_from_args(args)
+    app = create_bench_app(args.database)
+    with app.app_context():
+        if db.session.query(Truck.id).first() is not None:
+            parser.error('قاعدة البيانات تحتوي على قواطر، استخدم قاعدة بيانات فارغة')
+        print(f'scale: {scale}, days: {args.days}, seed: {args.seed}')
+        generate(days=args.days, seed=args.seed, anchor=args.anchor, log=print, **scale)
+
+
+if __name__ == '__main__':
+    main()
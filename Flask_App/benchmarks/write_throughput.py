@@ -0,0 +1,100 @@
+"""
+اختبار حمل للكتابة المتزامنة على SQLite
+عدة عمليات (مثل عمال gunicorn) تضيف مصاريف وتقرأ المجاميع على نفس ملف قاعدة البيانات
+يقارن الإعدادات الافتراضية (rollback journal) بإعدادات database.py (WAL)
+
+    python -m benchmarks.write_throughput --workers 4 --writes 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks import create_bench_app
+from database import DEFAULT_SQLITE_PRAGMAS
+from models import db, Truck, Expense
+import rollup  # noqa: F401  تسجيل تحديث الملخص اليومي عند كل flush كما في التطبيق
+
+# الإعدادات المقارنة: (الاسم، PRAGMA لكل اتصال)
+CONFIGURATIONS = [
+    ('default', {}),
+    ('wal', DEFAULT_SQLITE_PRAGMAS),
+]
+
+
+def _worker(database_uri, pragmas, writes, worker_id):
+    """إضافة writes مصروفاً (commit لكل مصروف) مع قراءة المجموع بعد كل كتابة"""
+    app = create_bench_app(database_uri, SQLITE_PRAGMAS=pragmas)
+    latencies = []
+    errors = 0
+    with app.app_context():
+        # الزمن يُقاس داخل العمليات لاستبعاد زمن تشغيلها واستيراد الوحدات
+        began = time.time()
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                db.session.add(Expense(
+                    truck_id=worker_id % 5 + 1, driver_id=None, expense_type='fuel',
+                    amount=10 + i % 7, expense_date=datetime.utcnow()
+                ))
+                db.session.commit()
+                db.session.query(db.func.sum(Expense.amount)).filter(
+                    Expense.truck_id == worker_id % 5 + 1
+                ).scalar()
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        finished = time.time()
+        db.engine.dispose()
+    return latencies, errors, began, finished
+
+
+def run(workers, writes, pragmas):
+    """تشغيل الاختبار على ملف قاعدة بيانات جديد، يعيد (عمليات/ثانية، p95 بالمللي ثانية، الأخطاء)"""
+    with tempfile.TemporaryDirectory() as directory:
+        database_uri = 'sqlite:///' + os.path.join(directory, 'bench.db')
+        app = create_bench_app(database_uri, SQLITE_PRAGMAS=pragmas)
+        with app.app_context():
+            now = datetime.utcnow()
+            db.session.execute(db.insert(Truck), [
+                {'truck_type': 'قاطرة', 'plate_number': f'LOAD-{i}', 'status': 'active',
+                 'total_shipments': 0, 'created_at': now, 'updated_at': now}
+                for i in range(5)
+            ])
+            db.session.commit()
+            db.engine.dispose()
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(_worker, database_uri, pragmas, writes, i) for i in range(workers)]
+            results = [future.result() for future in futures]
+
+    elapsed = max(result[3] for result in results) - min(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0
+    return (len(latencies) - errors) / elapsed, p95, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4, help='عدد العمليات المتزامنة')
+    parser.add_argument('--writes', type=int, default=300, help='عدد الكتابات لكل عملية')
+    args = parser.parse_args()
+
+    print(f"{'config':>8} {'writes/s':>9} {'p95 ms':>8} {'errors':>7}")
+    for name, pragmas in CONFIGURATIONS:
+        throughput, p95, errors = run(args.workers, args.writes, pragmas)
+        print(f'{name:>8} {throughput:>9.1f} {p95:>8.1f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
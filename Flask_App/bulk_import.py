@@ -0,0 +1,257 @@
+"""
+الاستيراد المجمّع للشحنات والإيرادات والمصاريف
+- POST /api/<resource>/bulk يقبل مصفوفة JSON أو ملف CSV (Content-Type: text/csv)
+- التحقق من كل صف عبر DataValidation وإرجاع أخطاء كل صف على حدة
+- القاطرات والسائقون والشحنات المشار إليها يُتحقق من وجودها لكل دفعة باستعلام واحد لكل جدول
+- الإدراج على دفعات (executemany) في معاملات منفصلة لكل دفعة
+"""
+
+import csv
+import io
+import math
+from collections import Counter
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+
+from advanced_features import DataValidation
+from cache import mark_changed
+from models import db, Truck, Driver, Shipment, Revenue, Expense
+from reports import invalidate_backdated
+from rollup import REVENUE_KEY, add_delta, apply_deltas, new_deltas
+from timeseries import mark_closed_periods_changed
+
+bulk_bp = Blueprint('bulk', __name__, url_prefix='/api')
+
+BULK_CHUNK_SIZE = 5000
+
+# الحقول التي تشير إلى صفوف أخرى: (النموذج، رسالة الخطأ إن لم يوجد المعرف)
+REFERENCES = {
+    'truck_id': (Truck, 'القاطرة {} غير موجودة'),
+    'driver_id': (Driver, 'السائق {} غير موجود'),
+    'shipment_id': (Shipment, 'الشحنة {} غير موجودة'),
+}
+
+
+class BulkResource:
+    """وصف مورد قابل للاستيراد: النموذج، الحقول وأنواعها، ودالة التحقق"""
+
+    def __init__(self, model, fields, date_field, validator, defaults=None):
+        self.model = model
+        self.fields = fields
+        self.date_field = date_field
+        self.validator = validator
+        self.defaults = defaults or {}
+
+
+RESOURCES = {
+    'shipments': BulkResource(
+        Shipment,
+        fields={
+            'truck_id': int, 'driver_id': int, 'from_location': str, 'to_location': str,
+            'cargo': str, 'revenue': float, 'status': str
+        },
+        date_field='shipment_date',
+        validator=DataValidation.validate_shipment_data,
+        defaults={'status': 'pending'}
+    ),
+    'revenues': BulkResource(
+        Revenue,
+        fields={'truck_id': int, 'shipment_id': int, 'amount': float, 'description': str},
+        date_field='revenue_date',
+        validator=DataValidation.validate_revenue_data
+    ),
+    'expenses': BulkResource(
+        Expense,
+        fields={
+            'truck_id': int, 'driver_id': int, 'expense_type': str,
+            'amount': float, 'description': str
+        },
+        date_field='expense_date',
+        validator=DataValidation.validate_expense_data
+    ),
+}
+
+
+def read_rows():
+    """قراءة الصفوف من جسم الطلب: CSV كتدفق، أو مصفوفة JSON"""
+    if request.mimetype == 'text/csv':
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig')
+        return csv.DictReader(stream)
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return None
+    return data
+
+
+def convert_row(resource, data, now):
+    """تحويل صف خام إلى قيم الأعمدة، أو إرجاع قائمة أخطاء"""
+    if not isinstance(data, dict):
+        return None, ['الصف يجب أن يكون كائناً']
+
+    try:
+        errors = resource.validator(data)
+    except (TypeError, ValueError):
+        errors = ['قيمة رقمية غير صالحة']
+    if errors:
+        return None, errors
+
+    row = {}
+    try:
+        for name, field_type in resource.fields.items():
+            value = data.get(name)
+            if value in (None, ''):
+                row[name] = resource.defaults.get(name)
+            else:
+                row[name] = field_type(value)
+            if field_type is float and row[name] is not None and not math.isfinite(row[name]):
+                errors.append(f'الحقل {name} يجب أن يكون رقماً محدوداً')
+            if row[name] is None and not resource.model.__table__.c[name].nullable:
+                errors.append(f'الحقل {name} مطلوب')
+
+        entry_date = data.get(resource.date_field)
+        row[resource.date_field] = datetime.fromisoformat(entry_date) if entry_date else now
+    except (TypeError, ValueError) as e:
+        return None, [f'قيمة غير صالحة: {e}']
+    if errors:
+        return None, errors
+
+    row['created_at'] = now
+    row['updated_at'] = now
+    return row, []
+
+
+def existing_references(resource, rows):
+    """المعرفات الموجودة فعلاً لكل حقل إشارة في صفوف الدفعة"""
+    existing = {}
+    for name, (model, _) in REFERENCES.items():
+        if name not in resource.fields:
+            continue
+        ids = {row[name] for row in rows if row[name] is not None}
+        existing[name] = {
+            id_ for id_, in db.session.query(model.id).filter(model.id.in_(ids))
+        } if ids else set()
+    return existing
+
+
+def check_references(row, existing):
+    """التحقق من وجود القاطرة والسائق والشحنة المشار إليها"""
+    errors = []
+    for name, ids in existing.items():
+        if row[name] is not None and row[name] not in ids:
+            errors.append(REFERENCES[name][1].format(row[name]))
+    return errors
+
+
+def rollup_deltas(resource, rows):
+    """فروق الملخص اليومي للصفوف المدرجة (الإدراج المجمّع لا يمر بأحداث الجلسة)"""
+    deltas = new_deltas()
+    if resource.model is Revenue:
+        for row in rows:
+            add_delta(deltas, (row['truck_id'], row['revenue_date'].date(), REVENUE_KEY), row['amount'], 0, 1)
+    elif resource.model is Expense:
+        for row in rows:
+            add_delta(deltas, (row['truck_id'], row['expense_date'].date(), row['expense_type']), 0, row['amount'], 1)
+    return deltas
+
+
+def insert_chunk(resource, rows):
+    """إدراج دفعة واحدة في معاملة مستقلة"""
+    db.session.execute(db.insert(resource.model), rows)
+    tables = [resource.model.__tablename__]
+
+    if resource.model is Shipment:
+        # تحديث عدد الشحنات لكل قاطرة بعبارة واحدة
+        counts = Counter(row['truck_id'] for row in rows)
+        db.session.execute(
+            db.update(Truck.__table__).where(Truck.__table__.c.id == db.bindparam('truck')).values(
+                total_shipments=Truck.__table__.c.total_shipments + db.bindparam('added')
+            ),
+            [{'truck': truck_id, 'added': count} for truck_id, count in counts.items()]
+        )
+        tables.append(Truck.__tablename__)
+    else:
+        deltas = rollup_deltas(resource, rows)
+        apply_deltas(db.session.connection(), deltas)
+        invalidate_backdated(db.session.connection(), (day for _, day, _ in deltas))
+
+    mark_closed_periods_changed(db.session, (row[resource.date_field] for row in rows))
+    mark_changed(db.session, *tables)
+    db.session.commit()
+
+
+def import_rows(resource, rows):
+    """
+    استيراد الصفوف على دفعات
+    يعيد (عدد الصفوف المدرجة، قائمة الأخطاء لكل صف)
+    """
+    now = datetime.utcnow()
+
+    inserted = 0
+    errors = []
+    pending = []
+
+    def flush_chunk():
+        nonlocal inserted
+        if not pending:
+            return
+        existing = existing_references(resource, [row for _, row in pending])
+        chunk = []
+        chunk_rows = []
+        for index, row in pending:
+            row_errors = check_references(row, existing)
+            if row_errors:
+                errors.append({'row': index, 'errors': row_errors})
+            else:
+                chunk.append(row)
+                chunk_rows.append(index)
+        pending.clear()
+        if not chunk:
+            return
+        try:
+            insert_chunk(resource, chunk)
+            inserted += len(chunk)
+        except Exception as e:
+            db.session.rollback()
+            message = f'فشل حفظ الدفعة: {e.__class__.__name__}'
+            errors.extend({'row': index, 'errors': [message]} for index in chunk_rows)
+
+    for index, data in enumerate(rows, start=1):
+        row, row_errors = convert_row(resource, data, now)
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+            continue
+
+        pending.append((index, row))
+        if len(pending) >= BULK_CHUNK_SIZE:
+            flush_chunk()
+
+    flush_chunk()
+    errors.sort(key=lambda error: error['row'])
+    return inserted, errors
+
+
+@bulk_bp.route('/<resource_name>/bulk', methods=['POST'])
+@login_required
+def bulk_import(resource_name):
+    """استيراد مجمّع لمصفوفة JSON أو ملف CSV"""
+    resource = RESOURCES.get(resource_name)
+    if resource is None:
+        return jsonify({'error': 'المورد غير مدعوم للاستيراد المجمّع'}), 404
+
+    rows = read_rows()
+    if rows is None:
+        return jsonify({'error': 'يجب إرسال مصفوفة JSON أو ملف CSV'}), 400
+
+    try:
+        inserted, errors = import_rows(resource, rows)
+    except (csv.Error, UnicodeDecodeError) as e:
+        return jsonify({'error': f'ملف CSV غير صالح: {e}'}), 400
+
+    return jsonify({
+        'inserted': inserted,
+        'failed': len(errors),
+        'errors': errors
+    }), 201 if inserted else 400
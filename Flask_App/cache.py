@@ -0,0 +1,199 @@
+"""
+طبقة التخزين المؤقت
+- TTLCache: ذاكرة مؤقتة داخل العملية بمدة صلاحية
+- LRUCache: ذاكرة داخل العملية بحجم أقصى ومدة صلاحية، لكائنات Python التي لا تُحوّل إلى JSON
+- RedisCache: ذاكرة مشتركة بين العمليات (اختيارية، تتطلب مكتبة redis و REDIS_URL)
+- إبطال المفاتيح تلقائياً عند حفظ تغييرات على الجداول التي تعتمد عليها
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+from models import db
+
+try:
+    import redis
+except ImportError:  # المكتبة اختيارية
+    redis = None
+
+
+class TTLCache:
+    """ذاكرة مؤقتة داخل العملية، آمنة للاستخدام من عدة خيوط"""
+
+    def __init__(self, default_ttl=60):
+        self.default_ttl = default_ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LRUCache:
+    """
+    ذاكرة مؤقتة داخل العملية بحد أقصى لعدد المفاتيح (يُحذف الأقل استخداماً) ومدة صلاحية
+    آمنة للاستخدام من عدة خيوط، والقيم تُخزن كما هي دون تحويل
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """ذاكرة مؤقتة مشتركة عبر Redis (القيم تُخزن بصيغة JSON)"""
+
+    def __init__(self, url, default_ttl=60, prefix='trucks:'):
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+def init_cache(app):
+    """اختيار نوع الذاكرة المؤقتة حسب الإعدادات"""
+    ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+    url = app.config.get('CACHE_REDIS_URL')
+    if url and redis is not None:
+        backend = RedisCache(url, default_ttl=ttl)
+    else:
+        backend = TTLCache(default_ttl=ttl)
+    app.extensions['cache'] = backend
+    return backend
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def cache_is_shared():
+    """هل الذاكرة المؤقتة مشتركة بين العمليات (Redis) أم خاصة بهذه العملية"""
+    return isinstance(get_cache(), RedisCache)
+
+
+# ============ الإبطال عند تغيير البيانات ============
+
+# المفتاح -> الجداول التي يعتمد عليها
+_dependencies = {}
+
+# دوال تُستدعى بعد كل commit يغيّر جداولاً: fn(session, tables)
+_commit_listeners = []
+
+
+def invalidate_on_change(key, tables):
+    """تسجيل مفتاح يُحذف من الذاكرة المؤقتة عند حفظ تغييرات على أي من الجداول"""
+    _dependencies[key] = set(tables)
+
+
+def on_commit(fn):
+    """تسجيل دالة تُستدعى بعد حذف المفاتيح المتأثرة بكل commit"""
+    _commit_listeners.append(fn)
+    return fn
+
+
+def mark_changed(session, *tables):
+    """
+    تسجيل جداول تغيّرت في الجلسة الحالية
+    تُستدعى يدوياً للكتابات التي لا تمر بكائنات ORM (مثل الإدراج المجمّع)
+    """
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def invalidate_tables(tables):
+    """حذف المفاتيح المعتمدة على الجداول المحددة"""
+    if not has_app_context() or 'cache' not in current_app.extensions:
+        return
+    cache = get_cache()
+    for key, dependencies in _dependencies.items():
+        if dependencies & tables:
+            cache.delete(key)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_changed_tables(session, flush_context):
+    tables = {obj.__table__.name for obj in session.new | session.dirty | session.deleted}
+    if tables:
+        mark_changed(session, *tables)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        invalidate_tables(tables)
+        for listener in _commit_listeners:
+            listener(session, tables)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes_after_rollback(session):
+    session.info.pop('changed_tables', None)
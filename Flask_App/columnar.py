@@ -0,0 +1,212 @@
+"""
+محرك تحليلات عمودي
+- جلب الأعمدة المطلوبة فقط في استعلام واحد إلى قوائم Python (أو مصفوفات numpy إذا ثُبتت يدوياً)
+- تجميع حسب عدة أبعاد في مرور واحد (مثل النوع × القاطرة × الشهر) ثم اشتقاق المجاميع الجزئية منه
+- مقاييس الشحنات لكل سائق أو قاطرة (العدد، المُسلّم، الإيرادات) دون تحميل كائنات ORM
+- المحرك الافتراضي مرور واحد بحلقات Python (numpy ليست ضمن requirements.txt)، و numpy تسرّع التجميع
+  فقط إذا كانت مثبتة في البيئة
+"""
+
+from itertools import repeat
+
+from models import db, Shipment
+
+# numpy تُستورد عند أول تحليل وليس عند بدء التطبيق (False: لم تُستورد بعد)
+_numpy = False
+
+# عدد الصفوف في كل دفعة عند الجلب من قاعدة البيانات
+FETCH_PARTITION_SIZE = 50000
+
+DATE_BUCKETS = ('day', 'week', 'month')
+
+_POSTGRES_BUCKET_FORMATS = {'day': 'YYYY-MM-DD', 'week': 'YYYY-MM-DD', 'month': 'YYYY-MM'}
+
+
+def date_bucket(column, unit='month'):
+    """
+    تعبير SQL يحوّل التاريخ إلى نص بداية فترته: اليوم (2024-05-17)، الأسبوع (تاريخ يوم الاثنين)، الشهر (2024-05)
+    """
+    if unit not in DATE_BUCKETS:
+        raise ValueError(f"وحدة الفترة غير مدعومة، الوحدات المتاحة: {', '.join(DATE_BUCKETS)}")
+
+    if db.engine.dialect.name == 'sqlite':
+        if unit == 'day':
+            return db.func.date(column)
+        if unit == 'week':
+            # أول أحد في الأسبوع أو بعده، ثم الرجوع إلى الاثنين
+            return db.func.date(column, 'weekday 0', '-6 days')
+        return db.func.strftime('%Y-%m', column)
+    return db.func.to_char(db.func.date_trunc(unit, column), _POSTGRES_BUCKET_FORMATS[unit])
+
+
+def get_numpy():
+    """مكتبة numpy، أو None إذا لم تكن مثبتة"""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # numpy اختيارية، والحساب يتم بحلقات Python في مرور واحد
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def _to_array(values):
+    np = get_numpy()
+    if np is None:
+        return values
+    return np.asarray(values)
+
+
+def _factorize(values):
+    """ترميز عمود إلى (القيم المميزة، رمز كل صف)"""
+    np = get_numpy()
+    if values.dtype == object:
+        # أعمدة تحتوي على None لا يمكن ترتيبها مع np.unique
+        index = {}
+        codes = np.fromiter((index.setdefault(value, len(index)) for value in values.tolist()),
+                            dtype=np.intp, count=len(values))
+        return list(index), codes
+    uniques, codes = np.unique(values, return_inverse=True)
+    return uniques.tolist(), codes
+
+
+class ColumnFrame:
+    """جدول عمودي: اسم العمود ← قائمة Python (أو مصفوفة numpy إذا كانت مثبتة)"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def fetch(cls, *columns, where=()):
+        """
+        جلب الأعمدة في استعلام واحد، على دفعات، وتحويل الصفوف إلى أعمدة
+        اسم كل عمود هو اسمه في النموذج أو الاسم المعطى عبر label()
+        """
+        names = [column.key for column in columns]
+        statement = db.select(*columns).where(*where).execution_options(yield_per=FETCH_PARTITION_SIZE)
+        data = [[] for _ in names]
+        for partition in db.session.connection().execute(statement).partitions():
+            for values, column in zip(data, zip(*partition)):
+                values.extend(column)
+        return cls({name: _to_array(values) for name, values in zip(names, data)})
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def add_flag(self, name, column, value):
+        """إضافة عمود 0/1 يساوي 1 حيث column == value (لحساب النسب بالتجميع)"""
+        values = self.columns[column]
+        np = get_numpy()
+        if np is not None:
+            self.columns[name] = (values == value).astype(np.float64)
+        else:
+            self.columns[name] = [1.0 if item == value else 0.0 for item in values]
+        return self
+
+    def group_totals(self, keys, values=()):
+        """
+        مجموع كل عمود من values وعدد الصفوف لكل تركيبة من قيم keys، في مرور واحد
+        يعيد GroupTotals
+        """
+        keys = tuple(keys)
+        values = tuple(values)
+        if not len(self):
+            return GroupTotals(keys, values, {})
+        np = get_numpy()
+        if np is None:
+            return self._group_totals_python(keys, values)
+
+        levels, codes = zip(*(_factorize(self.columns[key]) for key in keys))
+        shape = tuple(len(level) for level in levels)
+        combined = np.ravel_multi_index(codes, shape) if len(keys) > 1 else codes[0]
+        groups, inverse = np.unique(combined, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(groups)).tolist()
+        sums = [np.bincount(inverse, weights=self.columns[value], minlength=len(groups)).tolist()
+                for value in values]
+
+        rows = {}
+        group_codes = [codes.tolist() for codes in np.unravel_index(groups, shape)]
+        for i, group in enumerate(zip(*group_codes)):
+            key = tuple(level[code] for level, code in zip(levels, group))
+            rows[key] = [column[i] for column in sums] + [counts[i]]
+        return GroupTotals(keys, values, rows)
+
+    def _group_totals_python(self, keys, values):
+        width = len(values)
+        value_rows = zip(*(self.columns[value] for value in values)) if values else repeat(())
+        rows = {}
+        for key, amounts in zip(zip(*(self.columns[key] for key in keys)), value_rows):
+            entry = rows.get(key)
+            if entry is None:
+                entry = rows[key] = [0.0] * width + [0]
+            for i, amount in enumerate(amounts):
+                entry[i] += amount
+            entry[width] += 1
+        return GroupTotals(keys, values, rows)
+
+
+class GroupTotals:
+    """
+    نتيجة التجميع: {(قيم المفاتيح): [مجموع كل عمود..., العدد]}
+    المجاميع حسب جزء من المفاتيح تُشتق من النتيجة دون الرجوع إلى الصفوف
+    """
+
+    def __init__(self, keys, values, rows):
+        self.keys = keys
+        self.values = values
+        self.rows = rows
+
+    def rollup(self, *keys):
+        """التجميع حسب جزء من المفاتيح (مثل النوع فقط من النوع × القاطرة × الشهر)"""
+        positions = [self.keys.index(key) for key in keys]
+        rows = {}
+        for key, entry in self.rows.items():
+            sub_key = tuple(key[position] for position in positions)
+            target = rows.get(sub_key)
+            if target is None:
+                rows[sub_key] = list(entry)
+            else:
+                for i, amount in enumerate(entry):
+                    target[i] += amount
+        return GroupTotals(keys, self.values, rows)
+
+    def sums(self, value, key):
+        """{قيمة المفتاح: مجموع value} لمفتاح واحد"""
+        position = self.values.index(value)
+        return {sub_key[0]: float(entry[position]) for sub_key, entry in self.rollup(key).rows.items()}
+
+    def counts(self, key):
+        """{قيمة المفتاح: عدد الصفوف} لمفتاح واحد"""
+        return {sub_key[0]: int(entry[-1]) for sub_key, entry in self.rollup(key).rows.items()}
+
+    def total(self, value):
+        position = self.values.index(value)
+        return float(sum(entry[position] for entry in self.rows.values()))
+
+
+def shipment_metrics(group_by, start_date, entity_id=None):
+    """
+    مقاييس الشحنات لكل سائق أو قاطرة منذ start_date في استعلام واحد
+    group_by: 'driver_id' أو 'truck_id'
+    يعيد {المعرف: {'total_shipments', 'delivered_shipments', 'revenue'}}
+    """
+    key_column = getattr(Shipment, group_by)
+    where = [Shipment.shipment_date >= start_date]
+    if entity_id is not None:
+        where.append(key_column == entity_id)
+
+    shipments = ColumnFrame.fetch(key_column, Shipment.status, Shipment.revenue, where=where)
+    shipments.add_flag('delivered', 'status', 'delivered')
+    groups = shipments.group_totals((group_by,), ('delivered', 'revenue'))
+    return {
+        key[0]: {
+            'total_shipments': int(count),
+            'delivered_shipments': int(delivered),
+            'revenue': float(revenue)
+        }
+        for key, (delivered, revenue, count) in groups.rows.items()
+    }
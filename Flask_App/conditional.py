@@ -0,0 +1,122 @@
+"""
+الطلبات الشرطية (ETag و Last-Modified) لمسارات القوائم والتحليلات
+- لكل جدول رقم إصدار في table_versions يزيد داخل نفس المعاملة مع كل commit يغيّر الجدول
+  (الجداول المتغيرة تُجمع في cache.py من flush ومن mark_changed للكتابات المجمّعة)
+- المسار المعلَّم بـ conditional يقرأ إصدارات جداوله باستعلام واحد صغير، وإذا طابق طلب العميل
+  (If-None-Match أو If-Modified-Since) يعيد 304 دون تنفيذ استعلاماته أو التحويل إلى JSON
+- المسارات التي تعتمد فترتها الافتراضية على الوقت الحالي (آخر 30 يوماً مثلاً) تتغير ETag لها
+  أيضاً كل ETAG_TIME_WINDOW ثانية، ولا تُرسل Last-Modified
+"""
+
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.http import is_resource_modified
+
+from models import db, TableVersion
+
+DEFAULT_TIME_WINDOW = 60
+
+# قواعد البيانات التي تدعم INSERT ... ON CONFLICT DO UPDATE (كما في rollup.py)
+UPSERT_DIALECTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+
+# ============ إصدارات الجداول ============
+
+def bump_versions(connection, tables):
+    """
+    زيادة إصدار الجداول بعبارة واحدة لكل جدول (INSERT ... ON CONFLICT DO UPDATE على SQLite و PostgreSQL)
+    فلا تتسابق أول كتابتين متزامنتين على جدول على إنشاء صفه، وقواعد البيانات الأخرى تحدّث الصف ثم تنشئه
+    """
+    table = TableVersion.__table__
+    now = datetime.utcnow()
+    insert = UPSERT_DIALECTS.get(connection.dialect.name)
+    # ترتيب ثابت حتى لا تتعارض أقفال المعاملات المتزامنة
+    for name in sorted(tables):
+        if insert is not None:
+            statement = insert(table).values(table_name=name, version=1, updated_at=now)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=['table_name'],
+                set_={'version': table.c.version + 1, 'updated_at': statement.excluded.updated_at}
+            ))
+            continue
+        result = connection.execute(
+            table.update().where(table.c.table_name == name).values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(table_name=name, version=1, updated_at=now))
+
+
+def table_versions(tables):
+    """{اسم الجدول: (الإصدار، وقت آخر تعديل)}، والجدول الذي لم يتغير بعد إصداره (0, None)"""
+    table = TableVersion.__table__
+    rows = db.session.execute(
+        db.select(table.c.table_name, table.c.version, table.c.updated_at).where(table.c.table_name.in_(tables))
+    )
+    versions = {name: (0, None) for name in tables}
+    versions.update((name, (version, updated_at)) for name, version, updated_at in rows)
+    return versions
+
+
+@event.listens_for(db.session, 'before_commit')
+def _bump_versions_before_commit(session):
+    # حفظ التعديلات المعلقة أولاً حتى تُسجَّل جداولها في changed_tables
+    session.flush()
+    # الجداول الوهمية (مثل closed_periods في timeseries.py) ليس لها إصدار
+    tables = session.info.get('changed_tables', set()) & set(db.metadata.tables)
+    tables.discard(TableVersion.__tablename__)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+# ============ المسارات الشرطية ============
+
+def _validators(versions, relative):
+    """(ETag، Last-Modified) للطلب الحالي من إصدارات جداوله"""
+    parts = [request.full_path]
+    parts.extend(f'{name}:{version}' for name, (version, _) in sorted(versions.items()))
+    if relative:
+        window = current_app.config.get('ETAG_TIME_WINDOW', DEFAULT_TIME_WINDOW)
+        parts.append(str(int(time.time() // window)))
+        last_modified = None
+    else:
+        last_modified = max((updated_at for _, updated_at in versions.values() if updated_at), default=None)
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest(), last_modified
+
+
+def conditional(*tables, relative=False):
+    """
+    ETag و Last-Modified لمسار GET من إصدارات الجداول التي تعتمد عليها استجابته
+    relative=True للمسارات التي تعتمد فترتها الافتراضية على الوقت الحالي
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config.get('CONDITIONAL_REQUESTS', True) or (
+                    relative and config.get('ETAG_TIME_WINDOW', DEFAULT_TIME_WINDOW) <= 0):
+                return view(*args, **kwargs)
+
+            etag, last_modified = _validators(table_versions(tables), relative)
+            if is_resource_modified(request.environ, etag, last_modified=last_modified):
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # المتصفح يحتفظ بالاستجابة لكن يتحقق منها مع كل طلب
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
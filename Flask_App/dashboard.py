@@ -0,0 +1,71 @@
+"""
+بيانات لوحة التحكم
+- العدّ باستعلامات COUNT ... GROUP BY status بدلاً من تحميل جميع الكائنات
+- نسخة مخزنة مؤقتاً تُبطل تلقائياً عند حفظ أي تغيير على الجداول المعنية
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from cache import get_cache, invalidate_on_change
+from models import db, Truck, Driver, Shipment
+from rollup import get_fleet_totals
+
+DASHBOARD_CACHE_KEY = 'dashboard'
+
+invalidate_on_change(DASHBOARD_CACHE_KEY, ('trucks', 'drivers', 'shipments', 'revenues', 'expenses'))
+
+
+def _count_by_status(model):
+    """عدد السجلات لكل حالة"""
+    rows = db.session.query(model.status, db.func.count(model.id)).group_by(model.status)
+    return dict(rows.all())
+
+
+def compute_dashboard():
+    """حساب بيانات لوحة التحكم من قاعدة البيانات"""
+    trucks = _count_by_status(Truck)
+    drivers = _count_by_status(Driver)
+    shipments = _count_by_status(Shipment)
+    
+    total_trucks = sum(trucks.values())
+    active_trucks = trucks.get('active', 0)
+    maintenance_trucks = trucks.get('maintenance', 0)
+    
+    start_date = datetime.utcnow() - timedelta(days=30)
+    total_revenue, total_expenses = get_fleet_totals(start_date)
+    
+    return {
+        'trucks': {
+            'total': total_trucks,
+            'active': active_trucks,
+            'maintenance': maintenance_trucks,
+            'stopped': total_trucks - active_trucks - maintenance_trucks
+        },
+        'drivers': {
+            'total': sum(drivers.values()),
+            'active': drivers.get('active', 0)
+        },
+        'shipments': {
+            'total': sum(shipments.values()),
+            'pending': shipments.get('pending', 0),
+            'in_transit': shipments.get('in_transit', 0),
+            'delivered': shipments.get('delivered', 0)
+        },
+        'financials': {
+            'revenue': float(total_revenue),
+            'expenses': float(total_expenses),
+            'profit': float(total_revenue - total_expenses)
+        }
+    }
+
+
+def get_dashboard_snapshot():
+    """بيانات لوحة التحكم من الذاكرة المؤقتة، أو حسابها وتخزينها"""
+    cache = get_cache()
+    snapshot = cache.get(DASHBOARD_CACHE_KEY)
+    if snapshot is None:
+        snapshot = compute_dashboard()
+        cache.set(DASHBOARD_CACHE_KEY, snapshot, current_app.config.get('DASHBOARD_CACHE_TTL'))
+    return snapshot
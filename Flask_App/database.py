@@ -0,0 +1,77 @@
+"""
+إعدادات الاتصال بقاعدة البيانات
+- قراءة DATABASE_URL وإعدادات مجمّع الاتصالات من متغيرات البيئة
+- تفعيل إعدادات SQLite المناسبة للكتابة المتزامنة (WAL) عند كل اتصال جديد
+"""
+
+import os
+
+from sqlalchemy import event
+
+from models import db
+
+DEFAULT_DATABASE_URL = 'sqlite:///trucks_system.db'
+
+# إعدادات SQLite لكل اتصال (PRAGMA)
+# WAL: القراءة لا تحجب الكتابة، و synchronous=NORMAL آمن مع WAL ويقلل عمليات fsync
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,
+}
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value else default
+
+
+def database_config(environ=None):
+    """إعدادات Flask-SQLAlchemy من متغيرات البيئة"""
+    environ = os.environ if environ is None else environ
+
+    url = environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    # Render و Heroku يستخدمان البادئة القديمة postgres://
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+
+    engine_options = {
+        'pool_pre_ping': True,
+        'pool_recycle': _env_int(environ, 'DB_POOL_RECYCLE', 1800),
+    }
+    # SQLite في الذاكرة يستخدم اتصالاً واحداً ولا يقبل إعدادات حجم المجمّع
+    if url not in ('sqlite://', 'sqlite:///:memory:'):
+        engine_options.update({
+            'pool_size': _env_int(environ, 'DB_POOL_SIZE', 5),
+            'max_overflow': _env_int(environ, 'DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int(environ, 'DB_POOL_TIMEOUT', 30),
+        })
+
+    return {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options,
+        'SQLITE_PRAGMAS': dict(DEFAULT_SQLITE_PRAGMAS),
+    }
+
+
+def _sqlite_pragmas_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
+
+
+def init_database(app):
+    """تهيئة قاعدة البيانات وتطبيق إعدادات SQLite على كل اتصال جديد"""
+    db.init_app(app)
+
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and pragmas:
+            event.listen(engine, 'connect', _sqlite_pragmas_listener(pragmas))
+    return engine
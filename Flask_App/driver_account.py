@@ -4,39 +4,81 @@
 
 from models import db, Driver, Shipment, Expense, Revenue
 from datetime import datetime
+from projections import select_records
 
-def calculate_driver_account(driver_id):
+# الجداول التي يعتمد عليها كشف الحساب
+DRIVER_ACCOUNT_TABLES = ('drivers', 'shipments', 'expenses')
+
+# الحقول المعروضة في تفاصيل حساب السائق (تُجلب وحدها دون تحميل كائنات ORM)
+SHIPMENT_DETAIL_FIELDS = ('id', 'from_location', 'to_location', 'cargo', 'revenue', 'status', 'shipment_date')
+EXPENSE_DETAIL_FIELDS = ('id', 'expense_type', 'amount', 'description', 'expense_date')
+
+def _accounts_query(driver_id=None):
     """
-    حساب كشف حساب السائق الكامل
-    يشمل: الراتب، المصروفات، الإيرادات، والرصيد النهائي
+    استعلام مجمّع واحد يحسب لكل سائق: المصاريف الشخصية، مصاريف القاطرة،
+    إجمالي إيرادات الشحنات وعددها
+    عند تحديد driver_id تُقيَّد التجميعات بذلك السائق وقاطرته فقط
     """
-    driver = Driver.query.get(driver_id)
-    if not driver:
-        return None
+    driver_expenses = db.session.query(
+        Expense.driver_id.label('driver_id'),
+        db.func.sum(Expense.amount).label('total')
+    ).filter(Expense.driver_id.isnot(None))
+
+    truck_expenses = db.session.query(
+        Expense.truck_id.label('truck_id'),
+        db.func.sum(Expense.amount).label('total')
+    )
+
+    shipments = db.session.query(
+        Shipment.driver_id.label('driver_id'),
+        db.func.sum(Shipment.revenue).label('revenue'),
+        db.func.count(Shipment.id).label('count')
+    )
+
+    drivers = db.session.query(Driver)
+    if driver_id is not None:
+        driver_truck = db.session.query(Driver.truck_id).filter(Driver.id == driver_id).scalar_subquery()
+        driver_expenses = driver_expenses.filter(Expense.driver_id == driver_id)
+        truck_expenses = truck_expenses.filter(Expense.truck_id == driver_truck)
+        shipments = shipments.filter(Shipment.driver_id == driver_id)
+        drivers = drivers.filter(Driver.id == driver_id)
+
+    driver_expenses = driver_expenses.group_by(Expense.driver_id).subquery()
+    truck_expenses = truck_expenses.group_by(Expense.truck_id).subquery()
+    shipments = shipments.group_by(Shipment.driver_id).subquery()
+
+    return drivers.with_entities(
+        Driver.id,
+        Driver.name,
+        Driver.phone_number,
+        Driver.truck_id,
+        Driver.salary,
+        Driver.status,
+        db.func.coalesce(driver_expenses.c.total, 0),
+        db.func.coalesce(truck_expenses.c.total, 0),
+        db.func.coalesce(shipments.c.revenue, 0),
+        db.func.coalesce(shipments.c.count, 0)
+    ).outerjoin(
+        driver_expenses, driver_expenses.c.driver_id == Driver.id
+    ).outerjoin(
+        truck_expenses, truck_expenses.c.truck_id == Driver.truck_id
+    ).outerjoin(
+        shipments, shipments.c.driver_id == Driver.id
+    ).order_by(Driver.id)
+
+
+def _build_account(row):
+    """بناء كشف حساب السائق من صف الاستعلام المجمّع"""
+    (driver_id, name, phone_number, truck_id, salary, status,
+     driver_expenses, truck_expenses, total_revenue, shipment_count) = row
     
     # حساب إجمالي الرواتب المستحقة
-    total_salary = driver.salary  # الراتب الشهري الأساسي
+    total_salary = salary  # الراتب الشهري الأساسي
     
-    # حساب المصاريف المتعلقة بالسائق
-    driver_expenses = db.session.query(db.func.sum(Expense.amount)).filter(
-        Expense.driver_id == driver_id
-    ).scalar() or 0
-    
-    # حساب الإيرادات من الشحنات التي قام بها السائق
-    driver_shipments = Shipment.query.filter_by(driver_id=driver_id).all()
-    total_revenue = sum([shipment.revenue for shipment in driver_shipments])
-    
-    # حساب إجمالي المصاريف المتعلقة بقاطرة السائق
-    if driver.truck_id:
-        truck_expenses = db.session.query(db.func.sum(Expense.amount)).filter(
-            Expense.truck_id == driver.truck_id
-        ).scalar() or 0
-    else:
+    # مصاريف القاطرة تُحسب فقط إذا كان السائق مرتبطاً بقاطرة
+    if not truck_id:
         truck_expenses = 0
     
-    # حساب عدد الشحنات
-    shipment_count = len(driver_shipments)
-    
     # حساب الرصيد النهائي
     # الرصيد = الإيرادات - (الراتب + المصاريف الشخصية)
     balance = total_revenue - (total_salary + driver_expenses)
@@ -51,9 +93,9 @@ def calculate_driver_account(driver_id):
     
     return {
         'driver_id': driver_id,
-        'driver_name': driver.name,
-        'phone_number': driver.phone_number,
-        'truck_id': driver.truck_id,
+        'driver_name': name,
+        'phone_number': phone_number,
+        'truck_id': truck_id,
         'salary': float(total_salary),
         'shipment_count': shipment_count,
         'total_revenue': float(total_revenue),
@@ -62,24 +104,41 @@ def calculate_driver_account(driver_id):
         'total_expenses': float(driver_expenses + truck_expenses),
         'balance': float(balance),
         'account_status': account_status,
-        'is_active': driver.status == 'active'
+        'is_active': status == 'active'
     }
 
 
+def calculate_drivers_accounts():
+    """
+    حساب كشوف حساب جميع السائقين دفعة واحدة
+    عدد الاستعلامات ثابت (استعلام واحد) مهما كان عدد السائقين
+    """
+    return [_build_account(row) for row in _accounts_query()]
+
+
+def calculate_driver_account(driver_id):
+    """
+    حساب كشف حساب السائق الكامل
+    يشمل: الراتب، المصروفات، الإيرادات، والرصيد النهائي
+    """
+    row = _accounts_query(driver_id).first()
+    if not row:
+        return None
+    return _build_account(row)
+
+
 def get_driver_account_details(driver_id):
     """
     الحصول على تفاصيل كاملة لحساب السائق
     يشمل: قائمة الشحنات والمصاريف والرصيد
     """
-    driver = Driver.query.get(driver_id)
-    if not driver:
-        return None
-    
     # الحصول على بيانات الحساب الأساسية
     account_data = calculate_driver_account(driver_id)
+    if not account_data:
+        return None
     
     # الحصول على تفاصيل الشحنات
-    shipments = Shipment.query.filter_by(driver_id=driver_id).all()
+    shipments = select_records(Shipment, SHIPMENT_DETAIL_FIELDS, where=(Shipment.driver_id == driver_id,))
     shipments_data = [
         {
             'id': s.id,
@@ -94,7 +153,7 @@ def get_driver_account_details(driver_id):
     ]
     
     # الحصول على تفاصيل المصاريف
-    expenses = Expense.query.filter_by(driver_id=driver_id).all()
+    expenses = select_records(Expense, EXPENSE_DETAIL_FIELDS, where=(Expense.driver_id == driver_id,))
     expenses_data = [
         {
             'id': e.id,
@@ -117,20 +176,17 @@ def get_all_drivers_accounts():
     """
     الحصول على كشف حساب جميع السائقين
     """
-    drivers = Driver.query.all()
-    return [calculate_driver_account(driver.id) for driver in drivers]
+    return calculate_drivers_accounts()
 
 
 def get_drivers_summary():
     """
     الحصول على ملخص إحصائي لجميع السائقين
     """
-    drivers = Driver.query.all()
-    
-    total_drivers = len(drivers)
-    active_drivers = len([d for d in drivers if d.status == 'active'])
+    all_accounts = calculate_drivers_accounts()
     
-    all_accounts = [calculate_driver_account(d.id) for d in drivers]
+    total_drivers = len(all_accounts)
+    active_drivers = len([acc for acc in all_accounts if acc['is_active']])
     
     total_revenue = sum([acc['total_revenue'] for acc in all_accounts])
     total_expenses = sum([acc['total_expenses'] for acc in all_accounts])
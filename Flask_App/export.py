@@ -0,0 +1,236 @@
+"""
+تصدير السجلات المالية كتدفق (CSV / NDJSON / XLSX)
+- القراءة على دفعات عبر yield_per بدلاً من تحميل الجدول كاملاً في الذاكرة
+- إرسال البيانات فور قراءة أول دفعة (Response من مولّد)
+- نفس معاملات التصفية الخاصة بمسارات القوائم (truck_id، start_date، fields ...)
+"""
+
+import csv
+import heapq
+import io
+import tempfile
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_login import login_required
+
+from list_queries import ListQueryError, apply_filters, parse_date, parse_fields
+from models import db, Driver, Shipment, Revenue, Expense
+from serialization import RowSerializer, dumps_line, serialize_value
+
+# openpyxl تُستورد عند أول تصدير xlsx وليس عند بدء التطبيق (False: لم تُستورد بعد)
+_workbook_class = False
+
+
+def get_workbook_class():
+    """صنف Workbook من openpyxl، أو None إذا لم تكن مثبتة"""
+    global _workbook_class
+    if _workbook_class is False:
+        try:
+            from openpyxl import Workbook
+        except ImportError:  # المكتبة اختيارية، مطلوبة لصيغة xlsx فقط
+            Workbook = None
+        _workbook_class = Workbook
+    return _workbook_class
+
+export_bp = Blueprint('export', __name__, url_prefix='/api/export')
+
+# عدد الصفوف في كل دفعة تُقرأ من قاعدة البيانات
+EXPORT_BATCH_SIZE = 1000
+
+# المورد -> (النموذج، أعمدة التصفية، عمود التاريخ)
+EXPORT_RESOURCES = {
+    'shipments': (Shipment, ('status', 'truck_id', 'driver_id'), Shipment.shipment_date),
+    'revenues': (Revenue, ('truck_id', 'shipment_id'), Revenue.revenue_date),
+    'expenses': (Expense, ('truck_id', 'driver_id', 'expense_type'), Expense.expense_date),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+STATEMENT_FIELDS = ['date', 'entry_type', 'id', 'description', 'credit', 'debit', 'status']
+
+
+# ============ تنسيق الصفوف ============
+
+class _LineBuffer:
+    """وجهة كتابة لـ csv.writer تحتفظ بالسطور المكتوبة حتى إرسالها"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def take(self):
+        data = ''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def csv_chunks(fields, batches):
+    """تحويل دفعات الصفوف إلى أجزاء نص CSV (جزء لكل دفعة)"""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    # BOM ليتعرف Excel على الترميز العربي
+    buffer.write('﻿')
+    writer.writerow(fields)
+    yield buffer.take()
+
+    for rows in batches:
+        writer.writerows([serialize_value(value) for value in row] for row in rows)
+        yield buffer.take()
+
+
+def ndjson_chunks(fields, batches):
+    """تحويل دفعات الصفوف إلى أسطر JSON (كائن لكل سطر)"""
+    serialize = RowSerializer(fields, date_fields=None)
+    for rows in batches:
+        yield ''.join(dumps_line(serialize(row)) + '\n' for row in rows)
+
+
+def xlsx_chunks(fields, batches, sheet_title):
+    """
+    كتابة الصفوف في ملف xlsx بوضع write_only (ذاكرة ثابتة)
+    الملف لا يكتمل إلا بعد آخر صف، لذلك يُكتب في ملف مؤقت ثم يُرسل على أجزاء
+    """
+    workbook = get_workbook_class()(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(fields)
+    for rows in batches:
+        for row in rows:
+            sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            data = output.read(64 * 1024)
+            if not data:
+                break
+            yield data
+
+
+def export_response(fields, batches, export_format, filename):
+    """استجابة تدفقية بالصيغة المطلوبة"""
+    if export_format == 'csv':
+        chunks = csv_chunks(fields, batches)
+    elif export_format == 'ndjson':
+        chunks = ndjson_chunks(fields, batches)
+    else:
+        chunks = xlsx_chunks(fields, batches, filename)
+
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def parse_format():
+    """قراءة معامل format والتحقق منه"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ListQueryError(f'صيغة غير مدعومة: {export_format}')
+    if export_format == 'xlsx' and get_workbook_class() is None:
+        raise ListQueryError('صيغة xlsx تتطلب تثبيت مكتبة openpyxl')
+    return export_format
+
+
+# ============ مصادر البيانات ============
+
+def iter_batches(query):
+    """قراءة نتيجة الاستعلام على دفعات بحجم EXPORT_BATCH_SIZE"""
+    result = db.session.execute(query.statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for rows in result.partitions():
+        yield rows
+
+
+def _statement_entries(driver_id, start_date, end_date):
+    """قيود كشف حساب السائق من الشحنات والمصاريف، كل منها مرتب حسب التاريخ"""
+    shipments = db.session.query(
+        Shipment.shipment_date, db.literal('shipment'), Shipment.id,
+        Shipment.from_location + ' - ' + Shipment.to_location + ': ' + Shipment.cargo,
+        Shipment.revenue, db.literal(0.0), Shipment.status
+    ).filter(Shipment.driver_id == driver_id)
+
+    expenses = db.session.query(
+        Expense.expense_date, db.literal('expense'), Expense.id,
+        db.func.coalesce(Expense.description, Expense.expense_type),
+        db.literal(0.0), Expense.amount, Expense.expense_type
+    ).filter(Expense.driver_id == driver_id)
+
+    if start_date:
+        shipments = shipments.filter(Shipment.shipment_date >= start_date)
+        expenses = expenses.filter(Expense.expense_date >= start_date)
+    if end_date:
+        shipments = shipments.filter(Shipment.shipment_date <= end_date)
+        expenses = expenses.filter(Expense.expense_date <= end_date)
+
+    return (
+        shipments.order_by(Shipment.shipment_date, Shipment.id),
+        expenses.order_by(Expense.expense_date, Expense.id)
+    )
+
+
+def statement_batches(driver_id, start_date, end_date):
+    """
+    دمج الشحنات والمصاريف في قائمة واحدة مرتبة حسب التاريخ
+    الدمج يتم أثناء القراءة (heapq.merge) دون تحميل أي من القائمتين بالكامل
+    """
+    def rows(query):
+        for batch in iter_batches(query):
+            yield from batch
+
+    shipments, expenses = _statement_entries(driver_id, start_date, end_date)
+    merged = heapq.merge(rows(shipments), rows(expenses), key=lambda row: row[0])
+
+    batch = []
+    for row in merged:
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ============ المسارات ============
+
+@export_bp.route('/<resource_name>', methods=['GET'])
+@login_required
+def export_resource(resource_name):
+    """تصدير الشحنات أو الإيرادات أو المصاريف (?format=csv|ndjson|xlsx)"""
+    if resource_name not in EXPORT_RESOURCES:
+        return jsonify({'error': 'المورد غير مدعوم للتصدير'}), 404
+    model, filters, date_column = EXPORT_RESOURCES[resource_name]
+
+    try:
+        export_format = parse_format()
+        fields = parse_fields(model, request.args.get('fields'))
+        table = model.__table__
+        query = db.session.query(*[table.c[name] for name in fields])
+        query = apply_filters(query, model, filters, date_column).order_by(table.c.id)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return export_response(fields, iter_batches(query), export_format, resource_name)
+
+
+@export_bp.route('/drivers/<int:driver_id>/statement', methods=['GET'])
+@login_required
+def export_driver_statement(driver_id):
+    """تصدير كشف حساب السائق: الشحنات (دائن) والمصاريف (مدين) مرتبة حسب التاريخ"""
+    if db.session.get(Driver, driver_id) is None:
+        return jsonify({'error': 'السائق غير موجود'}), 404
+
+    try:
+        export_format = parse_format()
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    batches = statement_batches(driver_id, start_date, end_date)
+    return export_response(STATEMENT_FIELDS, batches, export_format, f'driver_{driver_id}_statement')
@@ -0,0 +1,53 @@
+"""
+طبقة تجميع بيانات الأسطول
+- حساب الإيرادات والمصاريف والربح لجميع القواطر باستعلامات مجمّعة من الملخص اليومي
+"""
+
+from models import Truck
+from projections import select_records
+from rollup import get_trucks_totals
+from serialization import serializer_for
+
+
+def get_trucks_financials(start_date, end_date, totals=None):
+    """
+    حساب الإيرادات والمصاريف لكل قاطرة خلال الفترة
+    يعيد قائمة من (سجل القاطرة، الإيرادات، المصاريف) بعدد ثابت من الاستعلامات مهما كان عدد القواطر
+    سجل القاطرة namedtuple بحقول to_dict (projections.py) وليس كائن ORM
+    المجاميع تُقرأ من الملخص اليومي (rollup.py) ما لم تُمرر جاهزة في totals
+    """
+    if totals is None:
+        totals = get_trucks_totals(start_date, end_date)
+    return [
+        (truck, *totals.get(truck.id, (0, 0)))
+        for truck in select_records(Truck, order_by=(Truck.id,))
+    ]
+
+
+def calculate_fleet_summary(start_date, end_date, totals=None):
+    """ملخص الأسطول لفترة محددة بنفس بنية استجابة /api/analytics/fleet-summary"""
+    serialize_truck = serializer_for(Truck)
+    trucks_data = []
+    total_revenue = 0
+    total_expenses = 0
+
+    for truck, revenue, expenses in get_trucks_financials(start_date, end_date, totals):
+        profit = revenue - expenses
+        total_revenue += revenue
+        total_expenses += expenses
+
+        trucks_data.append({
+            'truck': serialize_truck(truck),
+            'revenue': float(revenue),
+            'expenses': float(expenses),
+            'profit': float(profit)
+        })
+
+    return {
+        'trucks': trucks_data,
+        'total_revenue': float(total_revenue),
+        'total_expenses': float(total_expenses),
+        'total_profit': float(total_revenue - total_expenses),
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat()
+    }
@@ -0,0 +1,315 @@
+"""
+قياس أداء الطلبات
+- زمن كل طلب (مدرج تكراري لكل مسار)، وعدد عبارات SQL وزمنها وعدد الصفوف المُعادة من أحداث المحرك
+- ترويسة Server-Timing في كل استجابة (تظهر في أدوات المطور في المتصفح)
+- GET /metrics بصيغة Prometheus النصية، مع إحصاءات المهام الخلفية
+- وضع العينات: تشغيل cProfile لنسبة من الطلبات وحفظ نتيجة البطيء منها في instance/profiles
+الإحصاءات داخل كل عملية، لذلك يُقرأ كل عامل gunicorn على حدة
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from scheduler import metrics as job_metrics
+
+# حدود المدرجات التكرارية: زمن الطلب بالثواني، وعدد عبارات SQL في الطلب
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+DEFAULT_PROFILE_SLOW_SECONDS = 1.0
+DEFAULT_PROFILE_MAX_FILES = 200
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+class Histogram:
+    """مدرج تكراري بصيغة Prometheus (عدد القيم <= كل حد)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(الحد، العدد التراكمي) لكل حد ثم +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """إحصاءات الطلبات داخل العملية لكل (الطريقة، المسار)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._statuses = {}
+
+    def record(self, method, route, status, seconds, statements, sql_seconds, rows):
+        with self._lock:
+            entry = self._routes.get((method, route))
+            if entry is None:
+                entry = self._routes[(method, route)] = {
+                    'latency': Histogram(LATENCY_BUCKETS),
+                    'statements': Histogram(STATEMENT_BUCKETS),
+                    'sql_seconds': 0.0,
+                    'rows': 0,
+                }
+            entry['latency'].observe(seconds)
+            entry['statements'].observe(statements)
+            entry['sql_seconds'] += sql_seconds
+            entry['rows'] += rows
+            key = (method, route, status)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def render(self):
+        """سطور الإحصاءات بصيغة Prometheus النصية"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            statuses = sorted(self._statuses.items())
+
+        lines = []
+
+        def histogram(name, help_text, attribute):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} histogram'])
+            for (method, route), entry in routes:
+                labels = _labels(method=method, route=route)
+                values = entry[attribute]
+                for bound, count in values.cumulative():
+                    lines.append(f'{name}_bucket{_labels(method=method, route=route, le=bound)} {count}')
+                lines.append(f'{name}_sum{labels} {values.sum}')
+                lines.append(f'{name}_count{labels} {values.count}')
+
+        def counter(name, help_text, attribute):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} counter'])
+            for (method, route), entry in routes:
+                lines.append(f'{name}{_labels(method=method, route=route)} {entry[attribute]}')
+
+        histogram('http_request_duration_seconds', 'Request latency by route.', 'latency')
+        histogram('db_statements_per_request', 'SQL statements executed per request.', 'statements')
+        counter('db_statement_seconds_total', 'Time spent executing SQL statements.', 'sql_seconds')
+        counter('db_rows_returned_total', 'Rows fetched from SQL result sets.', 'rows')
+
+        lines.extend(['# HELP http_requests_total Requests by route and status.', '# TYPE http_requests_total counter'])
+        for (method, route, status), count in statuses:
+            lines.append(f'http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+        return lines
+
+
+request_metrics = RequestMetrics()
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _job_lines():
+    """إحصاءات المهام الخلفية (scheduler.metrics) بصيغة Prometheus"""
+    stats = sorted(job_metrics.snapshot().items())
+    lines = []
+    for name, key, kind, help_text in (
+        ('scheduler_job_runs_total', 'runs', 'counter', 'Background job runs.'),
+        ('scheduler_job_failures_total', 'failures', 'counter', 'Background job failures.'),
+        ('scheduler_job_skipped_total', 'skipped', 'counter', 'Runs skipped because another process held the lock.'),
+        ('scheduler_job_seconds_total', 'total_seconds', 'counter', 'Time spent running background jobs.'),
+        ('scheduler_job_max_seconds', 'max_seconds', 'gauge', 'Slowest background job run.'),
+    ):
+        lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} {kind}'])
+        lines.extend(f'{name}{_labels(job=job)} {entry[key]}' for job, entry in stats)
+    return lines
+
+
+def render_metrics():
+    return '\n'.join(request_metrics.render() + _job_lines()) + '\n'
+
+
+# ============ قياس الطلب الحالي ============
+
+class RequestStats:
+    """عدادات الطلب الحالي (تُخزن في g.request_stats)"""
+
+    __slots__ = ('started', 'statements', 'sql_seconds', 'rows', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.profiler = None
+
+
+class RowCountingCursor:
+    """غلاف لمؤشر DBAPI يعدّ الصفوف التي يجلبها SQLAlchemy من نتيجة الاستعلام"""
+
+    __slots__ = ('_cursor', '_stats')
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _current_stats():
+    return g.get('request_stats') if has_request_context() else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats() is not None:
+        conn.info.setdefault('instrumentation_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    started = conn.info.get('instrumentation_started')
+    if stats is None or not started:
+        return
+    stats.statements += 1
+    stats.sql_seconds += time.perf_counter() - started.pop()
+    # نتيجة الاستعلام تُبنى من context.cursor بعد هذا الحدث، فيُستبدل بغلاف يعدّ الصفوف
+    if context is not None and cursor.description is not None and context.cursor is cursor:
+        context.cursor = RowCountingCursor(cursor, stats)
+
+
+def _start_request():
+    g.request_stats = stats = RequestStats()
+    sample_rate = current_app.config.get('PROFILE_SAMPLE_RATE', 0)
+    if sample_rate and random.random() < sample_rate:
+        stats.profiler = cProfile.Profile()
+        stats.profiler.enable()
+
+
+def _finish_request(response):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+    seconds = time.perf_counter() - stats.started
+    if stats.profiler is not None:
+        stats.profiler.disable()
+        if seconds >= current_app.config.get('PROFILE_SLOW_SECONDS', DEFAULT_PROFILE_SLOW_SECONDS):
+            save_profile(stats.profiler, seconds)
+
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    request_metrics.record(request.method, route, response.status_code, seconds,
+                           stats.statements, stats.sql_seconds, stats.rows)
+
+    if current_app.config.get('SERVER_TIMING', True):
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} queries, {stats.rows} rows", '
+            f'app;dur={seconds * 1000:.1f}'
+        )
+    return response
+
+
+def _discard_request(exc):
+    # طلب لم يصل إلى after_request: إيقاف المحلل حتى لا يبقى مفعّلاً في الخيط
+    stats = g.pop('request_stats', None)
+    if stats is not None and stats.profiler is not None:
+        stats.profiler.disable()
+
+
+# ============ ملفات التحليل (cProfile) ============
+
+def profile_directory(app):
+    directory = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def save_profile(profiler, seconds):
+    """حفظ نتيجة cProfile للطلب الحالي، مع حذف الأقدم عند تجاوز PROFILE_MAX_FILES"""
+    directory = profile_directory(current_app)
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.endpoint or 'unmatched'}-{seconds * 1000:.0f}ms.prof"
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path)
+
+    max_files = current_app.config.get('PROFILE_MAX_FILES', DEFAULT_PROFILE_MAX_FILES)
+    files = sorted(entry for entry in os.listdir(directory) if entry.endswith('.prof'))
+    for old in files[:max(0, len(files) - max_files)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+    return path
+
+
+# ============ المسارات والتهيئة ============
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """إحصاءات هذه العملية بصيغة Prometheus (تتطلب METRICS_TOKEN كـ Bearer إن كان محدداً)"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'غير مصرح'}), 401
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_instrumentation(app):
+    """تسجيل قياس الطلبات ومسار /metrics وأوامر ملفات التحليل"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_discard_request)
+    app.register_blueprint(metrics_bp)
+    register_commands(app)
+
+
+def register_commands(app):
+    """تسجيل أوامر سطر الأوامر الخاصة بملفات التحليل"""
+
+    @app.cli.command('list-profiles')
+    def list_profiles_command():
+        """عرض ملفات التحليل المحفوظة (الأحدث أولاً)"""
+        directory = profile_directory(app)
+        for name in sorted(os.listdir(directory), reverse=True):
+            if name.endswith('.prof'):
+                print(name)
+
+    @app.cli.command('show-profile')
+    @click.argument('name')
+    @click.option('--limit', default=30, help='عدد الدوال المعروضة')
+    @click.option('--sort', default='cumulative', help='ترتيب النتائج (cumulative, tottime, calls)')
+    def show_profile_command(name, limit, sort):
+        """عرض أثقل الدوال في ملف تحليل محفوظ"""
+        path = name if os.path.isabs(name) else os.path.join(profile_directory(app), name)
+        pstats.Stats(path).sort_stats(sort).print_stats(limit)
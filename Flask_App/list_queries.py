@@ -0,0 +1,145 @@
+"""
+استعلامات القوائم - ترقيم الصفحات بالمؤشر (keyset) والتصفية واختيار الحقول
+- ?after=<id>&limit=<n> : الصفحة التالية بعد المعرف المحدد (بدونهما تُرجع جميع الصفوف كما كانت الصفحات تتوقع)
+- ?status=...&truck_id=... : تصفية على الخادم
+- ?start_date=...&end_date=... : نطاق تاريخي على عمود التاريخ الخاص بالجدول
+- ?fields=id,amount : إرجاع الحقول المطلوبة فقط
+"""
+
+from datetime import datetime
+
+from flask import request, jsonify, url_for
+
+from models import db
+from serialization import serializer_for
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+class ListQueryError(ValueError):
+    """خطأ في معاملات طلب القائمة"""
+
+
+def parse_fields(model, fields_arg):
+    """تحديد الأعمدة المطلوبة من معامل fields (الافتراضي: جميع أعمدة الجدول)"""
+    columns = model.__table__.columns
+    if not fields_arg:
+        return [column.name for column in columns]
+
+    fields = [name.strip() for name in fields_arg.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in columns]
+    if unknown:
+        raise ListQueryError(f"حقول غير معروفة: {', '.join(unknown)}")
+    return fields
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ListQueryError(f'تاريخ غير صالح: {value}')
+
+
+def parse_value(name, value, python_type):
+    """تحويل قيمة معامل الطلب إلى نوع العمود، أو ListQueryError إذا كانت غير صالحة"""
+    if python_type is bool:
+        lowered = value.strip().lower()
+        if lowered in ('1', 'true', 'yes'):
+            return True
+        if lowered in ('0', 'false', 'no'):
+            return False
+    elif python_type is datetime:
+        return parse_date(value)
+    else:
+        try:
+            return python_type(value)
+        except (TypeError, ValueError):
+            pass
+    raise ListQueryError(f'قيمة غير صالحة للمعامل {name}: {value}')
+
+
+def parse_int_arg(args, name):
+    value = args.get(name)
+    return parse_value(name, value, int) if value not in (None, '') else None
+
+
+def apply_filters(query, model, filters=(), date_column=None, args=None):
+    """تطبيق التصفية على أعمدة الجدول والنطاق التاريخي من معاملات الطلب"""
+    args = request.args if args is None else args
+    table = model.__table__
+
+    for name in filters:
+        column = table.c[name]
+        value = args.get(name)
+        if value not in (None, ''):
+            query = query.filter(column == parse_value(name, value, column.type.python_type))
+
+    if date_column is not None:
+        start_date = parse_date(args.get('start_date'))
+        end_date = parse_date(args.get('end_date'))
+        if start_date:
+            query = query.filter(date_column >= start_date)
+        if end_date:
+            query = query.filter(date_column <= end_date)
+
+    return query
+
+
+def build_list_query(model, filters=(), date_column=None, args=None, default_limit=None):
+    """
+    بناء استعلام صفحة واحدة من الجدول
+    بدون after و limit يكون الحد default_limit (None: جميع الصفوف)
+    يعيد (الاستعلام، الحقول، الحد الأقصى للصفحة أو None)
+    """
+    args = request.args if args is None else args
+
+    after = parse_int_arg(args, 'after')
+    limit = parse_int_arg(args, 'limit')
+    if limit is None and after is not None:
+        limit = DEFAULT_PAGE_SIZE
+    elif limit is None:
+        limit = default_limit
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    fields = parse_fields(model, args.get('fields'))
+
+    table = model.__table__
+    # المعرف مطلوب دائماً لحساب مؤشر الصفحة التالية
+    query = db.session.query(table.c.id, *[table.c[name] for name in fields])
+    query = apply_filters(query, model, filters, date_column, args)
+
+    if after is not None:
+        query = query.filter(table.c.id > after)
+
+    query = query.order_by(table.c.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query, fields, limit
+
+
+def list_response(model, filters=(), date_column=None, default_limit=None):
+    """
+    استجابة قائمة: مصفوفة JSON بحجم صفحة واحدة كحد أقصى عند طلب after أو limit (أو default_limit)
+    مؤشر الصفحة التالية يُرسل في الترويسة X-Next-Cursor وفي Link
+    """
+    try:
+        query, fields, limit = build_list_query(model, filters, date_column, default_limit=default_limit)
+        rows = query.all()
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+
+    # الصفوف تبدأ بعمود المعرف (المؤشر) ثم الحقول المطلوبة
+    response = jsonify(serializer_for(model, fields, offset=1).many(rows))
+    if has_more:
+        next_cursor = rows[-1][0]
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
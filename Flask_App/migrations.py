@@ -0,0 +1,162 @@
+"""
+ترحيل مخطط قاعدة البيانات وفحص خطط الاستعلامات
+- upgrade_schema: إنشاء الجداول والأعمدة والفهارس الناقصة في قواعد البيانات الموجودة (مثل trucks_system.db القديمة)
+- check_query_plans: التأكد عبر EXPLAIN QUERY PLAN من أن استعلامات التحليلات تستخدم الفهارس
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
+
+from models import db, DailyTruckFinancial
+from fleet_analytics import get_trucks_financials
+from advanced_features import AdvancedAnalytics, NotificationSystem
+from columnar import shipment_metrics
+from driver_account import _accounts_query
+from rollup import get_trucks_totals, rebuild_rollup
+from timeseries import query_buckets
+
+
+def upgrade_schema():
+    """
+    تحديث مخطط قاعدة البيانات إلى آخر إصدار
+    db.create_all لا ينشئ أعمدة وفهارس الجداول الموجودة مسبقاً، لذلك تُنشأ الناقصة منها هنا
+    يعيد أسماء الأعمدة والفهارس المُنشأة
+    """
+    existing_tables = set(inspect(db.engine).get_table_names())
+    db.create_all()
+
+    inspector = inspect(db.engine)
+    created = add_missing_columns(inspector)
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+
+    # بناء الملخص اليومي من البيانات الموجودة عند إنشاء جدوله لأول مرة
+    if existing_tables and DailyTruckFinancial.__tablename__ not in existing_tables:
+        rebuild_rollup()
+    return created
+
+
+def add_missing_columns(inspector):
+    """
+    إضافة الأعمدة الجديدة إلى الجداول الموجودة (ALTER TABLE ... ADD COLUMN)
+    الأعمدة المضافة يجب أن تقبل NULL أو تملك server_default لتعبئة الصفوف الموجودة
+    """
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}')
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def _capture_statements(run_query):
+    """تنفيذ الاستعلامات مع التقاط نصوص SQL ومعاملاتها الفعلية"""
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        run_query()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_execute)
+    return captured
+
+
+def hot_queries():
+    """
+    الاستعلامات الأكثر تكراراً في التحليلات مع الجداول التي يجب البحث فيها عبر فهرس
+    كل استعلام يُلتقط من الدالة التي يستخدمها التطبيق فعلاً، فأي تعديل عليها ينعكس على الفحص
+    بداية النافذة ليست منتصف الليل فيمر get_trucks_totals بالملخص اليومي والأيام الجزئية معاً
+    """
+    end_date = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    start_date = end_date - timedelta(days=30)
+    first_day, last_day = start_date.date(), end_date.date()
+
+    return [
+        ('fleet_summary', ('daily_truck_financials', 'revenues', 'expenses'),
+         lambda: get_trucks_financials(start_date, end_date)),
+        ('truck_totals', ('daily_truck_financials', 'revenues', 'expenses'),
+         lambda: get_trucks_totals(start_date, end_date, truck_id=1)),
+        ('driver_account', ('drivers', 'expenses', 'shipments'),
+         lambda: _accounts_query(1).all()),
+        ('driver_shipments', ('shipments',),
+         lambda: shipment_metrics('driver_id', start_date, 1)),
+        ('truck_shipments', ('shipments',),
+         lambda: shipment_metrics('truck_id', start_date, 1)),
+        ('expense_analysis', ('expenses',),
+         lambda: AdvancedAnalytics.get_expense_analysis(30)),
+        ('truck_timeseries', ('daily_truck_financials', 'shipments'),
+         lambda: query_buckets('week', first_day, last_day, truck_id=1)),
+        ('driver_timeseries', ('shipments', 'expenses'),
+         lambda: query_buckets('week', first_day, last_day, driver_id=1)),
+        ('maintenance_sweep', ('notifications',),
+         lambda: NotificationSystem.sweep_maintenance_due(30)),
+        ('truck_inbox', ('notifications',),
+         lambda: NotificationSystem.get_unread_notifications(truck_id=1, before=1000)),
+    ]
+
+
+def check_query_plans():
+    """
+    فحص خطط تنفيذ الاستعلامات الساخنة (SQLite فقط)
+    يعيد قائمة (الاسم، سطور الخطة، الجداول التي تُمسح بالكامل)
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return []
+
+    results = []
+    for name, tables, run_query in hot_queries():
+        plan = []
+        with db.engine.connect() as conn:
+            for statement, parameters in _capture_statements(run_query):
+                plan.extend(row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters))
+
+        scanned = []
+        for table in tables:
+            searched = any(line.startswith(f'SEARCH {table} ') for line in plan)
+            if not searched or any(line.startswith(f'SCAN {table}') for line in plan):
+                scanned.append(table)
+        results.append((name, plan, scanned))
+    return results
+
+
+def register_commands(app):
+    """تسجيل أوامر سطر الأوامر الخاصة بقاعدة البيانات"""
+
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """إنشاء الجداول والفهارس الناقصة"""
+        created = upgrade_schema()
+        if created:
+            print(f"✓ تم إنشاء {len(created)} عمود/فهرس: {', '.join(created)}")
+        else:
+            print('✓ مخطط قاعدة البيانات محدّث')
+
+    # init-db للتثبيت الأول (قبل flask seed)، و upgrade-db بعد تحديث النماذج: نفس العملية
+    app.cli.add_command(upgrade_db_command, 'init-db')
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """التأكد من أن استعلامات التحليلات لا تمسح الجداول بالكامل"""
+        failed = False
+        for name, plan, scanned in check_query_plans():
+            status = '✗' if scanned else '✓'
+            print(f'{status} {name}')
+            for line in plan:
+                print(f'    {line}')
+            failed = failed or bool(scanned)
+        if failed:
+            raise SystemExit(1)
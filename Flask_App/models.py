@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from flask_bcrypt import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -21,12 +21,12 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime)
     
     def set_password(self, password):
-        """تشفير كلمة المرور باستخدام Bcrypt"""
-        self.password_hash = generate_password_hash(password).decode('utf-8')
+        """تشفير كلمة المرور باستخدام Bcrypt (في مجمّع خيوط التجزئة، انظر passwords.py)"""
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """التحقق من كلمة المرور"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -87,6 +87,10 @@ class Driver(db.Model):
     shipments = db.relationship('Shipment', backref='driver', lazy=True, cascade='all, delete-orphan')
     expenses = db.relationship('Expense', backref='driver', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_drivers_truck_id', 'truck_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -117,6 +121,11 @@ class Shipment(db.Model):
     
     revenues = db.relationship('Revenue', backref='shipment', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.Index('ix_shipments_truck_date', 'truck_id', 'shipment_date', 'status'),
+        db.Index('ix_shipments_driver_date', 'driver_id', 'shipment_date', 'status', 'revenue'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -145,6 +154,13 @@ class Revenue(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # فهارس تغطية لاستعلامات التحليلات (التصفية بالقاطرة والتاريخ وجمع المبلغ)
+    __table_args__ = (
+        db.Index('ix_revenues_truck_date_amount', 'truck_id', 'revenue_date', 'amount'),
+        db.Index('ix_revenues_date_truck_amount', 'revenue_date', 'truck_id', 'amount'),
+        db.Index('ix_revenues_shipment_id', 'shipment_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -171,6 +187,13 @@ class Expense(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # فهارس تغطية لاستعلامات التحليلات وكشف حساب السائق
+    __table_args__ = (
+        db.Index('ix_expenses_truck_date_amount', 'truck_id', 'expense_date', 'amount'),
+        db.Index('ix_expenses_driver_date_amount', 'driver_id', 'expense_date', 'amount'),
+        db.Index('ix_expenses_date_truck_type_amount', 'expense_date', 'truck_id', 'expense_type', 'amount'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -197,6 +220,10 @@ class MaintenanceRecord(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_maintenance_records_truck_date', 'truck_id', 'maintenance_date'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -221,6 +248,16 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_notifications_truck_type_read', 'truck_id', 'notification_type', 'is_read'),
+        # فهارس جزئية تحتوي الإشعارات غير المقروءة فقط (صندوق الوارد وعدّاد غير المقروء)
+        db.Index('ix_notifications_unread', 'id',
+                 sqlite_where=is_read == db.false(), postgresql_where=is_read == db.false()),
+        db.Index('ix_notifications_unread_truck', 'truck_id', 'id',
+                 sqlite_where=is_read == db.false(), postgresql_where=is_read == db.false()),
+        db.Index('ix_notifications_created_at', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -237,7 +274,7 @@ class Report(db.Model):
     __tablename__ = 'reports'
     
     id = db.Column(db.Integer, primary_key=True)
-    report_type = db.Column(db.String(50), nullable=False)  # truck_profit, fleet_summary, expense_analysis, driver_performance
+    report_type = db.Column(db.String(50), nullable=False)  # truck_profit, fleet_summary, fleet_efficiency, expense_analysis, fleet_totals, truck_totals
     truck_id = db.Column(db.Integer, db.ForeignKey('trucks.id'))
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
@@ -245,7 +282,16 @@ class Report(db.Model):
     total_expenses = db.Column(db.Float, default=0)
     profit = db.Column(db.Float, default=0)
     report_data = db.Column(db.Text)  # JSON data
+    status = db.Column(db.String(20), default='completed', server_default='completed')  # pending, running, completed, failed
+    progress = db.Column(db.Integer, default=100, server_default='100')  # نسبة الإنجاز 0-100
+    error = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_reports_lookup', 'report_type', 'start_date', 'end_date', 'truck_id'),
+        db.Index('ix_reports_created_at', 'created_at'),
+    )
     
     def to_dict(self):
         return {
@@ -258,5 +304,55 @@ class Report(db.Model):
             'total_expenses': self.total_expenses,
             'profit': self.profit,
             'report_data': self.report_data,
-            'created_at': self.created_at.isoformat()
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+
+class DailyTruckFinancial(db.Model):
+    """
+    ملخص يومي مجمّع لإيرادات ومصاريف كل قاطرة
+    يُحدَّث تلقائياً عند إضافة أو تعديل أو حذف الإيرادات والمصاريف (انظر rollup.py)
+    صف الإيرادات يحمل expense_type فارغاً، وصفوف المصاريف تحمل نوع المصروف
+    """
+    __tablename__ = 'daily_truck_financials'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    truck_id = db.Column(db.Integer, db.ForeignKey('trucks.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    expense_type = db.Column(db.String(50), nullable=False, default='')
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    expenses = db.Column(db.Float, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('truck_id', 'day', 'expense_type', name='uq_daily_truck_financials_key'),
+        db.Index('ix_daily_truck_financials_day_truck', 'day', 'truck_id', 'revenue', 'expenses'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'truck_id': self.truck_id,
+            'day': self.day.isoformat(),
+            'expense_type': self.expense_type,
+            'revenue': self.revenue,
+            'expenses': self.expenses,
+            'entry_count': self.entry_count
         }
+
+
+class TableVersion(db.Model):
+    """
+    رقم إصدار كل جدول، يزيد مع كل commit يغيّر الجدول (انظر conditional.py)
+    يُستخدم لترويسات ETag و Last-Modified دون تنفيذ استعلامات القوائم والتحليلات
+    """
+    __tablename__ = 'table_versions'
+    
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,97 @@
+"""
+تجزئة كلمات المرور والتحقق منها (bcrypt)
+- تكلفة التجزئة من BCRYPT_LOG_ROUNDS (الافتراضي 12)، والتجزئات المخزنة تحتفظ بتكلفتها حتى تغيير كلمة المرور
+- العمل يتم في مجمّع خيوط محدود (PASSWORD_HASH_WORKERS) بدلاً من خيط الطلب، فلا يتجاوز عدد عمليات
+  bcrypt المتزامنة عدد الخيوط مهما كثرت محاولات الدخول
+- ضغط عكسي: PASSWORD_HASH_MAX_PENDING عملية (قيد التنفيذ والانتظار) كحد أقصى، والطلب الذي لا يجد مكاناً
+  خلال PASSWORD_HASH_QUEUE_TIMEOUT ثانية يُرفض بـ PasswordHasherBusy (503) بدلاً من حجز العامل
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from flask_bcrypt import Bcrypt
+
+DEFAULT_LOG_ROUNDS = 12
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 16
+DEFAULT_QUEUE_TIMEOUT = 2.0
+
+
+class PasswordHasherBusy(Exception):
+    """لا يوجد مكان في طابور التجزئة خلال المهلة المحددة"""
+
+
+class PasswordHasher:
+    """تشغيل bcrypt في مجمّع خيوط محدود مع حد أقصى للعمليات المعلقة"""
+
+    def __init__(self, log_rounds=DEFAULT_LOG_ROUNDS, workers=DEFAULT_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.bcrypt = Bcrypt()
+        self.log_rounds = log_rounds
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        """مجمّع الخيوط (يُنشأ عند أول تجزئة)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy()
+        try:
+            # PASSWORD_HASH_WORKERS=0: التنفيذ في خيط الطلب (مع بقاء حد العمليات المعلقة)
+            if self.workers <= 0:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password, self.log_rounds).decode('utf-8')
+
+    def verify(self, password_hash, password):
+        return self._run(self.bcrypt.check_password_hash, password_hash, password)
+
+
+_fallback = None
+_fallback_lock = threading.Lock()
+
+
+def get_hasher():
+    """مجزّئ التطبيق الحالي، أو مجزّئ بالإعدادات الافتراضية خارج سياق التطبيق"""
+    global _fallback
+    if has_app_context():
+        hasher = current_app.extensions.get('password_hasher')
+        if hasher is not None:
+            return hasher
+    with _fallback_lock:
+        if _fallback is None:
+            _fallback = PasswordHasher()
+        return _fallback
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(password_hash, password):
+    return get_hasher().verify(password_hash, password)
+
+
+def init_passwords(app):
+    """إنشاء مجزّئ كلمات المرور بإعدادات التطبيق"""
+    config = app.config
+    app.extensions['password_hasher'] = PasswordHasher(
+        log_rounds=config.get('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS),
+        workers=config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+        max_pending=config.get('PASSWORD_HASH_MAX_PENDING', DEFAULT_MAX_PENDING),
+        queue_timeout=config.get('PASSWORD_HASH_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT),
+    )
@@ -0,0 +1,52 @@
+"""
+طبقة القراءة بالأعمدة المختارة
+- مسارات القراءة (التحليلات والقوائم والتفاصيل) تجلب الأعمدة المطلوبة فقط كسجلات خفيفة (namedtuple)
+  بدلاً من كائنات ORM كاملة: لا خريطة هوية ولا تتبع للحالة ولا أعمدة نصية غير مستخدمة
+- السجلات tuples عادية، فتعمل مباشرة مع محوّلات serialization.serializer_for
+- للقراءة فقط: أي تعديل يتم عبر كائنات ORM كالمعتاد
+"""
+
+from collections import namedtuple
+
+from models import db
+from serialization import model_fields, model_columns, serializer_for
+
+_record_types = {}
+
+
+def record_type(model, fields=None):
+    """صنف السجل (namedtuple) لحقول النموذج، مخزن لكل (نموذج، حقول)"""
+    fields = tuple(fields) if fields else model_fields(model)
+    key = (model.__tablename__, fields)
+    record = _record_types.get(key)
+    if record is None:
+        name = ''.join(part.title() for part in model.__tablename__.split('_')) + 'Record'
+        record = _record_types[key] = namedtuple(name, fields)
+    return record
+
+
+def select_records(model, fields=None, where=(), order_by=(), limit=None):
+    """
+    سجلات النموذج المطابقة لشروط where بالحقول المطلوبة فقط (جميع حقول to_dict افتراضياً)
+    التعديلات المعلقة في الجلسة تُحفظ (flush) أولاً كما في استعلامات ORM
+    """
+    record = record_type(model, fields)
+    statement = db.select(*model_columns(model, record._fields)).where(*where).order_by(*order_by)
+    if limit is not None:
+        statement = statement.limit(limit)
+
+    session = db.session
+    if session.autoflush:
+        session.flush()
+    return list(map(record._make, session.connection().execute(statement)))
+
+
+def get_record(model, record_id, fields=None):
+    """سجل واحد حسب المعرف، أو None إذا لم يوجد"""
+    records = select_records(model, fields, where=(model.__table__.c.id == record_id,), limit=1)
+    return records[0] if records else None
+
+
+def records_to_dicts(model, records, fields=None):
+    """تحويل السجلات إلى قواميس بنفس مخرجات to_dict"""
+    return serializer_for(model, fields or (records[0]._fields if records else None)).many(records)
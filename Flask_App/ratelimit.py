@@ -0,0 +1,94 @@
+"""
+تحديد معدل المحاولات بنافذة منزلقة (sliding window)
+- كل مفتاح (اسم مستخدم، عنوان IP، ...) يحتفظ بأوقات محاولاته خلال آخر window ثانية، والمحاولة
+  التي تتجاوز الحد تُرفض مع عدد الثواني حتى تخرج أقدم محاولة من النافذة
+- داخل العملية افتراضياً (عدد المفاتيح محدود، يُحذف الأقل استخداماً)، وعبر Redis إذا كان REDIS_URL محدداً
+  ومكتبة redis مثبتة فيكون الحد مشتركاً بين عمليات gunicorn
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # المكتبة اختيارية
+    redis = None
+
+DEFAULT_MAX_KEYS = 10000
+
+
+class SlidingWindowLimiter:
+    """حد المحاولات داخل العملية، آمن للاستخدام من عدة خيوط"""
+
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """تسجيل محاولة: يعيد 0 إذا كانت مسموحة، أو عدد الثواني حتى السماح بمحاولة جديدة"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+            self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return hits[0] + window - now
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class RedisSlidingWindowLimiter:
+    """حد المحاولات المشترك عبر Redis (مجموعة مرتبة لكل مفتاح، الدرجة وقت المحاولة)"""
+
+    def __init__(self, url, prefix='trucks:ratelimit:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def hit(self, key, limit, window):
+        key = self.prefix + key
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zrange(key, 0, 0, withscores=True)
+        pipe.zcard(key)
+        _, oldest, count = pipe.execute()
+        if count >= limit:
+            return max(0.001, oldest[0][1] + window - now) if oldest else window
+        # قد تتجاوز المحاولات المتزامنة الحد بقليل بين القراءة والإضافة، وهذا مقبول هنا
+        pipe = self.client.pipeline()
+        pipe.zadd(key, {f'{now}:{uuid.uuid4().hex}': now})
+        pipe.expire(key, max(1, int(window) + 1))
+        pipe.execute()
+        return 0
+
+    def reset(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def init_rate_limiter(app):
+    """اختيار مخزن المحاولات حسب الإعدادات"""
+    url = app.config.get('CACHE_REDIS_URL')
+    if url and redis is not None:
+        limiter = RedisSlidingWindowLimiter(url)
+    else:
+        limiter = SlidingWindowLimiter(app.config.get('RATE_LIMIT_MAX_KEYS', DEFAULT_MAX_KEYS))
+    app.extensions['rate_limiter'] = limiter
+    return limiter
+
+
+def get_rate_limiter():
+    return current_app.extensions['rate_limiter']
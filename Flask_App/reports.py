@@ -0,0 +1,489 @@
+"""
+التقارير المحفوظة (جدول reports)
+- مجاميع الفترات المكتملة (قبل بداية اليوم الحالي) تُحسب مرة واحدة وتُحفظ في Report، بحدود أيام UTC كاملة
+  حتى تعيد الطلبات المتكررة بنفس الفترة النسبية (آخر 30 يوماً) استخدام نفس التقرير
+- الفترة المفتوحة (اليوم الحالي) والأيام الجزئية في طرفي الفترة فقط تُحسب في كل طلب وتُضاف إلى المجاميع المحفوظة
+- حذف التقارير المحفوظة التي تغطي أياماً أُضيفت أو عُدّلت قيودها لاحقاً (back-dated)
+- حد أقصى لعمر التقارير المحفوظة وعددها
+- مهام تقارير غير متزامنة: تُنفذ في مجمّع خيوط خارج الطلب ويُتابع تقدمها ونتيجتها في Report
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import login_required
+from sqlalchemy import event
+
+from advanced_features import AdvancedAnalytics
+from fleet_analytics import calculate_fleet_summary
+from list_queries import DEFAULT_PAGE_SIZE, list_response
+from models import db, Truck, Report
+from cache import mark_changed
+from rollup import collect_flush_deltas, get_trucks_totals, on_rebuild
+
+reports_bp = Blueprint('reports', __name__, url_prefix='/api/reports')
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_MAX_REPORTS = 2000
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_TIMEOUT = 3600
+
+# أنواع التقارير التي تحفظ مجاميع الفترات المكتملة (تُحذف عند تعديل أيام فترتها)
+FLEET_TOTALS = 'fleet_totals'
+TRUCK_TOTALS = 'truck_totals'
+TOTALS_REPORT_TYPES = (FLEET_TOTALS, TRUCK_TOTALS)
+
+# حالات مهام التقارير
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+
+# ============ تقسيم الفترة ============
+
+def current_period_start():
+    """بداية الفترة المفتوحة: منتصف ليل اليوم الحالي (UTC)"""
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def split_window(start_date, end_date):
+    """
+    تقسيم الفترة إلى جزء مكتمل (يُحفظ) وجزء مفتوح (يُحسب دائماً)
+    يعيد (الجزء المكتمل أو None، الجزء المفتوح أو None)
+    """
+    boundary = current_period_start()
+    if end_date < boundary:
+        return (start_date, end_date), None
+    if start_date >= boundary:
+        return None, (start_date, end_date)
+    return (start_date, boundary - timedelta(microseconds=1)), (boundary, end_date)
+
+
+def _midnight(value):
+    return datetime.combine(value.date(), datetime.min.time())
+
+
+def split_full_days(start_date, end_date):
+    """
+    تقسيم الجزء المكتمل إلى أيام كاملة (منتصف ليل إلى منتصف ليل UTC) وأطراف جزئية
+    يعيد (الأيام الكاملة أو None، قائمة الأطراف الجزئية)
+    """
+    first = _midnight(start_date)
+    if first < start_date:
+        first += timedelta(days=1)
+    last = _midnight(end_date + timedelta(microseconds=1))
+    if first >= last:
+        return None, [(start_date, end_date)]
+
+    partial = []
+    if start_date < first:
+        partial.append((start_date, first - timedelta(microseconds=1)))
+    if last <= end_date:
+        partial.append((last, end_date))
+    return (first, last - timedelta(microseconds=1)), partial
+
+
+# ============ التخزين ============
+
+def _encode_totals(totals):
+    return json.dumps({str(truck_id): list(values) for truck_id, values in totals.items()})
+
+
+def _decode_totals(report_data):
+    return {int(truck_id): tuple(values) for truck_id, values in json.loads(report_data or '{}').items()}
+
+
+def find_report(report_type, start_date, end_date, truck_id=None):
+    """آخر تقرير محفوظ لنفس النوع والقاطرة والفترة"""
+    return Report.query.filter(
+        Report.report_type == report_type,
+        Report.start_date == start_date,
+        Report.end_date == end_date,
+        Report.truck_id == truck_id if truck_id is not None else Report.truck_id.is_(None)
+    ).order_by(Report.id.desc()).first()
+
+
+def store_report(report_type, start_date, end_date, totals, truck_id=None):
+    """حفظ مجاميع فترة مكتملة ثم تطبيق حدود الاحتفاظ"""
+    total_revenue = sum(revenue for revenue, _ in totals.values())
+    total_expenses = sum(expenses for _, expenses in totals.values())
+    report = Report(
+        report_type=report_type,
+        truck_id=truck_id,
+        start_date=start_date,
+        end_date=end_date,
+        total_revenue=float(total_revenue),
+        total_expenses=float(total_expenses),
+        profit=float(total_revenue - total_expenses),
+        report_data=_encode_totals(totals)
+    )
+    db.session.add(report)
+    db.session.commit()
+    prune_reports()
+    return report
+
+
+def closed_totals(report_type, start_date, end_date, truck_id=None):
+    """مجاميع فترة مكتملة: من التقرير المحفوظ، أو حسابها وحفظها"""
+    report = find_report(report_type, start_date, end_date, truck_id)
+    if report is not None:
+        return _decode_totals(report.report_data)
+
+    totals = get_trucks_totals(start_date, end_date, truck_id)
+    store_report(report_type, start_date, end_date, totals, truck_id)
+    return totals
+
+
+def window_totals(report_type, start_date, end_date, truck_id=None):
+    """
+    مجاميع الإيرادات والمصاريف لكل قاطرة خلال الفترة
+    الأيام المكتملة الكاملة من التقرير المحفوظ، والأطراف الجزئية والجزء المفتوح من الملخص اليومي
+    """
+    closed, current = split_window(start_date, end_date)
+    totals = {}
+    live = [current] if current is not None else []
+    if closed is not None:
+        full_days, partial = split_full_days(*closed)
+        if full_days is not None:
+            totals = closed_totals(report_type, *full_days, truck_id)
+        live.extend(partial)
+
+    for segment in live:
+        totals = dict(totals)
+        for key, (revenue, expenses) in get_trucks_totals(*segment, truck_id).items():
+            stored_revenue, stored_expenses = totals.get(key, (0, 0))
+            totals[key] = (stored_revenue + revenue, stored_expenses + expenses)
+    return totals
+
+
+def fleet_summary_report(start_date, end_date):
+    """ملخص الأسطول مع حفظ مجاميع الجزء المكتمل من الفترة"""
+    totals = window_totals(FLEET_TOTALS, start_date, end_date)
+    return calculate_fleet_summary(start_date, end_date, totals)
+
+
+def truck_profit_totals(truck_id, start_date, end_date):
+    """(الإيرادات، المصاريف) لقاطرة مع حفظ مجاميع الجزء المكتمل من الفترة"""
+    return window_totals(TRUCK_TOTALS, start_date, end_date, truck_id).get(truck_id, (0, 0))
+
+
+# ============ الاحتفاظ والإبطال ============
+
+def prune_reports(retention_days=None, max_reports=None):
+    """حذف التقارير الأقدم من مدة الاحتفاظ وما زاد عن الحد الأقصى (الأقدم أولاً)"""
+    config = current_app.config
+    retention_days = retention_days or config.get('REPORT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    max_reports = max_reports or config.get('REPORT_MAX_STORED', DEFAULT_MAX_REPORTS)
+
+    # المهام التي لم تنته بعد لا تُحذف
+    finished = Report.status.notin_((JOB_PENDING, JOB_RUNNING))
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = Report.query.filter(Report.created_at < cutoff, finished).delete(synchronize_session=False)
+
+    # معرف أقدم تقرير يجب الاحتفاظ به
+    oldest_kept = db.session.query(Report.id).order_by(Report.id.desc()).offset(max_reports - 1).limit(1).scalar()
+    if oldest_kept is not None:
+        deleted += Report.query.filter(Report.id < oldest_kept, finished).delete(synchronize_session=False)
+
+    if deleted:
+        db.session.commit()
+    return deleted
+
+
+def invalidate_reports(connection, first_day, last_day):
+    """
+    حذف مجاميع الفترات المحفوظة التي تتقاطع فترتها مع الأيام [first_day, last_day]
+    نتائج مهام التقارير لا تُحذف فهي لقطة وقت تنفيذها
+    """
+    table = Report.__table__
+    first_moment = datetime.combine(first_day, datetime.min.time())
+    after_last = datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+    connection.execute(table.delete().where(
+        table.c.report_type.in_(TOTALS_REPORT_TYPES),
+        table.c.start_date < after_last,
+        table.c.end_date >= first_moment
+    ))
+
+
+@on_rebuild
+def _drop_totals_after_rebuild(session):
+    """إعادة بناء الملخص اليومي تصحح أياماً سابقة، فتُحذف جميع المجاميع المحفوظة المحسوبة منه"""
+    table = Report.__table__
+    session.execute(table.delete().where(table.c.report_type.in_(TOTALS_REPORT_TYPES)))
+    mark_changed(session, table.name)
+
+
+def invalidate_backdated(connection, days):
+    """إبطال التقارير المحفوظة إذا كان بين الأيام المتأثرة يوم من فترة مكتملة"""
+    days = list(days)
+    if days and min(days) < current_period_start().date():
+        invalidate_reports(connection, min(days), max(days))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _delete_reports_of_deleted_trucks(session, flush_context, instances):
+    truck_ids = [obj.id for obj in session.deleted if isinstance(obj, Truck)]
+    if truck_ids:
+        table = Report.__table__
+        session.connection().execute(table.delete().where(table.c.truck_id.in_(truck_ids)))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _invalidate_backdated_reports(session, flush_context):
+    deltas = collect_flush_deltas(session)
+    if deltas:
+        invalidate_backdated(session.connection(), (day for _, day, _ in deltas))
+
+
+# ============ مهام التقارير غير المتزامنة ============
+
+class ReportJob:
+    """نوع تقرير يمكن تنفيذه كمهمة: الدالة، واستخراج (الإيرادات، المصاريف) من نتيجتها"""
+
+    def __init__(self, name, func, totals, uses_days=False, needs_truck=False):
+        self.name = name
+        self.func = func
+        self.totals = totals
+        self.uses_days = uses_days
+        self.needs_truck = needs_truck
+
+
+REPORT_JOBS = {}
+
+
+def register_report_job(name, totals, uses_days=False, needs_truck=False):
+    """تسجيل دالة كنوع تقرير يُنفذ في الخلفية"""
+    def decorator(func):
+        REPORT_JOBS[name] = ReportJob(name, func, totals, uses_days, needs_truck)
+        return func
+    return decorator
+
+
+@register_report_job('fleet_summary', lambda result: (result['total_revenue'], result['total_expenses']))
+def fleet_summary_job(start_date, end_date, progress, **params):
+    return fleet_summary_report(start_date, end_date)
+
+
+@register_report_job('truck_profit', lambda result: (result['revenue'], result['expenses']), needs_truck=True)
+def truck_profit_job(start_date, end_date, truck_id, progress, **params):
+    revenues, expenses = truck_profit_totals(truck_id, start_date, end_date)
+    return {
+        'truck_id': truck_id,
+        'revenue': float(revenues),
+        'expenses': float(expenses),
+        'profit': float(revenues - expenses),
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat()
+    }
+
+
+@register_report_job('fleet_efficiency',
+                     lambda result: (result['fleet_summary']['total_revenue'], result['fleet_summary']['total_expenses']),
+                     uses_days=True)
+def fleet_efficiency_job(days, progress, **params):
+    return AdvancedAnalytics.get_fleet_efficiency_report(days, progress=progress)
+
+
+@register_report_job('expense_analysis', lambda result: (0, result['total_expenses']), uses_days=True)
+def expense_analysis_job(days, progress, **params):
+    return AdvancedAnalytics.get_expense_analysis(days)
+
+
+class JobProgress:
+    """
+    تحديث نسبة إنجاز المهمة في Report، بحد أقصى مرة كل interval ثانية
+    يُكتب عبر اتصال مستقل حتى لا ينهي commit جلسة المهمة وكائناتها المحمّلة
+    """
+
+    def __init__(self, report_id, interval=0.5):
+        self.report_id = report_id
+        self.interval = interval
+        self._percent = 0
+        self._written_at = 0
+
+    def __call__(self, done, total):
+        percent = min(99, int(done * 100 / total)) if total else 0
+        now = time.monotonic()
+        if percent > self._percent and now - self._written_at >= self.interval:
+            self._percent = percent
+            self._written_at = now
+            update_job(self.report_id, progress=percent)
+
+
+def update_job(report_id, **values):
+    """تحديث أعمدة مهمة تقرير وتثبيتها فوراً ليراها الطلب الذي يتابعها"""
+    table = Report.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(table.c.id == report_id).values(**values))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    """مجمّع خيوط مهام التقارير (يُنشأ عند أول مهمة، REPORT_JOB_WORKERS خيط)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('REPORT_JOB_WORKERS', DEFAULT_JOB_WORKERS)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        return _executor
+
+
+def submit_report_job(report_type, start_date, end_date, truck_id=None, days=None):
+    """إنشاء سجل المهمة (pending) وإرسالها إلى مجمّع الخيوط، يعيد Report"""
+    report = Report(
+        report_type=report_type,
+        truck_id=truck_id,
+        start_date=start_date,
+        end_date=end_date,
+        status=JOB_PENDING,
+        progress=0
+    )
+    db.session.add(report)
+    db.session.commit()
+
+    params = {'start_date': start_date, 'end_date': end_date, 'truck_id': truck_id, 'days': days}
+    get_job_executor().submit(run_report_job, current_app._get_current_object(), report.id, report_type, params)
+    return report
+
+
+def run_report_job(app, report_id, report_type, params):
+    """تنفيذ مهمة تقرير داخل سياق التطبيق وحفظ نتيجتها أو خطأها في Report"""
+    job = REPORT_JOBS[report_type]
+    with app.app_context():
+        try:
+            update_job(report_id, status=JOB_RUNNING)
+            result = job.func(progress=JobProgress(report_id), **params)
+            # تثبيت ما كتبته المهمة في جلستها (مثل مجاميع الفترات) قبل الكتابة عبر اتصال مستقل
+            db.session.commit()
+            revenue, expenses = job.totals(result)
+            update_job(
+                report_id,
+                status=JOB_COMPLETED,
+                progress=100,
+                total_revenue=float(revenue),
+                total_expenses=float(expenses),
+                profit=float(revenue - expenses),
+                report_data=json.dumps(result, ensure_ascii=False),
+                completed_at=datetime.utcnow()
+            )
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('فشل تنفيذ تقرير %s (%d)', report_type, report_id)
+            update_job(report_id, status=JOB_FAILED, error=f'{e.__class__.__name__}: {e}',
+                       completed_at=datetime.utcnow())
+        finally:
+            db.session.remove()
+
+
+def fail_stale_jobs(timeout=None):
+    """
+    تحديد المهام العالقة (pending/running أقدم من REPORT_JOB_TIMEOUT ثانية) كفاشلة
+    مثل مهام عملية أُعيد تشغيلها قبل انتهائها
+    """
+    timeout = timeout or current_app.config.get('REPORT_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    failed = Report.query.filter(
+        Report.status.in_((JOB_PENDING, JOB_RUNNING)),
+        Report.created_at < cutoff
+    ).update({
+        'status': JOB_FAILED,
+        'error': 'انتهت مهلة المهمة قبل اكتمالها',
+        'completed_at': datetime.utcnow()
+    }, synchronize_session=False)
+    if failed:
+        db.session.commit()
+    return failed
+
+
+def job_status(report):
+    """حالة المهمة مع نتيجتها عند اكتمالها"""
+    data = {
+        'job_id': report.id,
+        'report_type': report.report_type,
+        'status': report.status,
+        'progress': report.progress,
+        'error': report.error,
+        'created_at': report.created_at.isoformat(),
+        'completed_at': report.completed_at.isoformat() if report.completed_at else None
+    }
+    if report.status == JOB_COMPLETED:
+        data['result'] = json.loads(report.report_data) if report.report_data else None
+    return data
+
+
+# ============ المسارات ============
+
+@reports_bp.route('', methods=['GET'])
+@login_required
+def list_reports():
+    """التقارير المحفوظة (?report_type=&truck_id=&status=&fields=&after=)"""
+    return list_response(Report, filters=('report_type', 'truck_id', 'status'), date_column=Report.created_at,
+                         default_limit=DEFAULT_PAGE_SIZE)
+
+
+@reports_bp.route('/<int:report_id>', methods=['GET'])
+@login_required
+def get_report(report_id):
+    """تقرير محفوظ مع بياناته"""
+    report = Report.query.get_or_404(report_id)
+    data = report.to_dict()
+    data['report_data'] = json.loads(report.report_data) if report.report_data else None
+    return jsonify(data)
+
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+def create_report_job():
+    """
+    إرسال تقرير للتنفيذ في الخلفية
+    {"report_type": "fleet_summary|truck_profit|fleet_efficiency|expense_analysis",
+     "start_date": ..., "end_date": ..., "days": 30, "truck_id": ...}
+    """
+    data = request.get_json(silent=True) or {}
+    job = REPORT_JOBS.get(data.get('report_type'))
+    if job is None:
+        return jsonify({'error': f"نوع التقرير غير مدعوم، الأنواع المتاحة: {', '.join(REPORT_JOBS)}"}), 400
+
+    end_date = datetime.utcnow()
+    days = None
+    try:
+        if job.uses_days:
+            days = int(data.get('days', 30))
+            if days <= 0:
+                raise ValueError
+            start_date = end_date - timedelta(days=days)
+        else:
+            if data.get('end_date'):
+                end_date = datetime.fromisoformat(data['end_date'])
+            start_date = (datetime.fromisoformat(data['start_date']) if data.get('start_date')
+                          else end_date - timedelta(days=30))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'قيمة الفترة غير صحيحة'}), 400
+
+    truck_id = None
+    if job.needs_truck:
+        truck_id = data.get('truck_id')
+        if not isinstance(truck_id, int) or db.session.get(Truck, truck_id) is None:
+            return jsonify({'error': 'القاطرة غير موجودة'}), 400
+
+    report = submit_report_job(job.name, start_date, end_date, truck_id, days)
+    status_url = url_for('reports.get_report_job', report_id=report.id)
+    response = jsonify({'job_id': report.id, 'status': report.status, 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+@reports_bp.route('/jobs/<int:report_id>', methods=['GET'])
+@login_required
+def get_report_job(report_id):
+    """حالة مهمة تقرير ونسبة إنجازها، والنتيجة عند اكتمالها"""
+    report = Report.query.get_or_404(report_id)
+    return jsonify(job_status(report))
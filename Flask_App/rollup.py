@@ -0,0 +1,365 @@
+"""
+الملخص اليومي المجمّع لإيرادات ومصاريف القواطر (daily_truck_financials)
+- تحديث تدريجي عند كل flush يضيف أو يعدّل أو يحذف إيرادات أو مصاريف
+  (سجلات الصيانة تصل إلى الملخص عبر المصروف الذي ينشئه create_maintenance)
+- قراءة مجاميع أي فترة زمنية من الملخص اليومي مع استكمال الأيام الجزئية من الجداول الأصلية
+- إعادة بناء الملخص والتحقق منه من الجداول الأصلية
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from cache import mark_changed
+from models import db, Truck, Revenue, Expense, DailyTruckFinancial
+from projections import select_records
+
+# قيمة expense_type لصفوف الإيرادات في الملخص
+REVENUE_KEY = ''
+
+# الفرق المسموح به عند مقارنة الملخص بالجداول الأصلية
+VERIFY_TOLERANCE = 0.01
+VERIFY_FIELDS = ('truck_id', 'day', 'expense_type', 'revenue', 'expenses', 'entry_count')
+
+# دوال تُستدعى داخل معاملة إعادة البناء قبل commit: fn(session)
+_rebuild_listeners = []
+
+
+def on_rebuild(fn):
+    """تسجيل دالة تحذف ما بُني على الملخص السابق (التقارير المحفوظة، الفترات المخزنة) مع إعادة البناء"""
+    _rebuild_listeners.append(fn)
+    return fn
+
+
+# ============ التحديث التدريجي ============
+
+def _old_value(state, name):
+    """قيمة الحقل قبل التعديل الحالي (أو القيمة الحالية إن لم يتغير)"""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+def _entry_key(obj, values):
+    """مفتاح الملخص (القاطرة، اليوم، النوع) للقيد، أو None إذا لم يكن له تاريخ"""
+    if isinstance(obj, Revenue):
+        entry_date = values('revenue_date')
+        expense_type = REVENUE_KEY
+    else:
+        entry_date = values('expense_date')
+        expense_type = values('expense_type')
+    if entry_date is None:
+        return None
+    return (values('truck_id'), entry_date.date(), expense_type)
+
+
+def _entry_delta(obj, values, sign):
+    """(المفتاح، الإيراد، المصروف) للقيد بالإشارة المحددة"""
+    amount = (values('amount') or 0) * sign
+    if isinstance(obj, Revenue):
+        return _entry_key(obj, values), amount, 0
+    return _entry_key(obj, values), 0, amount
+
+
+def add_delta(deltas, key, revenue, expenses, count):
+    """إضافة فرق إلى مفتاح (القاطرة، اليوم، النوع)"""
+    current = deltas[key]
+    deltas[key] = (current[0] + revenue, current[1] + expenses, current[2] + count)
+
+
+def new_deltas():
+    return defaultdict(lambda: (0, 0, 0))
+
+
+def collect_flush_deltas(session):
+    """حساب فروق الملخص من الكائنات الجديدة والمعدّلة والمحذوفة في الجلسة"""
+    deltas = new_deltas()
+
+    def add(obj, values, sign):
+        key, revenue, expenses = _entry_delta(obj, values, sign)
+        if key is not None:
+            add_delta(deltas, key, revenue, expenses, sign)
+
+    for obj in session.new:
+        if isinstance(obj, (Revenue, Expense)):
+            add(obj, lambda name: getattr(obj, name), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, (Revenue, Expense)):
+            state = inspect(obj)
+            add(obj, lambda name: _old_value(state, name), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, (Revenue, Expense)) and session.is_modified(obj):
+            state = inspect(obj)
+            add(obj, lambda name: _old_value(state, name), -1)
+            add(obj, lambda name: getattr(obj, name), 1)
+
+    return deltas
+
+
+# قواعد البيانات التي تدعم INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+KEY_COLUMNS = ('truck_id', 'day', 'expense_type')
+
+
+def _upsert_delta(connection, table, key, revenue, expenses, count):
+    """
+    إضافة الفرق إلى صف المفتاح أو إنشاؤه في عبارة واحدة (ON CONFLICT على uq_daily_truck_financials_key)
+    فلا تتسابق عمليتان على إنشاء نفس الصف، ويعيد False إذا لم تدعم قاعدة البيانات ذلك
+    """
+    insert = UPSERT_DIALECTS.get(connection.dialect.name)
+    if insert is None:
+        return False
+    statement = insert(table).values(
+        dict(zip(KEY_COLUMNS, key), revenue=revenue, expenses=expenses, entry_count=count)
+    )
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            'revenue': table.c.revenue + statement.excluded.revenue,
+            'expenses': table.c.expenses + statement.excluded.expenses,
+            'entry_count': table.c.entry_count + statement.excluded.entry_count,
+        }
+    ))
+    return True
+
+
+def _update_or_insert_delta(connection, table, key_filter, key, revenue, expenses, count):
+    """تحديث الصف ثم إنشاؤه إن لم يوجد (لقواعد البيانات الأخرى)"""
+    result = connection.execute(
+        table.update().where(key_filter).values(
+            revenue=table.c.revenue + revenue,
+            expenses=table.c.expenses + expenses,
+            entry_count=table.c.entry_count + count
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(
+            dict(zip(KEY_COLUMNS, key), revenue=revenue, expenses=expenses, entry_count=count)
+        ))
+
+
+def apply_deltas(connection, deltas, deleted_trucks=()):
+    """تطبيق الفروق على جدول الملخص (تحديث الصف أو إنشاؤه)"""
+    table = DailyTruckFinancial.__table__
+
+    for key, (revenue, expenses, count) in deltas.items():
+        truck_id, day, expense_type = key
+        if truck_id in deleted_trucks or (not revenue and not expenses and not count):
+            continue
+
+        key_filter = (
+            (table.c.truck_id == truck_id) &
+            (table.c.day == day) &
+            (table.c.expense_type == expense_type)
+        )
+        if not _upsert_delta(connection, table, key, revenue, expenses, count):
+            _update_or_insert_delta(connection, table, key_filter, key, revenue, expenses, count)
+        if count < 0:
+            connection.execute(table.delete().where(key_filter & (table.c.entry_count <= 0)))
+
+    if deleted_trucks:
+        connection.execute(table.delete().where(table.c.truck_id.in_(list(deleted_trucks))))
+
+
+# الحقول التي تحدد مفتاح القيد ومبلغه: القيمة القديمة تُحمَّل عند التعديل حتى لو كان الكائن منتهي الصلاحية
+# (بعد commit)، وإلا لا يجد _old_value إلا القيمة الجديدة فلا يُطرح القديم من الملخص
+TRACKED_ATTRIBUTES = {
+    Revenue: ('truck_id', 'revenue_date', 'amount'),
+    Expense: ('truck_id', 'expense_date', 'expense_type', 'amount'),
+}
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """لا شيء: الاستماع مع active_history يكفي لتحميل القيمة القديمة"""
+
+
+for model, names in TRACKED_ATTRIBUTES.items():
+    for name in names:
+        event.listen(getattr(model, name), 'set', _load_old_value, active_history=True)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_rollup_after_flush(session, flush_context):
+    deleted_trucks = {obj.id for obj in session.deleted if isinstance(obj, Truck)}
+    deltas = collect_flush_deltas(session)
+    if deltas or deleted_trucks:
+        apply_deltas(session.connection(), deltas, deleted_trucks)
+
+
+# ============ القراءة ============
+
+def _full_days(start_date, end_date):
+    """
+    الأيام الكاملة داخل الفترة [start_date, end_date]: من first_day حتى ما قبل last_day
+    end_date = None تعني فترة مفتوحة بلا حد أعلى
+    """
+    first_day = start_date.date()
+    if start_date != datetime.combine(first_day, datetime.min.time()):
+        first_day += timedelta(days=1)
+    last_day = end_date.date() if end_date is not None else date.max
+    return first_day, last_day
+
+
+def _raw_totals(model, date_column, value_column, ranges, truck_id=None):
+    """
+    مجاميع الجداول الأصلية لكل قاطرة ضمن نطاقات زمنية جزئية
+    كل نطاق استعلام فرعي مستقل (UNION ALL) ليستخدم فهرس التاريخ
+    """
+    if not ranges:
+        return {}
+
+    parts = []
+    for start, end in ranges:
+        part = db.select(model.truck_id.label('truck_id'), value_column.label('amount')).where(date_column >= start)
+        if end is not None:
+            part = part.where(date_column <= end)
+        if truck_id is not None:
+            part = part.where(model.truck_id == truck_id)
+        parts.append(part)
+
+    entries = db.union_all(*parts).subquery()
+    query = db.session.query(entries.c.truck_id, db.func.sum(entries.c.amount)).group_by(entries.c.truck_id)
+    return dict(query.all())
+
+
+def get_trucks_totals(start_date, end_date=None, truck_id=None):
+    """
+    إجمالي الإيرادات والمصاريف لكل قاطرة خلال الفترة [start_date, end_date]
+    الأيام الكاملة تُقرأ من الملخص اليومي، وطرفا الفترة (الأيام الجزئية) من الجداول الأصلية
+    يعيد قاموساً {truck_id: (الإيرادات، المصاريف)}
+    """
+    first_day, last_day = _full_days(start_date, end_date)
+    totals = defaultdict(lambda: [0, 0])
+
+    if first_day < last_day:
+        table = DailyTruckFinancial.__table__
+        query = db.session.query(
+            table.c.truck_id, db.func.sum(table.c.revenue), db.func.sum(table.c.expenses)
+        ).filter(table.c.day >= first_day, table.c.day < last_day)
+        if truck_id is not None:
+            query = query.filter(table.c.truck_id == truck_id)
+        for row_truck_id, revenue, expenses in query.group_by(table.c.truck_id):
+            totals[row_truck_id][0] += revenue or 0
+            totals[row_truck_id][1] += expenses or 0
+
+        partial_ranges = []
+        first_midnight = datetime.combine(first_day, datetime.min.time())
+        if start_date < first_midnight:
+            partial_ranges.append((start_date, first_midnight - timedelta(microseconds=1)))
+        if end_date is not None:
+            partial_ranges.append((datetime.combine(last_day, datetime.min.time()), end_date))
+    else:
+        partial_ranges = [(start_date, end_date)]
+
+    for row_truck_id, amount in _raw_totals(Revenue, Revenue.revenue_date, Revenue.amount,
+                                            partial_ranges, truck_id).items():
+        totals[row_truck_id][0] += amount or 0
+    for row_truck_id, amount in _raw_totals(Expense, Expense.expense_date, Expense.amount,
+                                            partial_ranges, truck_id).items():
+        totals[row_truck_id][1] += amount or 0
+
+    return {key: tuple(value) for key, value in totals.items()}
+
+
+def get_truck_totals(truck_id, start_date, end_date=None):
+    """إجمالي الإيرادات والمصاريف لقاطرة واحدة"""
+    return get_trucks_totals(start_date, end_date, truck_id).get(truck_id, (0, 0))
+
+
+def get_fleet_totals(start_date, end_date=None):
+    """إجمالي الإيرادات والمصاريف لجميع القواطر"""
+    totals = get_trucks_totals(start_date, end_date)
+    return (
+        sum(revenue for revenue, _ in totals.values()),
+        sum(expenses for _, expenses in totals.values())
+    )
+
+
+# ============ إعادة البناء والتحقق ============
+
+def _raw_daily_rows():
+    """تجميع الجداول الأصلية حسب (القاطرة، اليوم، النوع)"""
+    revenue_day = db.func.date(Revenue.revenue_date)
+    revenues = db.session.query(
+        Revenue.truck_id, revenue_day, db.literal(REVENUE_KEY),
+        db.func.sum(Revenue.amount), db.literal(0.0), db.func.count(Revenue.id)
+    ).group_by(Revenue.truck_id, revenue_day)
+
+    expense_day = db.func.date(Expense.expense_date)
+    expenses = db.session.query(
+        Expense.truck_id, expense_day, Expense.expense_type,
+        db.literal(0.0), db.func.sum(Expense.amount), db.func.count(Expense.id)
+    ).group_by(Expense.truck_id, expense_day, Expense.expense_type)
+
+    return revenues, expenses
+
+
+def rebuild_rollup():
+    """
+    إعادة بناء الملخص اليومي بالكامل من جداول الإيرادات والمصاريف
+    في نفس المعاملة تُحذف النتائج المبنية على الملخص السابق (on_rebuild)، وتُعلَّم الجداول كمتغيّرة
+    فتُحذف مفاتيح الذاكرة المؤقتة وتتغير ETag
+    """
+    table = DailyTruckFinancial.__table__
+    columns = ['truck_id', 'day', 'expense_type', 'revenue', 'expenses', 'entry_count']
+
+    db.session.execute(table.delete())
+    for query in _raw_daily_rows():
+        db.session.execute(table.insert().from_select(columns, query.statement))
+    for listener in _rebuild_listeners:
+        listener(db.session)
+    mark_changed(db.session, table.name, Revenue.__tablename__, Expense.__tablename__)
+    db.session.commit()
+    return db.session.query(db.func.count(table.c.id)).scalar()
+
+
+def verify_rollup():
+    """
+    مقارنة الملخص اليومي بالجداول الأصلية
+    يعيد قائمة بالمفاتيح المختلفة: (المفتاح، قيمة الملخص، القيمة الفعلية)
+    """
+    expected = {}
+    for query in _raw_daily_rows():
+        for truck_id, day, expense_type, revenue, expenses, count in query:
+            expected[(truck_id, str(day), expense_type)] = (revenue or 0, expenses or 0, count)
+
+    actual = {}
+    for row in select_records(DailyTruckFinancial, VERIFY_FIELDS):
+        actual[(row.truck_id, row.day.isoformat(), row.expense_type)] = (row.revenue, row.expenses, row.entry_count)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        stored = actual.get(key, (0, 0, 0))
+        computed = expected.get(key, (0, 0, 0))
+        if (abs(stored[0] - computed[0]) > VERIFY_TOLERANCE or
+                abs(stored[1] - computed[1]) > VERIFY_TOLERANCE or
+                stored[2] != computed[2]):
+            mismatches.append((key, stored, computed))
+    return mismatches
+
+
+def register_commands(app):
+    """تسجيل أوامر سطر الأوامر الخاصة بالملخص اليومي"""
+
+    @app.cli.command('rollup-rebuild')
+    def rollup_rebuild_command():
+        """إعادة بناء الملخص اليومي من الجداول الأصلية"""
+        count = rebuild_rollup()
+        print(f'✓ تمت إعادة بناء الملخص اليومي ({count} صف)')
+
+    @app.cli.command('rollup-verify')
+    def rollup_verify_command():
+        """التحقق من تطابق الملخص اليومي مع الجداول الأصلية"""
+        mismatches = verify_rollup()
+        if not mismatches:
+            print('✓ الملخص اليومي مطابق للجداول الأصلية')
+            return
+        for key, stored, computed in mismatches:
+            print(f'✗ {key}: الملخص={stored} الفعلي={computed}')
+        raise SystemExit(1)
@@ -0,0 +1,462 @@
+"""
+مسارات API الأساسية (القواطر، السائقين، الشحنات، الإيرادات، المصاريف، الصيانة، التحليلات، الإشعارات)
+وصفحات HTML
+"""
+
+from flask import Blueprint, render_template, request, jsonify, abort
+from flask_login import login_required, current_user
+from models import db, Truck, Driver, Shipment, Revenue, Expense, MaintenanceRecord, Notification
+from advanced_features import ANALYTICS_TABLES
+from driver_account import (calculate_driver_account, get_driver_account_details, get_all_drivers_accounts,
+                            get_drivers_summary, DRIVER_ACCOUNT_TABLES)
+from conditional import conditional
+from list_queries import list_response
+from projections import get_record
+from reports import fleet_summary_report, truck_profit_totals
+from cache import mark_changed
+from dashboard import get_dashboard_snapshot
+from serialization import model_columns, serializer_for
+from datetime import datetime, timedelta
+
+main_bp = Blueprint('main', __name__)
+
+# ============ API Routes - القواطر ============
+
+@main_bp.route('/api/trucks', methods=['GET'])
+@login_required
+@conditional('trucks')
+def get_trucks():
+    """الحصول على قائمة القواطر"""
+    return list_response(Truck, filters=('status',), date_column=Truck.created_at)
+
+@main_bp.route('/api/trucks/<int:truck_id>', methods=['GET'])
+@login_required
+@conditional('trucks')
+def get_truck(truck_id):
+    """الحصول على بيانات قاطرة محددة"""
+    truck = get_record(Truck, truck_id)
+    if truck is None:
+        abort(404)
+    return jsonify(serializer_for(Truck)(truck))
+
+@main_bp.route('/api/trucks', methods=['POST'])
+@login_required
+def create_truck():
+    """إضافة قاطرة جديدة"""
+    data = request.get_json()
+    truck = Truck(
+        truck_type=data.get('truck_type'),
+        plate_number=data.get('plate_number'),
+        status=data.get('status', 'active')
+    )
+    db.session.add(truck)
+    db.session.commit()
+    return jsonify(truck.to_dict()), 201
+
+@main_bp.route('/api/trucks/<int:truck_id>', methods=['PUT'])
+@login_required
+def update_truck(truck_id):
+    """تحديث بيانات قاطرة"""
+    truck = Truck.query.get_or_404(truck_id)
+    data = request.get_json()
+    
+    if 'truck_type' in data:
+        truck.truck_type = data['truck_type']
+    if 'plate_number' in data:
+        truck.plate_number = data['plate_number']
+    if 'status' in data:
+        truck.status = data['status']
+    if 'last_maintenance_date' in data and data['last_maintenance_date']:
+        try:
+            truck.last_maintenance_date = datetime.fromisoformat(data['last_maintenance_date'])
+        except ValueError:
+            pass
+    
+    db.session.commit()
+    return jsonify(truck.to_dict())
+
+@main_bp.route('/api/trucks/<int:truck_id>', methods=['DELETE'])
+@login_required
+def delete_truck(truck_id):
+    """حذف قاطرة"""
+    truck = Truck.query.get_or_404(truck_id)
+    db.session.delete(truck)
+    db.session.commit()
+    return '', 204
+
+# ============ API Routes - السائقين ============
+
+@main_bp.route('/api/drivers', methods=['GET'])
+@login_required
+@conditional('drivers')
+def get_drivers():
+    """الحصول على قائمة السائقين"""
+    return list_response(Driver, filters=('status', 'truck_id'), date_column=Driver.created_at)
+
+@main_bp.route('/api/drivers', methods=['POST'])
+@login_required
+def create_driver():
+    """إضافة سائق جديد"""
+    data = request.get_json()
+    driver = Driver(
+        name=data.get('name'),
+        phone_number=data.get('phone_number'),
+        salary=data.get('salary'),
+        truck_id=data.get('truck_id'),
+        status=data.get('status', 'active')
+    )
+    db.session.add(driver)
+    db.session.commit()
+    return jsonify(driver.to_dict()), 201
+
+@main_bp.route('/api/drivers/<int:driver_id>', methods=['PUT'])
+@login_required
+def update_driver(driver_id):
+    """تحديث بيانات سائق"""
+    driver = Driver.query.get_or_404(driver_id)
+    data = request.get_json()
+    
+    if 'name' in data:
+        driver.name = data['name']
+    if 'phone_number' in data:
+        driver.phone_number = data['phone_number']
+    if 'salary' in data:
+        driver.salary = data['salary']
+    if 'truck_id' in data:
+        driver.truck_id = data['truck_id']
+    if 'status' in data:
+        driver.status = data['status']
+    
+    db.session.commit()
+    return jsonify(driver.to_dict())
+
+@main_bp.route('/api/drivers/<int:driver_id>', methods=['DELETE'])
+@login_required
+def delete_driver(driver_id):
+    """حذف سائق"""
+    driver = Driver.query.get_or_404(driver_id)
+    db.session.delete(driver)
+    db.session.commit()
+    return '', 204
+
+# ============ API Routes - الشحنات ============
+
+@main_bp.route('/api/shipments', methods=['GET'])
+@login_required
+@conditional('shipments')
+def get_shipments():
+    """الحصول على قائمة الشحنات"""
+    return list_response(
+        Shipment,
+        filters=('status', 'truck_id', 'driver_id'),
+        date_column=Shipment.shipment_date
+    )
+
+@main_bp.route('/api/shipments', methods=['POST'])
+@login_required
+def create_shipment():
+    """إضافة شحنة جديدة"""
+    data = request.get_json()
+    shipment = Shipment(
+        truck_id=data.get('truck_id'),
+        driver_id=data.get('driver_id'),
+        from_location=data.get('from_location'),
+        to_location=data.get('to_location'),
+        cargo=data.get('cargo'),
+        revenue=data.get('revenue'),
+        status=data.get('status', 'pending')
+    )
+    db.session.add(shipment)
+    
+    # زيادة عدد الشحنات بعبارة UPDATE واحدة دون تحميل القاطرة
+    Truck.query.filter_by(id=data.get('truck_id')).update(
+        {Truck.total_shipments: Truck.total_shipments + 1}, synchronize_session=False
+    )
+    mark_changed(db.session, Truck.__tablename__)
+    
+    db.session.commit()
+    return jsonify(shipment.to_dict()), 201
+
+@main_bp.route('/api/shipments/<int:shipment_id>', methods=['PUT'])
+@login_required
+def update_shipment(shipment_id):
+    """تحديث حالة الشحنة"""
+    shipment = Shipment.query.get_or_404(shipment_id)
+    data = request.get_json()
+    
+    if 'status' in data:
+        shipment.status = data['status']
+    if 'revenue' in data:
+        shipment.revenue = data['revenue']
+    
+    db.session.commit()
+    return jsonify(shipment.to_dict())
+
+# ============ API Routes - الإيرادات والمصاريف ============
+
+@main_bp.route('/api/revenues', methods=['GET'])
+@login_required
+@conditional('revenues')
+def get_revenues():
+    """الحصول على قائمة الإيرادات"""
+    return list_response(
+        Revenue,
+        filters=('truck_id', 'shipment_id'),
+        date_column=Revenue.revenue_date
+    )
+
+@main_bp.route('/api/revenues', methods=['POST'])
+@login_required
+def create_revenue():
+    """إضافة إيراد جديد"""
+    data = request.get_json()
+    revenue = Revenue(
+        truck_id=data.get('truck_id'),
+        shipment_id=data.get('shipment_id'),
+        amount=data.get('amount'),
+        description=data.get('description')
+    )
+    db.session.add(revenue)
+    db.session.commit()
+    return jsonify(revenue.to_dict()), 201
+
+@main_bp.route('/api/expenses', methods=['GET'])
+@login_required
+@conditional('expenses')
+def get_expenses():
+    """الحصول على قائمة المصاريف"""
+    return list_response(
+        Expense,
+        filters=('truck_id', 'driver_id', 'expense_type'),
+        date_column=Expense.expense_date
+    )
+
+@main_bp.route('/api/expenses', methods=['POST'])
+@login_required
+def create_expense():
+    """إضافة مصروف جديد"""
+    data = request.get_json()
+    expense = Expense(
+        truck_id=data.get('truck_id'),
+        driver_id=data.get('driver_id'),
+        expense_type=data.get('expense_type'),
+        amount=data.get('amount'),
+        description=data.get('description')
+    )
+    db.session.add(expense)
+    db.session.commit()
+    return jsonify(expense.to_dict()), 201
+
+# ============ API Routes - الصيانة ============
+
+@main_bp.route('/api/maintenance', methods=['GET'])
+@login_required
+@conditional('maintenance_records')
+def get_maintenance():
+    """الحصول على سجل الصيانة"""
+    return list_response(
+        MaintenanceRecord,
+        filters=('truck_id', 'maintenance_type'),
+        date_column=MaintenanceRecord.maintenance_date
+    )
+
+@main_bp.route('/api/maintenance', methods=['POST'])
+@login_required
+def create_maintenance():
+    """إضافة سجل صيانة جديد"""
+    data = request.get_json()
+    record = MaintenanceRecord(
+        truck_id=data.get('truck_id'),
+        maintenance_type=data.get('maintenance_type'),
+        cost=data.get('cost'),
+        description=data.get('description')
+    )
+    db.session.add(record)
+    
+    truck = Truck.query.get(data.get('truck_id'))
+    if truck:
+        truck.last_maintenance_date = datetime.utcnow()
+        expense = Expense(
+            truck_id=data.get('truck_id'),
+            driver_id=None,
+            expense_type='maintenance',
+            amount=data.get('cost'),
+            description=f"صيانة: {data.get('maintenance_type')} - {data.get('description')}"
+        )
+        db.session.add(expense)
+    
+    db.session.commit()
+    return jsonify(record.to_dict()), 201
+
+# ============ API Routes - التحليلات والتقارير ============
+
+@main_bp.route('/api/analytics/truck-profit/<int:truck_id>', methods=['GET'])
+@login_required
+@conditional(*ANALYTICS_TABLES, relative=True)
+def get_truck_profit(truck_id):
+    """حساب ربح/خسارة قاطرة محددة"""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    if start_date:
+        start_date = datetime.fromisoformat(start_date)
+    else:
+        start_date = datetime.utcnow() - timedelta(days=30)
+    
+    if end_date:
+        end_date = datetime.fromisoformat(end_date)
+    else:
+        end_date = datetime.utcnow()
+    
+    revenues, expenses = truck_profit_totals(truck_id, start_date, end_date)
+    
+    profit = revenues - expenses
+    
+    return jsonify({
+        'truck_id': truck_id,
+        'revenue': float(revenues),
+        'expenses': float(expenses),
+        'profit': float(profit),
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat()
+    })
+
+@main_bp.route('/api/analytics/fleet-summary', methods=['GET'])
+@login_required
+@conditional(*ANALYTICS_TABLES, relative=True)
+def get_fleet_summary():
+    """ملخص الأسطول"""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    if start_date:
+        start_date = datetime.fromisoformat(start_date)
+    else:
+        start_date = datetime.utcnow() - timedelta(days=30)
+    
+    if end_date:
+        end_date = datetime.fromisoformat(end_date)
+    else:
+        end_date = datetime.utcnow()
+    
+    return jsonify(fleet_summary_report(start_date, end_date))
+
+# ============ API Routes - الإشعارات ============
+
+@main_bp.route('/api/notifications', methods=['GET'])
+@login_required
+@conditional('notifications')
+def get_all_notifications():
+    """الحصول على جميع الإشعارات"""
+    limit = request.args.get('limit', 50, type=int)
+    rows = db.session.query(*model_columns(Notification)).order_by(Notification.created_at.desc()).limit(limit).all()
+    return jsonify(serializer_for(Notification).many(rows))
+
+@main_bp.route('/api/notifications/<int:notification_id>', methods=['DELETE'])
+@login_required
+def delete_notification(notification_id):
+    """حذف إشعار"""
+    notification = Notification.query.get_or_404(notification_id)
+    db.session.delete(notification)
+    db.session.commit()
+    return '', 204
+
+@main_bp.route('/api/dashboard', methods=['GET'])
+@login_required
+@conditional(*ANALYTICS_TABLES, relative=True)
+def get_dashboard():
+    """الحصول على بيانات لوحة التحكم"""
+    return jsonify(get_dashboard_snapshot())
+
+# ============ API Routes - كشف حساب السائق ============
+
+@main_bp.route('/api/drivers/<int:driver_id>/account', methods=['GET'])
+@login_required
+@conditional(*DRIVER_ACCOUNT_TABLES)
+def get_driver_account(driver_id):
+    """الحصول على كشف حساب السائق"""
+    account = calculate_driver_account(driver_id)
+    if not account:
+        return jsonify({'error': 'السائق غير موجود'}), 404
+    return jsonify(account)
+
+@main_bp.route('/api/drivers/<int:driver_id>/account-details', methods=['GET'])
+@login_required
+@conditional(*DRIVER_ACCOUNT_TABLES)
+def get_driver_account_full(driver_id):
+    """الحصول على تفاصيل كاملة لكشف حساب السائق"""
+    details = get_driver_account_details(driver_id)
+    if not details:
+        return jsonify({'error': 'السائق غير موجود'}), 404
+    return jsonify(details)
+
+@main_bp.route('/api/drivers/accounts/all', methods=['GET'])
+@login_required
+@conditional(*DRIVER_ACCOUNT_TABLES)
+def get_all_drivers_accounts_api():
+    """الحصول على كشف حساب جميع السائقين"""
+    accounts = get_all_drivers_accounts()
+    return jsonify(accounts)
+
+@main_bp.route('/api/drivers/accounts/summary', methods=['GET'])
+@login_required
+@conditional(*DRIVER_ACCOUNT_TABLES)
+def get_drivers_summary_api():
+    """الحصول على ملخص إحصائي لجميع السائقين"""
+    summary = get_drivers_summary()
+    return jsonify(summary)
+
+# ============ صفحات HTML ============
+
+@main_bp.route('/')
+def index():
+    """الصفحة الرئيسية"""
+    return render_template('index.html')
+
+@main_bp.route('/login')
+def login_page():
+    """صفحة تسجيل الدخول"""
+    return render_template('login.html')
+
+@main_bp.route('/users')
+@login_required
+def users_page():
+    """صفحة إدارة المستخدمين"""
+    if current_user.role != 'admin':
+        return render_template('unauthorized.html'), 403
+    return render_template('users.html')
+
+@main_bp.route('/dashboard')
+@login_required
+def dashboard():
+    """لوحة التحكم"""
+    return render_template('dashboard.html')
+
+@main_bp.route('/trucks')
+@login_required
+def trucks_page():
+    """صفحة إدارة القواطر"""
+    return render_template('trucks.html')
+
+@main_bp.route('/drivers')
+@login_required
+def drivers_page():
+    """صفحة إدارة السائقين"""
+    return render_template('drivers.html')
+
+@main_bp.route('/shipments')
+@login_required
+def shipments_page():
+    """صفحة إدارة الشحنات"""
+    return render_template('shipments.html')
+
+@main_bp.route('/reports')
+@login_required
+def reports_page():
+    """صفحة التقارير"""
+    return render_template('reports.html')
+
+@main_bp.route('/expenses')
+@login_required
+def expenses_page():
+    """صفحة إدارة المصاريف"""
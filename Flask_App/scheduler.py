@@ -0,0 +1,388 @@
+"""
+جدولة المهام الخلفية
+- مهام دورية: فحص الأسطول للإشعارات، التحقق من الملخص اليومي، حساب التقارير مسبقاً
+- مجمّع خيوط لتنفيذ المهام دون حجب خيط الجدولة
+- قفل ملف لكل مهمة حتى لا تنفذها أكثر من عملية gunicorn في نفس الفترة
+- قياس زمن التنفيذ لكل مهمة وأوامر سطر أوامر للتشغيل اليدوي
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import click
+from flask import Blueprint, current_app, jsonify
+from flask_login import login_required
+
+from advanced_features import NotificationSystem, get_analytics_report
+from cache import cache_is_shared, get_cache
+from dashboard import DASHBOARD_CACHE_KEY, compute_dashboard
+from models import db
+from reports import fail_stale_jobs, prune_reports
+from rollup import rebuild_rollup, verify_rollup
+
+try:
+    import fcntl
+except ImportError:  # غير متوفر على Windows، القفل يصبح داخل العملية فقط
+    fcntl = None
+
+scheduler_bp = Blueprint('scheduler', __name__, url_prefix='/api/jobs')
+
+
+class Job:
+    """مهمة دورية: الاسم، الدالة، والفترة الافتراضية بالثواني"""
+
+    def __init__(self, name, func, default_interval, description):
+        self.name = name
+        self.func = func
+        self.default_interval = default_interval
+        self.description = description
+
+    def interval(self, app):
+        """
+        فترة التشغيل من الإعدادات (JOB_<NAME>_INTERVAL) أو القيمة الافتراضية
+        القيمة 0 تعطّل التشغيل الدوري للمهمة
+        """
+        key = f'JOB_{self.name.upper()}_INTERVAL'
+        value = app.config.get(key, os.environ.get(key))
+        return int(value) if value not in (None, '') else self.default_interval
+
+
+JOBS = {}
+
+
+def register_job(name, default_interval, description):
+    """تسجيل دالة كمهمة دورية"""
+    def decorator(func):
+        JOBS[name] = Job(name, func, default_interval, description)
+        return func
+    return decorator
+
+
+# ============ قياس التنفيذ ============
+
+class JobMetrics:
+    """إحصاءات تنفيذ المهام داخل العملية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, name):
+        return self._stats.setdefault(name, {
+            'runs': 0,
+            'failures': 0,
+            'skipped': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0,
+            'last_seconds': None,
+            'last_started': None,
+            'last_error': None,
+            'last_result': None,
+        })
+
+    def record_run(self, name, started_at, seconds, result=None, error=None):
+        with self._lock:
+            entry = self._entry(name)
+            entry['runs'] += 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            entry['last_seconds'] = seconds
+            entry['last_started'] = started_at.isoformat()
+            entry['last_result'] = result
+            if error is not None:
+                entry['failures'] += 1
+                entry['last_error'] = error
+
+    def record_skip(self, name):
+        with self._lock:
+            self._entry(name)['skipped'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stats.items()}
+
+
+metrics = JobMetrics()
+
+
+# ============ القفل بين العمليات ============
+
+class JobLock:
+    """
+    قفل ملف غير حاجب لمهمة واحدة (fcntl.flock)
+    الملف يحفظ أيضاً وقت آخر تشغيل ناجح، لتعرف كل عملية إن كانت عملية أخرى قد نفذت المهمة
+    """
+
+    _thread_locks = {}
+    _thread_locks_guard = threading.Lock()
+
+    def __init__(self, directory, name):
+        self.path = os.path.join(directory, f'{name}.lock')
+        with self._thread_locks_guard:
+            self._thread_lock = self._thread_locks.setdefault(self.path, threading.Lock())
+        self._file = None
+
+    def acquire(self):
+        """محاولة أخذ القفل دون انتظار"""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+
+        self._file = open(self.path, 'a+')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._file.close()
+            self._file = None
+            self._thread_lock.release()
+            return False
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def last_run(self):
+        """وقت آخر تشغيل ناجح (epoch) أو 0، يُقرأ من ملف القفل بعد أخذه"""
+        try:
+            if self._file is not None:
+                self._file.seek(0)
+                return float(self._file.read().strip() or 0)
+            with open(self.path) as f:
+                return float(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def mark_run(self, timestamp):
+        # الكتابة في نفس الملف المقفل (استبدال الملف يكسر القفل لدى العمليات الأخرى)
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(str(timestamp))
+            self._file.flush()
+        else:
+            with open(self.path, 'w') as f:
+                f.write(str(timestamp))
+
+
+def _lock_directory(app):
+    directory = app.config.get('SCHEDULER_LOCK_DIR') or os.path.join(app.instance_path, 'locks')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def run_job(app, name, force=False):
+    """
+    تنفيذ مهمة داخل سياق التطبيق مع القفل وقياس الزمن
+    بدون force تُتخطى المهمة إذا نفذتها عملية أخرى خلال فترتها
+    يعيد (تم التنفيذ، النتيجة أو رسالة الخطأ)
+    """
+    job = JOBS[name]
+    lock = JobLock(_lock_directory(app), name)
+    if not lock.acquire():
+        metrics.record_skip(name)
+        return False, 'المهمة قيد التنفيذ في عملية أخرى'
+
+    try:
+        interval = job.interval(app)
+        if not force and interval and time.time() - lock.last_run() < interval * 0.9:
+            metrics.record_skip(name)
+            return False, 'نُفذت المهمة مؤخراً في عملية أخرى'
+
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        with app.app_context():
+            try:
+                result = job.func()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception('فشل تنفيذ المهمة %s', name)
+                metrics.record_run(name, started_at, time.perf_counter() - started,
+                                   error=f'{e.__class__.__name__}: {e}')
+                return False, str(e)
+            finally:
+                db.session.remove()
+
+        metrics.record_run(name, started_at, time.perf_counter() - started, result=result)
+        lock.mark_run(time.time())
+        return True, result
+    finally:
+        lock.release()
+
+
+# ============ المجدول ============
+
+class Scheduler:
+    """خيط جدولة واحد يرسل المهام المستحقة إلى مجمّع خيوط"""
+
+    def __init__(self, app, max_workers=2, tick=5):
+        self.app = app
+        self.tick = tick
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._stop = threading.Event()
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._next_run = {}
+        self._thread = None
+
+    def start(self):
+        now = time.monotonic()
+        for name, job in JOBS.items():
+            interval = job.interval(self.app)
+            if interval:
+                self._next_run[name] = now + min(interval, self.tick)
+        self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            now = time.monotonic()
+            for name, due in list(self._next_run.items()):
+                if due > now:
+                    continue
+                self._next_run[name] = now + JOBS[name].interval(self.app)
+                with self._running_lock:
+                    if name in self._running:
+                        continue
+                    self._running.add(name)
+                self._executor.submit(self._run, name)
+
+    def _run(self, name):
+        try:
+            run_job(self.app, name)
+        finally:
+            with self._running_lock:
+                self._running.discard(name)
+
+
+# ============ المهام ============
+
+@register_job('notification_sweep', 3600, 'فحص الصيانة والربحية لجميع القواطر')
+def notification_sweep_job():
+    config = current_app.config
+    return NotificationSystem.sweep_fleet(
+        config.get('SWEEP_MAINTENANCE_DAYS', 30),
+        config.get('SWEEP_PROFITABILITY_DAYS', 30)
+    )
+
+
+@register_job('rollup_refresh', 86400, 'التحقق من الملخص اليومي وإعادة بنائه عند وجود فروق')
+def rollup_refresh_job():
+    mismatches = verify_rollup()
+    if mismatches:
+        current_app.logger.warning('الملخص اليومي غير مطابق (%d مفتاح)، تتم إعادة بنائه', len(mismatches))
+        rebuild_rollup()
+    return {'mismatches': len(mismatches), 'rebuilt': bool(mismatches)}
+
+
+@register_job('report_precompute', 600, 'حساب لوحة التحكم وتقارير التحليلات مسبقاً')
+def report_precompute_job():
+    # الذاكرة داخل العملية لا يقرؤها إلا العامل الذي نفذ المهمة، فلا فائدة من تعبئتها
+    if not cache_is_shared():
+        return {'skipped': 'الذاكرة المؤقتة غير مشتركة (REDIS_URL غير محدد)'}
+
+    cache = get_cache()
+    cache.set(DASHBOARD_CACHE_KEY, compute_dashboard(), current_app.config.get('DASHBOARD_CACHE_TTL'))
+
+    reports = []
+    for days in current_app.config.get('REPORT_PRECOMPUTE_DAYS', ()):
+        for name in ('fleet_efficiency', 'expense_analysis'):
+            get_analytics_report(name, days, refresh=True)
+            reports.append(f'{name}:{days}')
+    return {'reports': reports}
+
+
+@register_job('report_retention', 86400, 'حذف التقارير المحفوظة الأقدم من مدة الاحتفاظ وإنهاء مهام التقارير العالقة')
+def report_retention_job():
+    return {'failed_jobs': fail_stale_jobs(), 'deleted': prune_reports()}
+
+
+# ============ التهيئة ============
+
+def start_scheduler(app):
+    scheduler = Scheduler(app, max_workers=app.config.get('SCHEDULER_WORKERS', 2))
+    scheduler.start()
+    app.extensions['scheduler'] = scheduler
+    return scheduler
+
+
+def init_scheduler(app):
+    """
+    تسجيل مسار الإحصاءات وأوامر سطر الأوامر
+    إذا كان المجدول مفعّلاً يبدأ مع أول طلب، فيعمل في العمليات التي تخدم الطلبات (gunicorn، flask run)
+    فقط، وليس في أوامر سطر الأوامر (init-db، seed، run-job...) ولا مرتين مع run-scheduler
+    """
+    app.register_blueprint(scheduler_bp)
+    register_commands(app)
+
+    if app.config.get('SCHEDULER_ENABLED'):
+        start_lock = threading.Lock()
+
+        @app.before_request
+        def _start_scheduler_on_first_request():
+            if 'scheduler' in app.extensions:
+                return
+            with start_lock:
+                if 'scheduler' not in app.extensions:
+                    start_scheduler(app)
+
+
+@scheduler_bp.route('', methods=['GET'])
+@login_required
+def list_jobs():
+    """المهام المسجلة وإحصاءات تنفيذها في هذه العملية"""
+    stats = metrics.snapshot()
+    return jsonify([
+        {
+            'name': name,
+            'description': job.description,
+            'interval': job.interval(current_app),
+            'metrics': stats.get(name)
+        }
+        for name, job in JOBS.items()
+    ])
+
+
+def register_commands(app):
+    """تسجيل أوامر سطر الأوامر الخاصة بالمهام"""
+
+    @app.cli.command('run-job')
+    @click.argument('name', type=click.Choice(sorted(JOBS)))
+    def run_job_command(name):
+        """تنفيذ مهمة فوراً (مع احترام القفل بين العمليات)"""
+        started = time.perf_counter()
+        ran, result = run_job(app, name, force=True)
+        if not ran:
+            print(f'✗ {name}: {result}')
+            raise SystemExit(1)
+        print(f'✓ {name} ({time.perf_counter() - started:.2f} ث): {result}')
+
+    @app.cli.command('list-jobs')
+    def list_jobs_command():
+        """عرض المهام وفترات تشغيلها"""
+        for name, job in JOBS.items():
+            print(f'{name:<20} كل {job.interval(app)} ث  {job.description}')
+
+    @app.cli.command('run-scheduler')
+    def run_scheduler_command():
+        """تشغيل المجدول كعملية مستقلة (sidecar) بدلاً من تشغيله داخل عمليات gunicorn"""
+        scheduler = start_scheduler(app)
+        print('✓ المجدول يعمل، اضغط Ctrl+C للإيقاف')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
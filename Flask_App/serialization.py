@@ -0,0 +1,137 @@
+"""
+طبقة التحويل إلى JSON
+- محوّل مُجمَّع مسبقاً لكل نموذج وحقوله يعمل على صفوف الاستعلام (tuples) بدلاً من كائنات ORM،
+  ومخرجاته مطابقة لـ to_dict (التواريخ بصيغة isoformat)
+- مزوّد JSON لـ Flask يستخدم مكتبة orjson إن كانت مثبتة (اختيارية)، وإلا يبقى المزوّد الافتراضي
+"""
+
+import json
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+from models import User
+
+try:
+    import orjson
+except ImportError:  # المكتبة اختيارية
+    orjson = None
+
+# حقول لا تظهر في to_dict ولا في الاستجابات
+EXCLUDED_FIELDS = {
+    User.__tablename__: ('password_hash', 'updated_at'),
+}
+
+
+def serialize_value(value):
+    """تحويل قيمة العمود إلى صيغة JSON بنفس أسلوب to_dict"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def model_fields(model):
+    """حقول النموذج كما تظهر في to_dict (أعمدة الجدول بترتيبها)"""
+    excluded = EXCLUDED_FIELDS.get(model.__tablename__, ())
+    return tuple(column.name for column in model.__table__.columns if column.name not in excluded)
+
+
+def model_columns(model, fields=None):
+    """أعمدة الجدول المطلوبة لاستعلام الصفوف التي يحوّلها serializer_for"""
+    table = model.__table__
+    return [table.c[name] for name in (fields or model_fields(model))]
+
+
+class RowSerializer:
+    """
+    تحويل صف (tuple) إلى قاموس بدالة تُولَّد مرة واحدة لكل (نموذج، حقول)
+    الدالة المولَّدة تبني القاموس مباشرة دون حلقة على الحقول لكل صف
+    date_fields: الحقول التي تُحوّل بـ isoformat، أو None إذا كانت أنواع الحقول غير معروفة (serialize_value لكل قيمة)
+    offset: موضع أول حقل في الصف (مثلاً 1 إذا كان الصف يبدأ بعمود المؤشر)
+    """
+
+    def __init__(self, fields, date_fields=(), offset=0):
+        self.fields = tuple(fields)
+        entries = []
+        for position, name in enumerate(self.fields, offset):
+            value = f'row[{position}]'
+            if date_fields is None:
+                value = f'serialize_value({value})'
+            elif name in date_fields:
+                value = f'({value} and {value}.isoformat())'
+            entries.append(f'{name!r}: {value}')
+        source = f"def serialize(row):\n    return {{{', '.join(entries)}}}\n"
+        namespace = {'serialize_value': serialize_value}
+        exec(compile(source, f'<serializer {",".join(self.fields)}>', 'exec'), namespace)
+        self.serialize = namespace['serialize']
+
+    def __call__(self, row):
+        return self.serialize(row)
+
+    def many(self, rows):
+        return list(map(self.serialize, rows))
+
+
+_serializers = {}
+
+
+def serializer_for(model, fields=None, offset=0):
+    """محوّل صفوف النموذج (مخزن لكل نموذج وحقول وموضع)"""
+    fields = tuple(fields) if fields else model_fields(model)
+    key = (model.__tablename__, fields, offset)
+    serializer = _serializers.get(key)
+    if serializer is None:
+        columns = model.__table__.columns
+        date_fields = {name for name in fields if issubclass(columns[name].type.python_type, date)}
+        serializer = _serializers[key] = RowSerializer(fields, date_fields, offset)
+    return serializer
+
+
+def serialize_rows(model, query_rows, fields=None, offset=0):
+    """تحويل صفوف استعلام إلى قائمة قواميس بنفس مخرجات to_dict"""
+    return serializer_for(model, fields, offset).many(query_rows)
+
+
+# ============ ترميز JSON ============
+
+if orjson is not None:
+    # المفاتيح غير النصية (مثل معرفات القواطر) وترتيب المفاتيح كما في مزوّد Flask
+    # التواريخ الخام تمر إلى default لتبقى بصيغة Flask (http_date)
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """مزوّد JSON يستخدم orjson، مع الرجوع إلى المزوّد الافتراضي عند طلب خيارات خاصة (مثل indent)"""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self._app.debug and self.compact is None:
+            # وضع التطوير: إخراج منسّق كما في Flask
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS), mimetype=self.mimetype
+        )
+
+
+def dumps_line(obj):
+    """سطر JSON واحد (لـ NDJSON) بأسرع مرمّز متاح، مع الإبقاء على الأحرف العربية كما هي"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def init_serialization(app):
+    """استخدام orjson لجميع استجابات jsonify إذا كانت مثبتة وغير معطّلة (JSON_FAST_ENCODER)"""
+    if orjson is not None and app.config.get('JSON_FAST_ENCODER', True):
+        app.json = OrjsonProvider(app)
+    return app.json
@@ -221,23 +221,72 @@ async function createShipment() {
 }
 
 // Dashboard
+let dashboardData = null;
+
+function renderDashboard(data) {
+    document.querySelector('#totalTrucks').textContent = data.trucks.total;
+    document.querySelector('#activeTrucks').textContent = data.trucks.active;
+    document.querySelector('#totalDrivers').textContent = data.drivers.total;
+    document.querySelector('#totalShipments').textContent = data.shipments.total;
+    document.querySelector('#totalRevenue').textContent = formatCurrency(data.financials.revenue);
+    document.querySelector('#totalExpenses').textContent = formatCurrency(data.financials.expenses);
+    document.querySelector('#totalProfit').textContent = formatCurrency(data.financials.profit);
+}
+
+function mergeDashboard(target, delta) {
+    Object.keys(delta).forEach(key => {
+        if (delta[key] !== null && typeof delta[key] === 'object' && target[key]) {
+            mergeDashboard(target[key], delta[key]);
+        } else {
+            target[key] = delta[key];
+        }
+    });
+    return target;
+}
+
 async function loadDashboard() {
     try {
-        const data = await fetchAPI('/dashboard');
-        
-        // Update stats
-        document.querySelector('#totalTrucks').textContent = data.trucks.total;
-        document.querySelector('#activeTrucks').textContent = data.trucks.active;
-        document.querySelector('#totalDrivers').textContent = data.drivers.total;
-        document.querySelector('#totalShipments').textContent = data.shipments.total;
-        document.querySelector('#totalRevenue').textContent = formatCurrency(data.financials.revenue);
-        document.querySelector('#totalExpenses').textContent = formatCurrency(data.financials.expenses);
-        document.querySelector('#totalProfit').textContent = formatCurrency(data.financials.profit);
+        dashboardData = await fetchAPI('/dashboard');
+        renderDashboard(dashboardData);
     } catch (error) {
         console.error('Error loading dashboard:', error);
     }
 }
 
+function startDashboardPolling() {
+    loadDashboard();
+    // Refresh dashboard every 30 seconds
+    setInterval(loadDashboard, 30000);
+}
+
+// Live dashboard updates over Server-Sent Events, falls back to polling
+function subscribeDashboard() {
+    if (!window.EventSource) {
+        startDashboardPolling();
+        return;
+    }
+
+    const source = new EventSource(`${API_BASE}/stream/dashboard`, { withCredentials: true });
+
+    source.addEventListener('dashboard', event => {
+        const delta = JSON.parse(event.data);
+        dashboardData = dashboardData ? mergeDashboard(dashboardData, delta) : delta;
+        renderDashboard(dashboardData);
+    });
+
+    source.addEventListener('notification', event => {
+        const notification = JSON.parse(event.data);
+        showAlert(notification.title, 'info');
+    });
+
+    source.onerror = () => {
+        // The browser reconnects on its own unless the server refused the stream
+        if (source.readyState === EventSource.CLOSED) {
+            startDashboardPolling();
+        }
+    };
+}
+
 // Modal Functions
 function openModal(modalId) {
     document.getElementById(modalId).classList.add('show');
@@ -264,8 +313,6 @@ document.addEventListener('DOMContentLoaded', function() {
     } else if (page === 'shipments') {
         loadShipments();
     } else if (page === 'dashboard') {
-        loadDashboard();
-        // Refresh dashboard every 30 seconds
-        setInterval(loadDashboard, 30000);
+        subscribeDashboard();
     }
 });
@@ -0,0 +1,226 @@
+"""
+قناة البث المباشر للوحة التحكم (Server-Sent Events)
+- حساب واحد مشترك لبيانات لوحة التحكم لكل تغيير، يُوزَّع على جميع العملاء المتصلين
+- إرسال الفروق فقط (delta) والإشعارات الجديدة فور حفظ التغييرات
+- كل اتصال يحجز خيطاً من خيوط العامل طوال مدته، لذلك عدد الاتصالات المتزامنة في كل عملية محدود
+  (STREAM_MAX_CLIENTS)، والاتصال الزائد يُرفض بـ 503 فتعود الصفحة إلى الاستعلام الدوري
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from flask import Blueprint, Response, current_app, jsonify, stream_with_context
+from flask_login import login_required
+from sqlalchemy import event
+
+from cache import on_commit
+from dashboard import get_dashboard_snapshot
+from models import db, Notification
+from projections import select_records
+from serialization import serializer_for
+
+stream_bp = Blueprint('stream', __name__, url_prefix='/api/stream')
+
+# الجداول التي تؤثر على بيانات لوحة التحكم
+DASHBOARD_TABLES = {'trucks', 'drivers', 'shipments', 'revenues', 'expenses'}
+
+
+class DashboardBroadcaster:
+    """
+    موزّع تحديثات لوحة التحكم داخل العملية
+    كل كتابة تزيد رقم الإصدار وتوقظ العملاء، ويُحسب الملخص مرة واحدة لكل إصدار
+    """
+
+    def __init__(self, notifications_buffer=200):
+        self._condition = threading.Condition()
+        self._compute_lock = threading.Lock()
+        self.version = 0
+        self._notifications = deque(maxlen=notifications_buffer)
+        self._notification_seq = 0
+        self._snapshot = None
+        self._snapshot_version = -1
+        self._snapshot_time = 0
+        self._last_notification_id = None
+        self._poll_pending = False
+
+    def publish(self, notifications=(), poll=False):
+        """
+        إعلام العملاء بحدوث تغيير (مع الإشعارات الجديدة إن وجدت)
+        poll=True عند إضافة إشعارات دون كائنات ORM (الإدراج المجمّع) لقراءتها من الجدول
+        """
+        with self._condition:
+            self._poll_pending = self._poll_pending or poll
+            for notification in notifications:
+                self._notification_seq += 1
+                self._notifications.append((self._notification_seq, notification))
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, version, timeout):
+        """انتظار إصدار أحدث من version حتى انتهاء المهلة"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def notifications_since(self, seq):
+        """الإشعارات المنشورة بعد الرقم التسلسلي seq"""
+        with self._condition:
+            items = [(s, n) for s, n in self._notifications if s > seq]
+            return items, self._notification_seq
+
+    def snapshot(self, max_age):
+        """
+        بيانات لوحة التحكم للإصدار الحالي
+        الحساب يتم مرة واحدة فقط لكل إصدار مهما كان عدد العملاء، ويُعاد كل max_age ثانية
+        لالتقاط الكتابات التي حدثت في عمليات أخرى
+        """
+        with self._compute_lock:
+            version = self.version
+            stale = time.monotonic() - self._snapshot_time > max_age
+            if self._snapshot_version != version or stale:
+                if stale or self._poll_pending:
+                    self._poll_pending = False
+                    self._poll_notifications()
+                self._snapshot = get_dashboard_snapshot()
+                self._snapshot_version = version
+                self._snapshot_time = time.monotonic()
+                db.session.close()
+            return self._snapshot
+
+    def _poll_notifications(self):
+        """التقاط الإشعارات التي أنشأتها عمليات أخرى (مرة واحدة لكل فترة)"""
+        last_id = db.session.query(db.func.max(Notification.id)).scalar() or 0
+        if self._last_notification_id is not None and last_id > self._last_notification_id:
+            new_notifications = select_records(
+                Notification, where=(Notification.id > self._last_notification_id,), order_by=(Notification.id,)
+            )
+            serialize = serializer_for(Notification)
+            seen = {n.get('id') for _, n in self._notifications}
+            with self._condition:
+                for notification in new_notifications:
+                    if notification.id not in seen:
+                        self._notification_seq += 1
+                        self._notifications.append((self._notification_seq, serialize(notification)))
+        self._last_notification_id = last_id
+
+
+broadcaster = DashboardBroadcaster()
+
+
+class StreamSlots:
+    """عداد اتصالات البث المفتوحة في العملية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self, limit):
+        """حجز مكان لاتصال جديد، يعيد False إذا وصل العدد إلى limit"""
+        with self._lock:
+            if self.active >= limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+stream_slots = StreamSlots()
+
+
+def dashboard_delta(old, new):
+    """الفروق بين نسختين من بيانات لوحة التحكم (الحقول المتغيرة فقط)"""
+    if old is None:
+        return new
+    delta = {}
+    for key, value in new.items():
+        if isinstance(value, dict) and isinstance(old.get(key), dict):
+            changed = dashboard_delta(old[key], value)
+            if changed:
+                delta[key] = changed
+        elif old.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+def format_event(event_name, data):
+    """تنسيق رسالة SSE"""
+    payload = json.dumps(data, ensure_ascii=False)
+    return f'event: {event_name}\ndata: {payload}\n\n'
+
+
+# ============ نشر التغييرات ============
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_new_notifications(session, flush_context):
+    notifications = [obj.to_dict() for obj in session.new if isinstance(obj, Notification)]
+    if notifications:
+        session.info.setdefault('new_notifications', []).extend(notifications)
+
+
+@on_commit
+def _publish_after_commit(session, tables):
+    notifications = session.info.pop('new_notifications', [])
+    bulk_notifications = not notifications and Notification.__tablename__ in tables
+    if notifications or bulk_notifications or tables & DASHBOARD_TABLES:
+        broadcaster.publish(notifications, poll=bulk_notifications)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('new_notifications', None)
+
+
+# ============ مسار البث ============
+
+@stream_bp.route('/dashboard')
+@login_required
+def stream_dashboard():
+    """بث تحديثات لوحة التحكم والإشعارات الجديدة"""
+    heartbeat = current_app.config.get('STREAM_HEARTBEAT_SECONDS', 15)
+    max_duration = current_app.config.get('STREAM_MAX_SECONDS', 300)
+
+    # بقية خيوط العامل تبقى للطلبات العادية
+    if not stream_slots.acquire(current_app.config.get('STREAM_MAX_CLIENTS', 4)):
+        response = jsonify({'error': 'عدد اتصالات البث المباشر وصل إلى الحد الأقصى'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max_duration)
+        return response
+
+    def generate():
+        started = time.monotonic()
+        version = broadcaster.version
+        _, notification_seq = broadcaster.notifications_since(0)
+        last_snapshot = broadcaster.snapshot(heartbeat)
+
+        # المتصفح يعيد الاتصال تلقائياً بعد انتهاء مدة البث
+        yield 'retry: 3000\n\n'
+        yield format_event('dashboard', last_snapshot)
+
+        while time.monotonic() - started < max_duration:
+            new_version = broadcaster.wait(version, heartbeat)
+
+            snapshot = broadcaster.snapshot(heartbeat)
+            notifications, notification_seq_now = broadcaster.notifications_since(notification_seq)
+            for _, notification in notifications:
+                yield format_event('notification', notification)
+            notification_seq = notification_seq_now
+
+            delta = dashboard_delta(last_snapshot, snapshot)
+            if delta:
+                yield format_event('dashboard', delta)
+                last_snapshot = snapshot
+            elif new_version == version and not notifications:
+                yield ': keep-alive\n\n'
+            version = new_version
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # يُحرَّر المكان عند إغلاق الاستجابة (انتهاء المدة أو انقطاع العميل)
+    response.call_on_close(stream_slots.release)
+    return response
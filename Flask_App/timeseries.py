@@ -0,0 +1,253 @@
+"""
+السلاسل الزمنية للإيرادات والمصاريف والربح وعدد الشحنات
+- تجميع حسب اليوم أو الأسبوع أو الشهر في SQL (date_bucket) باستعلام واحد لكل سلسلة
+- للأسطول كاملاً أو لقاطرة (من الملخص اليومي) أو لسائق (من الشحنات والمصاريف)
+- الفترات المكتملة (قبل اليوم الحالي) تُخزن مؤقتاً كل فترة بمفتاح مستقل، لمدة طويلة مع Redis فقط
+- أي تعديل بتاريخ سابق يغيّر جيل المفاتيح فتُهمل جميع الفترات المخزنة
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from cache import cache_is_shared, get_cache, invalidate_on_change, mark_changed
+from columnar import DATE_BUCKETS, date_bucket
+from models import db, Truck, Driver, Shipment, Expense, DailyTruckFinancial
+from reports import current_period_start
+from rollup import collect_flush_deltas, on_rebuild
+
+SERIES = ('revenue', 'expenses', 'profit', 'shipments')
+
+DEFAULT_MAX_BUCKETS = 1000
+DEFAULT_BUCKET_TTL = 86400
+DEFAULT_LOCAL_BUCKET_TTL = 60
+
+# جدول وهمي يُعلَّم كمتغيّر عند أي تعديل على فترة مكتملة (انظر cache.mark_changed)
+CLOSED_PERIODS = 'closed_periods'
+GENERATION_KEY = 'timeseries:generation'
+invalidate_on_change(GENERATION_KEY, {CLOSED_PERIODS})
+
+
+# ============ حدود الفترات ============
+
+def bucket_start(day, unit):
+    """أول يوم في الفترة التي تحتوي day"""
+    if unit == 'week':
+        return day - timedelta(days=day.weekday())
+    if unit == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_end(day, unit):
+    """آخر يوم في الفترة التي تحتوي day"""
+    if unit == 'week':
+        return bucket_start(day, unit) + timedelta(days=6)
+    if unit == 'month':
+        next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return day
+
+
+def bucket_label(day, unit):
+    """اسم الفترة كما يعيده date_bucket في SQL"""
+    if unit == 'month':
+        return day.strftime('%Y-%m')
+    return bucket_start(day, unit).isoformat()
+
+
+def iter_buckets(first_day, last_day, unit):
+    """(الاسم، أول يوم، آخر يوم) لكل فترة من first_day حتى last_day"""
+    day = bucket_start(first_day, unit)
+    while day <= last_day:
+        end = bucket_end(day, unit)
+        yield bucket_label(day, unit), day, end
+        day = end + timedelta(days=1)
+
+
+# ============ الاستعلامات ============
+
+def _midnight(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def _fleet_financials(unit, first_day, last_day, truck_id=None):
+    """الإيرادات والمصاريف لكل فترة من الملخص اليومي"""
+    table = DailyTruckFinancial.__table__
+    bucket = date_bucket(table.c.day, unit).label('bucket')
+    query = db.session.query(
+        bucket, db.func.sum(table.c.revenue), db.func.sum(table.c.expenses)
+    ).filter(table.c.day >= first_day, table.c.day <= last_day)
+    if truck_id is not None:
+        query = query.filter(table.c.truck_id == truck_id)
+    return {label: (revenue or 0, expenses or 0) for label, revenue, expenses in query.group_by(bucket)}
+
+
+def _shipments(unit, first_day, last_day, truck_id=None, driver_id=None):
+    """عدد الشحنات ومجموع إيراداتها لكل فترة"""
+    bucket = date_bucket(Shipment.shipment_date, unit).label('bucket')
+    query = db.session.query(bucket, db.func.count(Shipment.id), db.func.sum(Shipment.revenue)).filter(
+        Shipment.shipment_date >= _midnight(first_day),
+        Shipment.shipment_date < _midnight(last_day + timedelta(days=1))
+    )
+    if truck_id is not None:
+        query = query.filter(Shipment.truck_id == truck_id)
+    if driver_id is not None:
+        query = query.filter(Shipment.driver_id == driver_id)
+    return {label: (count, revenue or 0) for label, count, revenue in query.group_by(bucket)}
+
+
+def _driver_expenses(unit, first_day, last_day, driver_id):
+    """مصاريف السائق لكل فترة"""
+    bucket = date_bucket(Expense.expense_date, unit).label('bucket')
+    query = db.session.query(bucket, db.func.sum(Expense.amount)).filter(
+        Expense.driver_id == driver_id,
+        Expense.expense_date >= _midnight(first_day),
+        Expense.expense_date < _midnight(last_day + timedelta(days=1))
+    )
+    return {label: amount or 0 for label, amount in query.group_by(bucket)}
+
+
+def query_buckets(unit, first_day, last_day, truck_id=None, driver_id=None):
+    """
+    قيم السلاسل لكل فترة بين first_day و last_day
+    إيرادات السائق هي إيرادات شحناته، وإيرادات القاطرة والأسطول من جدول الإيرادات
+    """
+    shipments = _shipments(unit, first_day, last_day, truck_id, driver_id)
+    if driver_id is not None:
+        expenses = _driver_expenses(unit, first_day, last_day, driver_id)
+        financials = {label: (shipments.get(label, (0, 0))[1], expenses.get(label, 0))
+                      for label in set(shipments) | set(expenses)}
+    else:
+        financials = _fleet_financials(unit, first_day, last_day, truck_id)
+
+    values = {}
+    for label in set(financials) | set(shipments):
+        revenue, expenses = financials.get(label, (0, 0))
+        values[label] = {
+            'revenue': float(revenue),
+            'expenses': float(expenses),
+            'profit': float(revenue - expenses),
+            'shipments': int(shipments.get(label, (0, 0))[0])
+        }
+    return values
+
+
+# ============ التخزين المؤقت للفترات المكتملة ============
+
+def _generation(cache):
+    """جيل مفاتيح الفترات المكتملة، يتغير عند أي تعديل بتاريخ سابق"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = str(time.time_ns())
+        cache.set(GENERATION_KEY, generation, _bucket_ttl())
+    return generation
+
+
+def _bucket_ttl():
+    """
+    مدة تخزين الفترات المكتملة: طويلة مع الذاكرة المشتركة (Redis) حيث يرى كل العمال تغيير الجيل،
+    وقصيرة مع ذاكرة كل عملية لأن الجيل يتغير فقط في العملية التي نفذت التعديل
+    """
+    if cache_is_shared():
+        return current_app.config.get('TIMESERIES_BUCKET_TTL', DEFAULT_BUCKET_TTL)
+    return current_app.config.get('TIMESERIES_LOCAL_BUCKET_TTL', DEFAULT_LOCAL_BUCKET_TTL)
+
+
+def get_timeseries(unit, first_day, last_day, truck_id=None, driver_id=None):
+    """
+    السلاسل لكل فترة (يوم/أسبوع/شهر) بين first_day و last_day
+    الفترة تُوسّع إلى حدود فترات كاملة حتى تكون قيمة كل فترة مستقلة عن حدود الطلب
+    الفترات المكتملة تُقرأ من الذاكرة المؤقتة، ويُستعلم فقط من أول فترة غير مخزنة
+    """
+    if unit not in DATE_BUCKETS:
+        raise ValueError(f"وحدة الفترة غير مدعومة، الوحدات المتاحة: {', '.join(DATE_BUCKETS)}")
+    if first_day > last_day:
+        raise ValueError('بداية الفترة بعد نهايتها')
+
+    buckets = list(iter_buckets(first_day, last_day, unit))
+    max_buckets = current_app.config.get('TIMESERIES_MAX_BUCKETS', DEFAULT_MAX_BUCKETS)
+    if len(buckets) > max_buckets:
+        raise ValueError(f'عدد الفترات ({len(buckets)}) أكبر من الحد الأقصى {max_buckets}')
+
+    cache = get_cache()
+    generation = _generation(cache)
+    scope = f'driver:{driver_id}' if driver_id is not None else f'truck:{truck_id}' if truck_id is not None else 'fleet'
+    today = current_period_start().date()
+
+    def key(label):
+        return f'timeseries:{generation}:{scope}:{unit}:{label}'
+
+    values = {}
+    query_from = None
+    for label, start, end in buckets:
+        cached = cache.get(key(label)) if end < today else None
+        if cached is None:
+            query_from = start
+            break
+        values[label] = cached
+
+    cached_count = len(values)
+    if query_from is not None:
+        fetched = query_buckets(unit, query_from, buckets[-1][2], truck_id, driver_id)
+        empty = {'revenue': 0.0, 'expenses': 0.0, 'profit': 0.0, 'shipments': 0}
+        ttl = _bucket_ttl()
+        for label, start, end in buckets[cached_count:]:
+            values[label] = fetched.get(label, empty)
+            if end < today:
+                cache.set(key(label), values[label], ttl)
+
+    labels = [label for label, _, _ in buckets]
+    return {
+        'bucket': unit,
+        'start_date': buckets[0][1].isoformat(),
+        'end_date': buckets[-1][2].isoformat(),
+        'labels': labels,
+        'series': {name: [values[label][name] for label in labels] for name in SERIES},
+        'totals': {name: sum(values[label][name] for label in labels) for name in SERIES},
+        'cached_buckets': cached_count
+    }
+
+
+# ============ التعديلات بتاريخ سابق ============
+
+def mark_closed_periods_changed(session, dates):
+    """تعليم الجلسة إذا كان بين التواريخ المتأثرة تاريخ قبل اليوم الحالي (يُطبق بعد commit)"""
+    today = current_period_start().date()
+    for value in dates:
+        if value is None:
+            continue
+        day = value.date() if isinstance(value, datetime) else value
+        if isinstance(day, date) and day < today:
+            mark_changed(session, CLOSED_PERIODS)
+            return True
+    return False
+
+
+def _shipment_dates(session):
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Shipment):
+            yield obj.shipment_date
+    for obj in session.dirty:
+        if isinstance(obj, Shipment) and session.is_modified(obj):
+            history = inspect(obj).attrs.shipment_date.history
+            yield from history.deleted
+            yield obj.shipment_date
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_backdated_changes(session, flush_context):
+    if any(isinstance(obj, (Truck, Driver)) for obj in session.deleted):
+        mark_changed(session, CLOSED_PERIODS)
+        return
+    days = [day for _, day, _ in collect_flush_deltas(session)]
+    if not mark_closed_periods_changed(session, days):
+        mark_closed_periods_changed(session, _shipment_dates(session))
+
+
+@on_rebuild
+def _drop_buckets_after_rebuild(session):
+    # الفترات المخزنة للأسطول والقواطر محسوبة من الملخص السابق
+    mark_changed(session, CLOSED_PERIODS)